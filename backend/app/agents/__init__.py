@@ -1,11 +1,15 @@
-from .state import AgentState
+from .state import AgentState, create_initial_state
 from .risk_agent import risk_agent, RiskAssessmentAgent
+from .response_builder import response_builder, ResponseBuilder
 from .workflow import risk_assessment_app, create_risk_assessment_workflow
 
 __all__ = [
     "AgentState",
+    "create_initial_state",
     "risk_agent",
     "RiskAssessmentAgent",
+    "response_builder",
+    "ResponseBuilder",
     "risk_assessment_app",
     "create_risk_assessment_workflow",
 ]
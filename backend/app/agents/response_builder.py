@@ -0,0 +1,278 @@
+import re
+from collections import defaultdict
+from typing import Any, Dict, List, Optional, Tuple
+from app.schemas import (
+    CaseAnalysisResponse,
+    IdentifiedRisk,
+    Recommendation,
+    EvidenceItem,
+    AnalysisMetrics,
+    RiskVisualizationData,
+    RiskType,
+    RiskLevel,
+    Priority,
+    Category,
+    EvidenceType,
+    Impact,
+)
+
+
+WORD_PATTERN = re.compile(r"[a-z0-9]+")
+SENTENCE_PATTERN = re.compile(r"[^.!?\n]+[.!?]?")
+
+STOPWORDS = {
+    "a", "an", "and", "are", "as", "at", "be", "by", "for", "from", "has", "have",
+    "in", "is", "it", "not", "no", "of", "on", "or", "that", "the", "this", "to",
+    "was", "were", "with", "without", "patient", "pt", "should", "must", "within",
+}
+
+MEDICATION_TERMS = {"medication", "dose", "dosage", "drug", "prescribed", "administered", "mg"}
+FOLLOW_UP_TERMS = {"follow", "followup", "return", "precautions", "discharge", "recheck"}
+COMMUNICATION_TERMS = {"discuss", "discussion", "consent", "inform", "informed", "communicate", "communication", "counsel"}
+
+RISK_TYPE_TITLES = {
+    RiskType.MISSED_DIAGNOSIS: "Rule Out Missed Diagnosis",
+    RiskType.INADEQUATE_WORKUP: "Complete Required Workup",
+    RiskType.DOCUMENTATION_DEFICIENCY: "Close Documentation Gap",
+    RiskType.TREATMENT_ERROR: "Review Treatment Decision",
+}
+
+RISK_TYPE_EVIDENCE = {
+    RiskType.MISSED_DIAGNOSIS: EvidenceType.RISK_FACTOR,
+    RiskType.INADEQUATE_WORKUP: EvidenceType.STANDARD_COMPLIANCE,
+    RiskType.DOCUMENTATION_DEFICIENCY: EvidenceType.TEXT_ANALYSIS,
+    RiskType.TREATMENT_ERROR: EvidenceType.STANDARD_COMPLIANCE,
+}
+
+# Same palette the frontend mock uses
+CATEGORY_COLORS = {
+    "Documentation": "rgba(239, 68, 68, 0.8)",
+    "Clinical Decision": "rgba(234, 179, 8, 0.8)",
+    "Communication": "rgba(34, 197, 94, 0.8)",
+    "Follow-up": "rgba(59, 130, 246, 0.8)",
+    "Medication": "rgba(168, 85, 247, 0.8)",
+}
+
+MAX_KEY_FINDINGS = 5
+MAX_EXCERPT_CHARS = 300
+# Distinct risk terms an excerpt must contain before it can reach full confidence
+FULL_CONFIDENCE_TERMS = 4
+
+
+class CaseTextIndex:
+    """Sentence spans and a word -> sentence inverted index, built in one pass over the text."""
+
+    def __init__(self, text: str):
+        self.text = text
+        self.spans: List[Tuple[int, int]] = []
+        self.postings: Dict[str, List[int]] = defaultdict(list)
+        self.total_words = 0
+
+        lowered = text.lower()
+        for match in SENTENCE_PATTERN.finditer(lowered):
+            start, end = match.span()
+            sentence_id = len(self.spans)
+            seen = set()
+            for word in WORD_PATTERN.findall(lowered, start, end):
+                self.total_words += 1
+                if word not in seen:
+                    seen.add(word)
+                    self.postings[word].append(sentence_id)
+            # Word-less fragments added no postings and get no span
+            if seen:
+                self.spans.append((start, end))
+
+    def best_excerpt(self, terms: Dict[str, float]) -> Tuple[Optional[str], float, int]:
+        """Return the sentence with the highest total term weight, that weight and its distinct term count."""
+        scores: Dict[int, float] = defaultdict(float)
+        hits: Dict[int, int] = defaultdict(int)
+        for term, weight in terms.items():
+            for sentence_id in self.postings.get(term, ()):
+                scores[sentence_id] += weight
+                hits[sentence_id] += 1
+
+        if not scores:
+            return None, 0.0, 0
+
+        # Ties go to the earliest sentence so output is deterministic
+        sentence_id = min(scores, key=lambda sid: (-scores[sid], sid))
+        start, end = self.spans[sentence_id]
+        excerpt = self.text[start:end].strip()
+        if len(excerpt) > MAX_EXCERPT_CHARS:
+            excerpt = excerpt[:MAX_EXCERPT_CHARS].rstrip() + "..."
+        return excerpt, scores[sentence_id], hits[sentence_id]
+
+    def contains(self, term: str) -> bool:
+        """Check whether a word occurs anywhere in the text."""
+        return term in self.postings
+
+
+class ResponseBuilder:
+    """Assembles the frontend response fields from the final workflow state without LLM calls."""
+
+    def build(self, state: Dict[str, Any]) -> CaseAnalysisResponse:
+        """Build the full API response from the final workflow state."""
+        risks: List[IdentifiedRisk] = sorted(
+            state.get('identified_risks') or [], key=lambda r: r.severity, reverse=True
+        )
+        index = CaseTextIndex(state['case_description'])
+        patient_info = state.get('patient_info')
+        context_words = set(
+            WORD_PATTERN.findall(patient_info.chief_complaint.lower()) if patient_info else ()
+        )
+
+        evidence = []
+        categories = []
+        matched_terms = set()
+
+        for i, risk in enumerate(risks, 1):
+            terms = self._risk_terms(risk, context_words)
+            matched_terms.update(t for t in terms if index.contains(t))
+            excerpt, score, hits = index.best_excerpt(terms)
+            confidence = self._confidence(score, sum(terms.values()), hits)
+            categories.append(self._category(risk, terms))
+
+            if excerpt:
+                evidence.append(EvidenceItem(
+                    id=str(i),
+                    type=EvidenceType.PATTERN_RECOGNITION if risk.legal_precedent else RISK_TYPE_EVIDENCE[risk.type],
+                    excerpt=excerpt,
+                    analysis=self._analysis(risk),
+                    confidence=confidence,
+                    impact=self._impact(risk.severity)
+                ))
+
+        confidence_score = (
+            round(sum(e.confidence for e in evidence) / len(evidence)) if evidence else 0
+        )
+
+        return CaseAnalysisResponse(
+            # Legacy fields
+            patient_info=state.get('patient_info'),
+            identified_risks=risks,
+            similar_cases=[hit.to_similar_case() for hit in state.get('similar_cases') or []],
+            action_items=state.get('action_items') or [],
+            protective_documentation=state.get('protective_documentation') or '',
+            estimated_liability_range=state.get('estimated_liability_range'),
+            plaintiff_win_probability=state.get('plaintiff_win_probability'),
+            reused_from=state.get('reused_from'),
+            degraded=state.get('degraded') or [],
+            # Frontend fields
+            riskScore=min(100, max(0, round((state.get('risk_score') or 0.0) * 10))),
+            riskLevel=RiskLevel(state.get('risk_level') or RiskLevel.LOW.value),
+            keyFindings=[risk.description for risk in risks[:MAX_KEY_FINDINGS]],
+            recommendations=[
+                Recommendation(
+                    id=str(i),
+                    priority=self._priority(risk.severity),
+                    category=category,
+                    title=RISK_TYPE_TITLES[risk.type],
+                    description=risk.description,
+                    action=risk.mitigation
+                )
+                for i, (risk, category) in enumerate(zip(risks, categories), 1)
+            ],
+            evidence=evidence,
+            analysisMetrics=AnalysisMetrics(
+                totalWords=index.total_words,
+                keyPhrases=len(matched_terms),
+                riskIndicators=len(risks),
+                confidenceScore=confidence_score
+            ),
+            riskVisualizationData=self._visualization(risks, categories, evidence)
+        )
+
+    def _risk_terms(self, risk: IdentifiedRisk, context_words=frozenset()) -> Dict[str, float]:
+        """Weighted content words of a risk, used to locate its evidence in the case text.
+
+        Words repeated across the description and violated standard weigh more;
+        chief-complaint words weigh less since they appear throughout the case.
+        """
+        words = WORD_PATTERN.findall(f"{risk.description} {risk.standard_violated}".lower())
+        terms: Dict[str, float] = {}
+        for word in words:
+            # Short words are noise except unit terms like "mg"
+            if word in STOPWORDS or (len(word) <= 2 and word not in MEDICATION_TERMS):
+                continue
+            terms[word] = terms.get(word, 0.0) + (0.5 if word in context_words else 1.0)
+        return terms
+
+    def _category(self, risk: IdentifiedRisk, terms: Dict[str, float]) -> Category:
+        """Map a risk to a recommendation category."""
+        mitigation_words = set(WORD_PATTERN.findall(risk.mitigation.lower())) | set(terms)
+
+        if risk.type == RiskType.DOCUMENTATION_DEFICIENCY:
+            return Category.DOCUMENTATION
+        if mitigation_words & COMMUNICATION_TERMS:
+            return Category.COMMUNICATION
+        if mitigation_words & FOLLOW_UP_TERMS:
+            return Category.FOLLOW_UP
+        return Category.CLINICAL_DECISION
+
+    def _visualization(
+        self,
+        risks: List[IdentifiedRisk],
+        categories: List[Category],
+        evidence: List[EvidenceItem]
+    ) -> List[RiskVisualizationData]:
+        """Aggregate risk severity and evidence confidence per category."""
+        confidence_by_id = {e.id: e.confidence for e in evidence}
+        grouped: Dict[str, List[Tuple[float, int]]] = defaultdict(list)
+
+        for i, (risk, category) in enumerate(zip(risks, categories), 1):
+            confidence = confidence_by_id.get(str(i), 0)
+            grouped[category.value].append((risk.severity, confidence))
+            if risk.type == RiskType.TREATMENT_ERROR or self._risk_terms(risk).keys() & MEDICATION_TERMS:
+                grouped["Medication"].append((risk.severity, confidence))
+
+        return [
+            RiskVisualizationData(
+                category=name,
+                risk=round(sum(s for s, _ in points) / len(points) * 10),
+                impact=round(max(s for s, _ in points) * 10),
+                confidence=round(sum(c for _, c in points) / len(points)),
+                color=color
+            )
+            for name, color in CATEGORY_COLORS.items()
+            if (points := grouped.get(name))
+        ]
+
+    @staticmethod
+    def _analysis(risk: IdentifiedRisk) -> str:
+        """Evidence analysis text from the risk fields."""
+        analysis = f"{risk.description.rstrip('.')}. Standard of care: {risk.standard_violated.rstrip('.')}."
+        if risk.legal_precedent:
+            analysis += f" Precedent: {risk.legal_precedent.rstrip('.')}."
+        return analysis
+
+    @staticmethod
+    def _confidence(score: float, total_weight: float, hits: int) -> int:
+        """Confidence that an excerpt supports a risk, from the share of risk term weight it contains.
+
+        The share is scaled down when the excerpt matched fewer than FULL_CONFIDENCE_TERMS
+        distinct terms, so a single shared word cannot read as strong support.
+        """
+        if not total_weight:
+            return 0
+        share = score / total_weight * min(1.0, hits / FULL_CONFIDENCE_TERMS)
+        return min(95, 40 + round(55 * share))
+
+    @staticmethod
+    def _priority(severity: float) -> Priority:
+        if severity >= 7:
+            return Priority.HIGH
+        if severity >= 4:
+            return Priority.MEDIUM
+        return Priority.LOW
+
+    @staticmethod
+    def _impact(severity: float) -> Impact:
+        if severity >= 7:
+            return Impact.HIGH
+        if severity >= 4:
+            return Impact.MEDIUM
+        return Impact.LOW
+
+
+# Singleton instance
+response_builder = ResponseBuilder()
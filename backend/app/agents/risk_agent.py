@@ -1,244 +1,459 @@
-from typing import Dict, Any
-from anthropic import Anthropic
+import logging
+import time
+from contextvars import copy_context
+from typing import Callable, Dict, Any, List, Optional, Tuple, TypeVar, Union
+from concurrent.futures import ThreadPoolExecutor, TimeoutError as FutureTimeoutError, wait
 from app.core.config import settings
 from app.agents.state import AgentState
 from app.schemas import PatientInfo, IdentifiedRisk, RiskType, RiskLevel
-from app.services import vector_db, clinical_standards
+from app.services import (
+    vector_db,
+    CaseHit,
+    chart_chunker,
+    CaseChunk,
+    llm_client,
+    analysis_reuse,
+    prompt_cache,
+    EXTRACT_PATIENT_INFO_PROMPT,
+    IDENTIFY_RISKS_PROMPT,
+    GENERATE_MITIGATION_PROMPT,
+)
 import json
 
 
+T = TypeVar("T")
+
+# Nodes return only the state keys they set, so checkpoints do not copy the case text per step
+StateUpdate = Dict[str, Any]
+
+# Shortest excerpt of a section worth putting in a prompt, see _case_context()
+CASE_CONTEXT_MIN_SECTION_CHARS = 200
+
+# Time a step keeps back from the budget it passes to fn, so fn returns its
+# (partial) result before the step gives up waiting for it; see _run_with_budget()
+STEP_RESULT_MARGIN_SECONDS = 0.5
+
+logger = logging.getLogger(__name__)
+
+
+class StepTimeoutError(TimeoutError):
+    """A workflow step ran past its time budget or the request deadline."""
+
+
 class RiskAssessmentAgent:
     """Multi-step agent for risk assessment using LangGraph workflow."""
 
     def __init__(self):
-        self.client = Anthropic(api_key=settings.ANTHROPIC_API_KEY)
+        self.llm = llm_client
         self.model = "claude-sonnet-4-20250514"
+        # Steps run here so a hung call can be abandoned at its budget
+        self._step_executor = ThreadPoolExecutor(max_workers=32, thread_name_prefix="risk-step")
+        # Per-chunk extraction calls, bounded across all analyses in the process
+        self._chunk_executor = ThreadPoolExecutor(
+            max_workers=settings.CHUNK_MAX_WORKERS, thread_name_prefix="risk-chunk"
+        )
 
-    def extract_patient_info(self, state: AgentState) -> AgentState:
-        """Step 1: Extract structured patient information from case description."""
+    def chunk_case(self, state: AgentState) -> StateUpdate:
+        """Step 0: Split long chart documents into section-aligned chunks."""
 
-        prompt = f"""You are a medical information extraction expert. Extract structured information from this case description.
+        chunks = chart_chunker.split(state['case_description'])
 
-Case Description:
-{state['case_description']}
+        if len(chunks) > 1:
+            logger.info("Step 0: Split chart into chunks", extra={"chunks": len(chunks)})
 
-Extract and return ONLY a JSON object with these fields:
-- age: patient age (number or null)
-- gender: patient gender (string or null)
-- chief_complaint: main complaint (string)
-- tests_performed: list of tests/examinations done (array of strings)
-- tests_not_performed: list of tests that were NOT done but mentioned (array of strings)
-- treatment_given: list of treatments provided (array of strings)
-- disposition: what happened to patient (e.g., "sent home", "admitted", null)
+        return {'case_chunks': chunks}
 
-Return ONLY valid JSON, no other text."""
+    def reuse_prior_analysis(self, state: AgentState) -> StateUpdate:
+        """Step 0b: Reuse the Step 3 risks of a near-duplicate prior analysis of the same tenant.
+
+        Only single-chunk cases up to REUSE_MAX_CHARS are matched; the
+        embedding of a longer text covers its beginning only. Steps 1 and 5 still run on the new case,
+        so its patient info and note are never copied from another patient.
+        """
+
+        if len(state.get('case_chunks') or []) > 1:
+            return {}
 
         try:
-            response = self.client.messages.create(
-                model=self.model,
-                max_tokens=1024,
-                messages=[{"role": "user", "content": prompt}]
+            match = self._run_with_budget(
+                state,
+                settings.RETRIEVAL_TIMEOUT_SECONDS,
+                lambda timeout: analysis_reuse.find(state['case_description'], state.get('tenant'))
             )
+        except Exception as e:
+            logger.warning("Reuse lookup failed", extra={"error": str(e)})
+            return {}
+
+        if match is None:
+            return {}
+
+        logger.info(
+            "Step 0b: Reusing prior analysis",
+            extra={"reused_job_id": match["job_id"], "similarity": match["similarity"]}
+        )
+        return {
+            **match["outputs"],
+            'reused_from': {"job_id": match["job_id"], "similarity": match["similarity"]},
+        }
+
+    def extract_patient_info(self, state: AgentState) -> StateUpdate:
+        """Step 1: Extract structured patient information from case description."""
 
-            content = response.content[0].text
-            patient_data = json.loads(content)
+        case_description = state['case_description']
+        chunks = state.get('case_chunks') or []
 
-            state['patient_info'] = PatientInfo(**patient_data)
-            print("✅ Step 1: Extracted patient info")
+        def extract(timeout: float) -> Tuple[PatientInfo, int]:
+            if len(chunks) <= 1:
+                return self._extract_from_text(case_description, timeout), 0
+            return self._extract_from_chunks(case_description, chunks, timeout)
 
-        except Exception as e:
-            print(f"❌ Error extracting patient info: {e}")
-            state['error'] = str(e)
+        try:
+            patient_info, missing = self._run_with_budget(state, settings.EXTRACT_TIMEOUT_SECONDS, extract)
+            logger.info("Step 1: Extracted patient info")
+            if missing:
+                # Facts only stated in the missing sections are absent
+                logger.warning("Step 1 partial", extra={"missing_chunks": missing, "chunks": len(chunks)})
+                return {
+                    'patient_info': patient_info,
+                    'degraded': self._degrade(
+                        state, "patient_info", f"{missing} of {len(chunks)} chunks not extracted", reason="partial"
+                    ),
+                }
+            return {'patient_info': patient_info}
 
-        return state
+        except Exception as e:
+            # Risks are still identified from the case text alone
+            logger.warning("Step 1 degraded, no patient info", extra={"error": str(e)})
+            return {'degraded': self._degrade(state, "patient_info", e)}
 
-    def find_similar_cases(self, state: AgentState) -> AgentState:
+    def find_similar_cases(self, state: AgentState) -> StateUpdate:
         """Step 2: Find similar malpractice cases using RAG."""
 
-        try:
-            similar_cases = vector_db.search_similar_cases(
-                query=state['case_description'],
+        case_description = state['case_description']
+        chunks = state.get('case_chunks') or []
+
+        def search(timeout: float):
+            if len(chunks) <= 1:
+                return vector_db.search_similar_cases(
+                    query=case_description,
+                    n_results=5
+                )
+            return vector_db.search_similar_cases_batch(
+                queries=[chunk.text_in(case_description) for chunk in chunks],
                 n_results=5
             )
 
-            state['similar_cases'] = similar_cases
-            print(f"✅ Step 2: Found {len(similar_cases)} similar cases")
+        try:
+            similar_cases = self._run_with_budget(state, settings.RETRIEVAL_TIMEOUT_SECONDS, search)
+            logger.info("Step 2: Found similar cases", extra={"similar_cases": len(similar_cases)})
+            return {'similar_cases': similar_cases}
 
         except Exception as e:
-            print(f"❌ Error finding similar cases: {e}")
-            state['similar_cases'] = []
+            # Risks are scored without precedent
+            logger.warning("Step 2 degraded, no similar cases", extra={"error": str(e)})
+            return {'similar_cases': [], 'degraded': self._degrade(state, "similar_cases", e)}
 
-        return state
-
-    def identify_risks(self, state: AgentState) -> AgentState:
+    def identify_risks(self, state: AgentState) -> StateUpdate:
         """Step 3: Identify specific risks by comparing to clinical standards."""
 
         patient_info = state.get('patient_info')
         similar_cases = state.get('similar_cases', [])
 
-        if not patient_info:
-            state['identified_risks'] = []
-            return state
-
-        # Get clinical standard for chief complaint
-        chief_complaint = patient_info.chief_complaint
-        standard = clinical_standards.get_standard(chief_complaint)
-
-        prompt = f"""You are a medical malpractice risk expert. Identify ALL potential legal risks in this case.
-
-PATIENT CASE:
-{state['case_description']}
-
-EXTRACTED INFO:
-- Chief Complaint: {patient_info.chief_complaint}
-- Tests Performed: {', '.join(patient_info.tests_performed) if patient_info.tests_performed else 'None'}
-- Tests NOT Performed: {', '.join(patient_info.tests_not_performed) if patient_info.tests_not_performed else 'None'}
-- Treatment: {', '.join(patient_info.treatment_given) if patient_info.treatment_given else 'None'}
-- Disposition: {patient_info.disposition or 'Unknown'}
-
-CLINICAL STANDARD OF CARE:
-Required Workup: {standard.get('required_workup', [])}
-Red Flags: {standard.get('red_flags', [])}
-Must Rule Out: {standard.get('must_rule_out', [])}
-Documentation Requirements: {standard.get('documentation_requirements', [])}
-
-SIMILAR LEGAL CASES:
-{self._format_similar_cases(similar_cases[:3])}
-
-Analyze this case and identify ALL risks. For each risk, return a JSON object with:
-- type: one of ["missed_diagnosis", "inadequate_workup", "documentation_deficiency", "treatment_error"]
-- severity: number from 1-10 (10 = highest risk)
-- description: specific problem identified
-- standard_violated: which standard of care was violated
-- legal_precedent: cite similar case if applicable (or null)
-- mitigation: specific action to reduce this risk
-
-Return a JSON array of risk objects. Be thorough and identify ALL gaps."""
-
-        try:
-            response = self.client.messages.create(
+        # Standards and precedent blocks are rendered once and shared across requests.
+        # Instructions and the standards block lead the prompt so the API can cache
+        # them per complaint; precedents vary with the case and follow
+        chief_complaint = patient_info.chief_complaint if patient_info else ""
+        cache_prefix, prompt = IDENTIFY_RISKS_PROMPT.render_parts(
+            case_context=self._case_context(state),
+            patient_info=self._format_patient_info(patient_info),
+            standard=prompt_cache.standards_block(chief_complaint),
+            similar_cases=prompt_cache.similar_cases_block(similar_cases[:3])
+        )
+
+        def identify(timeout: float) -> List[IdentifiedRisk]:
+            content = self.llm.complete(
                 model=self.model,
+                prompt=prompt,
                 max_tokens=2048,
-                messages=[{"role": "user", "content": prompt}]
+                timeout=timeout,
+                prompt_version=IDENTIFY_RISKS_PROMPT.version,
+                cache_prefix=cache_prefix
             )
+            return [IdentifiedRisk(**risk) for risk in json.loads(content)]
 
-            content = response.content[0].text
-            risks_data = json.loads(content)
-
-            identified_risks = [IdentifiedRisk(**risk) for risk in risks_data]
-            state['identified_risks'] = identified_risks
-            print(f"✅ Step 3: Identified {len(identified_risks)} risks")
+        try:
+            identified_risks = self._run_with_budget(state, settings.RISKS_TIMEOUT_SECONDS, identify)
+            logger.info("Step 3: Identified risks", extra={"risks": len(identified_risks)})
+            return {'identified_risks': identified_risks}
 
         except Exception as e:
-            print(f"❌ Error identifying risks: {e}")
-            state['identified_risks'] = []
-
-        return state
+            # No score without risks; an empty list would read as LOW risk
+            logger.error("Error identifying risks", extra={"error": str(e)})
+            return {'identified_risks': [], 'error': f"Risk identification failed: {e}"}
 
-    def calculate_risk_score(self, state: AgentState) -> AgentState:
+    def calculate_risk_score(self, state: AgentState) -> StateUpdate:
         """Step 4: Calculate overall risk score."""
 
         risks = state.get('identified_risks', [])
 
         if not risks:
-            state['risk_score'] = 0.0
-            state['risk_level'] = RiskLevel.LOW.value
-            return state
+            return {'risk_score': 0.0, 'risk_level': RiskLevel.LOW.value}
 
         # Calculate average of top 3 most severe risks
         sorted_risks = sorted(risks, key=lambda r: r.severity, reverse=True)
         top_risks = sorted_risks[:3]
         avg_severity = sum(r.severity for r in top_risks) / len(top_risks)
 
-        state['risk_score'] = round(avg_severity, 1)
+        update: StateUpdate = {'risk_score': round(avg_severity, 1)}
 
         # Determine risk level
         if avg_severity >= 7:
-            state['risk_level'] = RiskLevel.HIGH.value
+            update['risk_level'] = RiskLevel.HIGH.value
         elif avg_severity >= 4:
-            state['risk_level'] = RiskLevel.MEDIUM.value
+            update['risk_level'] = RiskLevel.MODERATE.value
         else:
-            state['risk_level'] = RiskLevel.LOW.value
+            update['risk_level'] = RiskLevel.LOW.value
 
         # Estimate liability based on similar cases
-        similar_cases = state.get('similar_cases', [])
-        if similar_cases:
-            plaintiff_wins = sum(1 for c in similar_cases if 'plaintiff' in c.verdict.lower())
-            state['plaintiff_win_probability'] = round(plaintiff_wins / len(similar_cases), 2)
-
-        print(f"✅ Step 4: Risk score = {state['risk_score']}/10 ({state['risk_level']})")
-
-        return state
-
-    def generate_mitigation(self, state: AgentState) -> AgentState:
+        probability = self.plaintiff_win_probability(state.get('similar_cases') or [])
+        if probability is not None:
+            update['plaintiff_win_probability'] = probability
+
+        logger.info(
+            "Step 4: Calculated risk score",
+            extra={"risk_score": update['risk_score'], "risk_level": update['risk_level']}
+        )
+
+        return update
+
+    @staticmethod
+    def plaintiff_win_probability(similar_cases: List[CaseHit]) -> Optional[float]:
+        """Share of plaintiff verdicts among retrieved cases, or None without any."""
+        if not similar_cases:
+            return None
+        plaintiff_wins = sum(1 for c in similar_cases if 'plaintiff' in c.verdict.lower())
+        return round(plaintiff_wins / len(similar_cases), 2)
+
+    def generate_mitigation(self, state: AgentState) -> StateUpdate:
         """Step 5: Generate actionable mitigation steps and protective documentation."""
 
         risks = state.get('identified_risks', [])
-        patient_info = state.get('patient_info')
 
         if not risks:
-            state['action_items'] = []
-            state['protective_documentation'] = ""
-            return state
-
-        prompt = f"""You are a medical-legal expert. Generate protective actions and documentation for this case.
-
-CASE: {state['case_description']}
-
-IDENTIFIED RISKS:
-{self._format_risks(risks)}
+            return {'action_items': [], 'protective_documentation': ""}
 
-Generate two things:
+        prompt = GENERATE_MITIGATION_PROMPT.render(
+            case_context=self._case_context(state),
+            risks=self._format_risks(risks)
+        )
 
-1. ACTION ITEMS: A list of specific, actionable steps the physician should take NOW to reduce risk. Be concrete and medical-specific.
-
-2. PROTECTIVE DOCUMENTATION: A sample note the physician can add to the medical record that includes:
-   - Full differential diagnosis considered
-   - Documentation of workup and reasoning
-   - Shared decision-making discussion
-   - Return precautions given
-   - Use protective legal language
-
-Return as JSON:
-{{
-  "action_items": ["action 1", "action 2", ...],
-  "protective_documentation": "full note text here"
-}}"""
-
-        try:
-            response = self.client.messages.create(
+        def mitigate(timeout: float) -> Dict[str, Any]:
+            content = self.llm.complete(
                 model=self.model,
+                prompt=prompt,
                 max_tokens=2048,
-                messages=[{"role": "user", "content": prompt}]
+                timeout=timeout,
+                prompt_version=GENERATE_MITIGATION_PROMPT.version
             )
+            return json.loads(content)
 
-            content = response.content[0].text
-            mitigation_data = json.loads(content)
-
-            state['action_items'] = mitigation_data.get('action_items', [])
-            state['protective_documentation'] = mitigation_data.get('protective_documentation', '')
-
-            print(f"✅ Step 5: Generated {len(state['action_items'])} action items")
+        try:
+            mitigation_data = self._run_with_budget(state, settings.MITIGATION_TIMEOUT_SECONDS, mitigate)
+            action_items = mitigation_data.get('action_items', [])
+            logger.info("Step 5: Generated action items", extra={"action_items": len(action_items)})
+            return {
+                'action_items': action_items,
+                'protective_documentation': mitigation_data.get('protective_documentation', ''),
+            }
 
         except Exception as e:
-            print(f"❌ Error generating mitigation: {e}")
-            state['action_items'] = []
-            state['protective_documentation'] = ""
-
-        return state
-
-    def _format_similar_cases(self, cases) -> str:
-        """Format similar cases for prompt."""
-        if not cases:
-            return "No similar cases found."
-
-        formatted = []
-        for case in cases:
-            formatted.append(
-                f"- {case.case_name} ({case.year}): {case.facts[:200]}... "
-                f"Verdict: {case.verdict}, Key Error: {case.key_error}"
-            )
-        return "\n".join(formatted)
+            # The result is returned without action items and note
+            logger.warning("Step 5 degraded, no mitigation", extra={"error": str(e)})
+            return {
+                'action_items': [],
+                'protective_documentation': "",
+                'degraded': self._degrade(state, "mitigation", e),
+            }
+
+    def _run_with_budget(self, state: AgentState, step_seconds: float, fn: Callable[[float], T]) -> T:
+        """Run fn(timeout) within the step budget and the request deadline.
+
+        fn gets the budget less a small margin, so work that returns partial
+        results at its timeout is collected before the step gives up. Raises
+        StepTimeoutError when the budget runs out; the abandoned call is
+        bounded by the timeout it was given.
+        """
+        budget = step_seconds
+        deadline = state.get('deadline')
+        if deadline is not None:
+            budget = min(budget, deadline - time.time())
+        if budget <= 0:
+            raise StepTimeoutError("request deadline exceeded")
+        inner = budget - min(STEP_RESULT_MARGIN_SECONDS, budget * 0.1)
+
+        # copy_context carries the request id and current span into the step thread
+        future = self._step_executor.submit(copy_context().run, fn, inner)
+        try:
+            return future.result(timeout=budget)
+        except FutureTimeoutError:
+            future.cancel()
+            raise StepTimeoutError(f"exceeded {budget:.1f}s budget")
+
+    @staticmethod
+    def _degrade(
+        state: AgentState,
+        part: str,
+        error: Union[Exception, str],
+        reason: Optional[str] = None
+    ) -> List[Dict[str, str]]:
+        """Degraded list of the state plus a part that fell back after a timeout or error.
+
+        reason defaults to "timeout" or "error" from the exception type.
+        """
+        if reason is None:
+            reason = "timeout" if isinstance(error, StepTimeoutError) else "error"
+        return (state.get('degraded') or []) + [
+            {"part": part, "reason": reason, "detail": str(error)}
+        ]
+
+    def _extract_from_text(self, text: str, timeout: Optional[float] = None) -> PatientInfo:
+        """Run the extraction prompt over a single piece of text."""
+
+        prompt = EXTRACT_PATIENT_INFO_PROMPT.render(case_text=text)
+
+        content = self.llm.complete(
+            model=self.model,
+            prompt=prompt,
+            max_tokens=1024,
+            timeout=timeout,
+            prompt_version=EXTRACT_PATIENT_INFO_PROMPT.version
+        )
+        patient_data = json.loads(content)
+
+        return PatientInfo(**patient_data)
+
+    def _extract_from_chunks(
+        self,
+        case_description: str,
+        chunks: List[CaseChunk],
+        timeout: Optional[float] = None
+    ) -> Tuple[PatientInfo, int]:
+        """Extract facts from each chunk in parallel and merge the partial results.
+
+        Returns within timeout: each chunk call gets the time left when it
+        starts, chunks still queued at the deadline are cancelled, and those
+        unfinished are left out of the merge. Returns the merged info and the
+        number of chunks left out, unfinished or failed.
+        """
+        deadline = time.monotonic() + timeout if timeout is not None else None
+
+        def extract(chunk: CaseChunk) -> Optional[PatientInfo]:
+            remaining = deadline - time.monotonic() if deadline is not None else None
+            if remaining is not None and remaining <= 0:
+                return None
+            try:
+                return self._extract_from_text(chunk.text_in(case_description), remaining)
+            except Exception as e:
+                logger.warning(
+                    "Skipping chunk", extra={"chunk": chunk.index, "title": chunk.title, "error": str(e)}
+                )
+                return None
+
+        # Each task gets its own context copy (a context cannot be entered twice)
+        futures = [self._chunk_executor.submit(copy_context().run, extract, chunk) for chunk in chunks]
+        done, pending = wait(futures, timeout=timeout)
+        for future in pending:
+            future.cancel()
+        if pending:
+            logger.warning("Chunks unfinished at the step budget", extra={"chunks": len(pending)})
+
+        # Results are collected in chunk order, so the merge below is deterministic
+        partials = [info for info in (f.result() for f in futures if f in done) if info is not None]
+
+        if not partials:
+            raise ValueError("Could not extract patient info from any chunk")
+
+        return self._merge_patient_info(partials), len(chunks) - len(partials)
+
+    @staticmethod
+    def _merge_patient_info(partials: List[PatientInfo]) -> PatientInfo:
+        """Merge per-chunk PatientInfo results in chunk order."""
+
+        def first(values):
+            return next((v for v in values if v not in (None, "")), None)
+
+        def union(lists):
+            seen = set()
+            merged = []
+            for items in lists:
+                for item in items:
+                    key = item.strip().lower()
+                    if key and key not in seen:
+                        seen.add(key)
+                        merged.append(item.strip())
+            return merged
+
+        tests_performed = union(p.tests_performed for p in partials)
+        performed_keys = {t.lower() for t in tests_performed}
+        # A test listed as missing in one section may be resulted in a later one
+        tests_not_performed = [
+            t for t in union(p.tests_not_performed for p in partials)
+            if t.lower() not in performed_keys
+        ]
+
+        return PatientInfo(
+            age=first(p.age for p in partials),
+            gender=first(p.gender for p in partials),
+            chief_complaint=first(p.chief_complaint for p in partials) or "",
+            tests_performed=tests_performed,
+            tests_not_performed=tests_not_performed,
+            treatment_given=union(p.treatment_given for p in partials),
+            # Disposition is charted at the end of the encounter
+            disposition=first(p.disposition for p in reversed(partials))
+        )
+
+    def _case_context(self, state: AgentState) -> str:
+        """Case text for prompts, bounded to PROMPT_CASE_MAX_CHARS for long charts."""
+
+        case_description = state['case_description']
+        chunks = state.get('case_chunks') or []
+        budget = settings.PROMPT_CASE_MAX_CHARS
+
+        if len(chunks) <= 1 or len(case_description) <= budget:
+            return case_description
+
+        # Every section gets an equal share so late sections (e.g. disposition) survive.
+        # With more sections than fit at CASE_CONTEXT_MIN_SECTION_CHARS each, the first
+        # and last sections are kept with evenly spaced ones in between.
+        keep = max(2, min(len(chunks), budget // CASE_CONTEXT_MIN_SECTION_CHARS))
+        if keep < len(chunks):
+            step = (len(chunks) - 1) / (keep - 1)
+            indexes = sorted({round(i * step) for i in range(keep)})
+        else:
+            indexes = list(range(len(chunks)))
+        share = budget // len(indexes)
+
+        excerpts = []
+        previous = -1
+        for index in indexes:
+            if index - previous > 1:
+                excerpts.append(f"[... {index - previous - 1} sections omitted ...]")
+            chunk = chunks[index]
+            excerpts.append(f"[{chunk.title}] {chunk.text_in(case_description)[:share]}")
+            previous = index
+        return "\n\n".join(excerpts)
+
+    def _format_patient_info(self, patient_info: Optional[PatientInfo]) -> str:
+        """Extracted-info block of the risk prompt."""
+        if patient_info is None:
+            return "EXTRACTED INFO: Not available; identify risks from the case text."
+
+        return f"""EXTRACTED INFO:
+- Chief Complaint: {patient_info.chief_complaint}
+- Tests Performed: {', '.join(patient_info.tests_performed) if patient_info.tests_performed else 'None'}
+- Tests NOT Performed: {', '.join(patient_info.tests_not_performed) if patient_info.tests_not_performed else 'None'}
+- Treatment: {', '.join(patient_info.treatment_given) if patient_info.treatment_given else 'None'}
+- Disposition: {patient_info.disposition or 'Unknown'}"""
 
     def _format_risks(self, risks) -> str:
         """Format risks for prompt."""
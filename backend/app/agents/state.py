@@ -1,5 +1,9 @@
-from typing import TypedDict, List, Optional
-from app.schemas import PatientInfo, IdentifiedRisk, SimilarCase
+import time
+from typing import TypedDict, List, Optional, Dict, Any
+from app.core.config import settings
+from app.core.telemetry import request_id_var
+from app.schemas import PatientInfo, IdentifiedRisk
+from app.services import CaseChunk, CaseHit
 
 
 class AgentState(TypedDict):
@@ -7,12 +11,24 @@ class AgentState(TypedDict):
 
     # Input
     case_description: str
+    # Tenant of the job; scopes lookups in shared indexes such as near-duplicate reuse
+    tenant: Optional[str]
+    # Id of the originating API request, carried into every node's logs and spans
+    request_id: Optional[str]
+    # Wall-clock time (epoch seconds) by which the analysis must finish
+    deadline: Optional[float]
+
+    # Step 0: Section-aligned chunks of long chart documents
+    case_chunks: Optional[List[CaseChunk]]
+
+    # Near-duplicate prior analysis of the same tenant whose Step 3 risks were reused
+    reused_from: Optional[Dict[str, Any]]
 
     # Step 1: Extract patient info
     patient_info: Optional[PatientInfo]
 
     # Step 2: Find similar cases
-    similar_cases: Optional[List[SimilarCase]]
+    similar_cases: Optional[List[CaseHit]]
 
     # Step 3: Identify risks
     identified_risks: Optional[List[IdentifiedRisk]]
@@ -29,5 +45,37 @@ class AgentState(TypedDict):
     estimated_liability_range: Optional[str]
     plaintiff_win_probability: Optional[float]
 
+    # Parts that fell back after a timeout or error, or came back partial: {"part", "reason", "detail"}
+    degraded: Optional[List[Dict[str, str]]]
+
     # Error handling
     error: Optional[str]
+
+
+def create_initial_state(
+    case_description: str,
+    deadline_seconds: Optional[float] = None,
+    request_id: Optional[str] = None,
+    tenant: Optional[str] = None
+) -> AgentState:
+    """Create the empty workflow state for a case description."""
+    deadline_seconds = deadline_seconds or settings.ANALYSIS_DEADLINE_SECONDS
+    return {
+        "case_description": case_description,
+        "tenant": tenant or settings.DEFAULT_TENANT,
+        "request_id": request_id or request_id_var.get(),
+        "deadline": time.time() + deadline_seconds,
+        "case_chunks": None,
+        "reused_from": None,
+        "patient_info": None,
+        "similar_cases": None,
+        "identified_risks": None,
+        "risk_score": None,
+        "risk_level": None,
+        "action_items": None,
+        "protective_documentation": None,
+        "estimated_liability_range": None,
+        "plaintiff_win_probability": None,
+        "degraded": None,
+        "error": None
+    }
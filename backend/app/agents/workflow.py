@@ -1,31 +1,82 @@
+import logging
+import time
+from typing import Any, Callable, Dict
 from langgraph.graph import StateGraph, END
+from opentelemetry.trace import Status, StatusCode
 from app.agents.state import AgentState
 from app.agents.risk_agent import risk_agent
+from app.core.telemetry import request_context, request_id_var, span
 
+logger = logging.getLogger(__name__)
 
-def create_risk_assessment_workflow():
-    """Create the LangGraph workflow for risk assessment."""
+
+def _traced(
+    name: str, node: Callable[[AgentState], Dict[str, Any]]
+) -> Callable[[AgentState], Dict[str, Any]]:
+    """Run a node in its own span, with the analysis' request id on every log record.
+
+    Nodes return only the state keys they set; LangGraph merges them into the state.
+    """
+    def run(state: AgentState) -> Dict[str, Any]:
+        request_id = state.get('request_id') or request_id_var.get()
+        with request_context(request_id), span(f"workflow.{name}", request_id=request_id) as current:
+            started = time.perf_counter()
+            result = node(state)
+            duration_ms = round((time.perf_counter() - started) * 1000, 1)
+
+            degraded = [part["part"] for part in result.get('degraded') or []]
+            if degraded:
+                current.set_attribute("degraded", degraded)
+            if result.get('error'):
+                current.set_status(Status(StatusCode.ERROR, result['error']))
+            logger.info("Node finished", extra={"node": name, "duration_ms": duration_ms})
+        return result
+    return run
+
+
+def _route(fresh: str, reused: str):
+    """Edge that skips risk identification when a prior analysis was reused."""
+    def route(state: AgentState) -> str:
+        return reused if state.get('reused_from') else fresh
+    return route
+
+
+def create_risk_assessment_workflow(checkpointer=None):
+    """Create the LangGraph workflow for risk assessment.
+
+    Pass a LangGraph checkpointer to persist state after every node so an
+    interrupted run can resume from the last completed step.
+
+    When a near-duplicate prior analysis is reused, its risk list replaces
+    Step 3; extraction, retrieval, scoring and mitigation run on the new case.
+    """
 
     # Create state graph
     workflow = StateGraph(AgentState)
 
     # Add nodes
-    workflow.add_node("extract_info", risk_agent.extract_patient_info)
-    workflow.add_node("find_cases", risk_agent.find_similar_cases)
-    workflow.add_node("identify_risks", risk_agent.identify_risks)
-    workflow.add_node("calculate_score", risk_agent.calculate_risk_score)
-    workflow.add_node("generate_mitigation", risk_agent.generate_mitigation)
+    workflow.add_node("chunk_case", _traced("chunk_case", risk_agent.chunk_case))
+    workflow.add_node("reuse_analysis", _traced("reuse_analysis", risk_agent.reuse_prior_analysis))
+    workflow.add_node("extract_info", _traced("extract_info", risk_agent.extract_patient_info))
+    workflow.add_node("find_cases", _traced("find_cases", risk_agent.find_similar_cases))
+    workflow.add_node("identify_risks", _traced("identify_risks", risk_agent.identify_risks))
+    workflow.add_node("calculate_score", _traced("calculate_score", risk_agent.calculate_risk_score))
+    workflow.add_node("generate_mitigation", _traced("generate_mitigation", risk_agent.generate_mitigation))
 
     # Define edges (workflow sequence)
-    workflow.set_entry_point("extract_info")
+    workflow.set_entry_point("chunk_case")
+    workflow.add_edge("chunk_case", "reuse_analysis")
+    workflow.add_edge("reuse_analysis", "extract_info")
     workflow.add_edge("extract_info", "find_cases")
-    workflow.add_edge("find_cases", "identify_risks")
+    workflow.add_conditional_edges(
+        "find_cases", _route("identify_risks", "calculate_score"), ["identify_risks", "calculate_score"]
+    )
     workflow.add_edge("identify_risks", "calculate_score")
     workflow.add_edge("calculate_score", "generate_mitigation")
     workflow.add_edge("generate_mitigation", END)
 
     # Compile the graph
-    app = workflow.compile()
+    app = workflow.compile(checkpointer=checkpointer)
 
     return app
 
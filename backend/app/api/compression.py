@@ -0,0 +1,167 @@
+import zlib
+from typing import Optional
+from starlette.datastructures import Headers, MutableHeaders
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+try:
+    import brotli
+except ImportError:  # optional: gzip only
+    brotli = None
+
+
+# Content types worth compressing; everything else passes through
+COMPRESSIBLE_TYPES = ("application/json", "text/")
+
+
+class _GzipEncoder:
+    def __init__(self, level: int):
+        # wbits 16 + MAX_WBITS writes a gzip header and trailer
+        self._compressor = zlib.compressobj(level, zlib.DEFLATED, 16 + zlib.MAX_WBITS)
+
+    def compress(self, data: bytes) -> bytes:
+        return self._compressor.compress(data)
+
+    def finish(self) -> bytes:
+        return self._compressor.flush()
+
+
+class _BrotliEncoder:
+    def __init__(self, quality: int):
+        self._compressor = brotli.Compressor(quality=quality)
+
+    def compress(self, data: bytes) -> bytes:
+        return self._compressor.process(data)
+
+    def finish(self) -> bytes:
+        return self._compressor.finish()
+
+
+class CompressionMiddleware:
+    """Compress JSON and text responses with brotli or gzip per Accept-Encoding.
+
+    brotli is preferred when the client accepts it and the brotli package is
+    installed. Bodies under minimum_size and responses that already carry a
+    Content-Encoding are sent as they are. Every JSON or text response (and
+    every 304) carries Vary: Accept-Encoding whether or not it was compressed,
+    so shared caches never hand a compressed body to a client that cannot
+    decode it. Compressed responses get a weak ETag, since their bytes differ
+    from the identity body the handler's ETag was computed from.
+    """
+
+    def __init__(self, app: ASGIApp, minimum_size: int = 1024, gzip_level: int = 6, brotli_quality: int = 5):
+        self.app = app
+        self.minimum_size = minimum_size
+        self.gzip_level = gzip_level
+        self.brotli_quality = brotli_quality
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        encoding = self.choose_encoding(Headers(scope=scope).get("accept-encoding", ""))
+        responder = _CompressingResponder(self, encoding, send)
+        await self.app(scope, receive, responder.send)
+
+    @staticmethod
+    def choose_encoding(accept_encoding: str) -> Optional[str]:
+        """br or gzip if the client accepts it (q > 0), else None."""
+        accepted = set()
+        for item in accept_encoding.lower().split(","):
+            name, _, params = item.partition(";")
+            key, _, q = params.partition("=")
+            try:
+                if key.strip() == "q" and float(q) <= 0:
+                    continue
+            except ValueError:
+                continue
+            accepted.add(name.strip())
+
+        if brotli is not None and ("br" in accepted or "*" in accepted):
+            return "br"
+        if "gzip" in accepted or "*" in accepted:
+            return "gzip"
+        return None
+
+    def encoder(self, encoding: str):
+        if encoding == "br":
+            return _BrotliEncoder(self.brotli_quality)
+        return _GzipEncoder(self.gzip_level)
+
+
+class _CompressingResponder:
+    """send() wrapper deciding on the first body chunk whether to compress.
+
+    encoding is None when the client accepts neither br nor gzip; responses
+    then only get their Vary header.
+    """
+
+    def __init__(self, middleware: CompressionMiddleware, encoding: Optional[str], send: Send):
+        self.middleware = middleware
+        self.encoding = encoding
+        self._send = send
+        self._start: Optional[Message] = None
+        self._encoder = None
+        self._passthrough = False
+
+    async def send(self, message: Message):
+        if message["type"] == "http.response.start":
+            # Held back until the first body chunk shows what to do with it
+            self._start = message
+            return
+        if message["type"] != "http.response.body":
+            await self._send(message)
+            return
+
+        if self._passthrough:
+            await self._send(message)
+            return
+
+        body = message.get("body", b"")
+        more_body = message.get("more_body", False)
+
+        if self._encoder is None:
+            headers = MutableHeaders(raw=self._start["headers"])
+            content_type = headers.get("content-type", "")
+            compressible = "content-encoding" not in headers and content_type.startswith(COMPRESSIBLE_TYPES)
+            not_modified = self._start["status"] == 304
+            if compressible or not_modified:
+                # The representation depends on Accept-Encoding even when sent as is
+                headers.add_vary_header("Accept-Encoding")
+            if not_modified and self.encoding is not None:
+                # Same validator the compressed 200 would have carried
+                self._weaken_etag(headers)
+            skip = (
+                self.encoding is None
+                or not compressible
+                or (not more_body and len(body) < self.middleware.minimum_size)
+            )
+            if skip:
+                self._passthrough = True
+                await self._send(self._start)
+                await self._send(message)
+                return
+
+            self._encoder = self.middleware.encoder(self.encoding)
+            headers["Content-Encoding"] = self.encoding
+            self._weaken_etag(headers)
+            if more_body:
+                del headers["Content-Length"]
+            else:
+                body = self._encoder.compress(body) + self._encoder.finish()
+                headers["Content-Length"] = str(len(body))
+                await self._send(self._start)
+                await self._send({"type": "http.response.body", "body": body})
+                return
+            await self._send(self._start)
+
+        chunk = self._encoder.compress(body)
+        if not more_body:
+            chunk += self._encoder.finish()
+        await self._send({"type": "http.response.body", "body": chunk, "more_body": more_body})
+
+    @staticmethod
+    def _weaken_etag(headers: MutableHeaders):
+        etag = headers.get("etag")
+        if etag and not etag.startswith("W/"):
+            headers["ETag"] = f"W/{etag}"
@@ -0,0 +1,84 @@
+from dataclasses import dataclass
+from enum import Enum
+from typing import Any, Dict, FrozenSet, Optional
+from fastapi import HTTPException, Query
+from app.core.config import settings
+from app.schemas import CaseAnalysisResponse
+
+
+class ResponseView(str, Enum):
+    FULL = "full"
+    LEAN = "lean"
+
+
+# Top-level fields of an analysis result that include/exclude may name
+RESPONSE_FIELDS = frozenset(CaseAnalysisResponse.model_fields)
+
+# Dropped from the lean view unless named in include
+LEAN_OMITTED_FIELDS = frozenset({"protective_documentation"})
+
+CASES_PATH = "/api/v1/cases"
+
+
+@dataclass(frozen=True)
+class ResponseShape:
+    """Which parts of a stored analysis result a client asked for.
+
+    The lean view replaces similar cases by references to GET /cases/{case_id}
+    and omits the protective documentation note. include keeps only the named
+    top-level fields, exclude drops them.
+    """
+    view: ResponseView = ResponseView.FULL
+    include: FrozenSet[str] = frozenset()
+    exclude: FrozenSet[str] = frozenset()
+
+    def apply(self, result: Dict[str, Any]) -> Dict[str, Any]:
+        """Shape a result dict as stored by the worker (already JSON-compatible)."""
+        omitted = self.exclude
+        if self.view is ResponseView.LEAN:
+            omitted = omitted | (LEAN_OMITTED_FIELDS - self.include)
+
+        shaped = {
+            field: value for field, value in result.items()
+            if (not self.include or field in self.include) and field not in omitted
+        }
+        if self.view is ResponseView.LEAN and "similar_cases" in shaped:
+            shaped["similar_cases"] = [case_reference(case) for case in shaped["similar_cases"]]
+        return shaped
+
+
+def case_reference(case: Dict[str, Any]) -> Dict[str, Any]:
+    """Reference to a similar case; results stored before case ids were kept stay inline."""
+    case_id = case.get("case_id")
+    if not case_id:
+        return case
+    return {
+        "case_id": case_id,
+        "case_name": case["case_name"],
+        "year": case["year"],
+        "verdict": case["verdict"],
+        "similarity_score": case["similarity_score"],
+        "href": f"{CASES_PATH}/{case_id}",
+    }
+
+
+def response_shape(
+    view: ResponseView = Query(
+        ResponseView(settings.RESPONSE_DEFAULT_VIEW),
+        description="lean: similar cases as references to /cases/{case_id}, no protective documentation"
+    ),
+    include: Optional[str] = Query(None, description="comma-separated top-level fields to return"),
+    exclude: Optional[str] = Query(None, description="comma-separated top-level fields to leave out")
+) -> ResponseShape:
+    """Query parameters selecting the response view and fields, 422 for unknown fields."""
+    return ResponseShape(view, _fields("include", include), _fields("exclude", exclude))
+
+
+def _fields(name: str, value: Optional[str]) -> FrozenSet[str]:
+    if not value:
+        return frozenset()
+    fields = frozenset(field.strip() for field in value.split(",") if field.strip())
+    unknown = fields - RESPONSE_FIELDS
+    if unknown:
+        raise HTTPException(status_code=422, detail=f"Unknown {name} fields: {', '.join(sorted(unknown))}")
+    return fields
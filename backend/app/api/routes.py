@@ -1,7 +1,15 @@
-from fastapi import APIRouter, HTTPException
+import asyncio
+import hashlib
+import time
+from functools import lru_cache
+from fastapi import APIRouter, Depends, HTTPException, Header, Request, Response
+from fastapi.concurrency import run_in_threadpool
+from fastapi.responses import JSONResponse, ORJSONResponse
+from pydantic import ValidationError
 from app.schemas import (
     CaseAnalysisRequest,
     CaseAnalysisResponse,
+    CaseDetail,
     Recommendation,
     EvidenceItem,
     AnalysisMetrics,
@@ -12,65 +20,245 @@ from app.schemas import (
     Impact,
     RiskLevel
 )
-from app.agents import risk_assessment_app
-from app.services import vector_db
-from typing import Dict, Any
+from app.core.config import settings
+from app.core.telemetry import trace_carrier
+from app.services import (
+    vector_db,
+    document_ingestion,
+    UploadTooLargeError,
+    UnsupportedDocumentError,
+    job_store,
+    QueueFullError,
+    analysis_input_key,
+    analysis_reuse,
+    resolve_tenant,
+    InvalidTenantError,
+)
+from app.services.ingestion import SUPPORTED_FORMATS
+from .responses import ResponseShape, response_shape
+from .uploads import receive_upload, InvalidUploadError, UPLOAD_OPENAPI
+from typing import Dict, Any, Optional, Tuple
 
 router = APIRouter()
 
 
 @router.post("/analyze", response_model=CaseAnalysisResponse)
-async def analyze_case(request: CaseAnalysisRequest):
+async def analyze_case(
+    request: CaseAnalysisRequest,
+    x_tenant_id: Optional[str] = Header(None),
+    shape: ResponseShape = Depends(response_shape)
+):
     """
     Analyze a medical case for malpractice risk.
 
-    This endpoint runs the full multi-agent workflow:
-    1. Extract patient information
+    The case is queued for the worker pool, which runs the full multi-agent workflow:
+    0. Split long chart documents into sections
+    1. Extract patient information (per section, in parallel)
     2. Find similar legal cases
     3. Identify risks
     4. Calculate risk score
     5. Generate mitigation steps
+
+    Returns the result if it is ready within ANALYZE_WAIT_SECONDS, otherwise
+    202 with a job id to poll at /jobs/{job_id}. Jobs are scheduled fairly
+    across tenants (X-Tenant-ID); a tenant over its quota gets 429. A request
+    identical to a queued or running one of the same tenant joins that job.
+
+    ?view=lean returns similar cases as references to /cases/{case_id} and
+    leaves out the protective documentation; ?include= and ?exclude= select
+    top-level fields.
     """
+    tenant = _tenant(x_tenant_id)
+    job_id = await _enqueue_analysis(request.case_description, tenant)
+    return await _wait_for_result(job_id, shape)
+
+
+@router.post("/analyze-upload", response_model=CaseAnalysisResponse, openapi_extra=UPLOAD_OPENAPI)
+async def analyze_upload(
+    request: Request,
+    x_tenant_id: Optional[str] = Header(None),
+    shape: ResponseShape = Depends(response_shape)
+):
+    """
+    Analyze an uploaded chart document (plain text, PDF-extracted text, HL7 v2 or CCD).
+
+    The multipart body is streamed into a single spool file and cut off with
+    413 once the file passes UPLOAD_MAX_BYTES. Small uploads are normalized
+    in the request and queued as text. Uploads larger than
+    UPLOAD_INLINE_MAX_BYTES are normalized by the worker; the response is 202
+    with a job id to poll at /jobs/{job_id}.
+    """
+    tenant = _tenant(x_tenant_id)
+
     try:
-        # Initialize state
-        initial_state = {
-            "case_description": request.case_description,
-            "patient_info": None,
-            "similar_cases": None,
-            "identified_risks": None,
-            "risk_score": None,
-            "risk_level": None,
-            "action_items": None,
-            "protective_documentation": None,
-            "estimated_liability_range": None,
-            "plaintiff_win_probability": None,
-            "error": None
-        }
+        upload = await receive_upload(request)
+    except UploadTooLargeError as e:
+        raise HTTPException(status_code=413, detail=str(e))
+    except InvalidUploadError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+    queued = False
+    try:
+        fmt = upload.format or document_ingestion.detect_format(upload.filename, upload.content_type, upload.head)
+        if fmt not in SUPPORTED_FORMATS:
+            raise UnsupportedDocumentError(f"Unsupported document format: {fmt}")
+
+        if upload.size > settings.UPLOAD_INLINE_MAX_BYTES:
+            job_id = await _enqueue("upload", {"path": upload.path, "format": fmt}, tenant)
+            queued = True
+            return _accepted(job_id)
+
+        case_description = await run_in_threadpool(document_ingestion.normalize_file, upload.path, fmt)
+        analysis = CaseAnalysisRequest(case_description=case_description)
+
+    except UploadTooLargeError as e:
+        raise HTTPException(status_code=413, detail=str(e))
+    except UnsupportedDocumentError as e:
+        raise HTTPException(status_code=415, detail=str(e))
+    except ValidationError as e:
+        raise HTTPException(status_code=422, detail=e.errors())
+    finally:
+        # A queued upload's spool file belongs to the worker
+        if not queued:
+            document_ingestion.discard(upload.path)
+
+    job_id = await _enqueue_analysis(analysis.case_description, tenant)
+    return await _wait_for_result(job_id, shape)
+
+
+@router.get("/jobs/{job_id}")
+async def get_job(
+    job_id: str,
+    x_tenant_id: Optional[str] = Header(None),
+    shape: ResponseShape = Depends(response_shape)
+) -> Dict[str, Any]:
+    """Get the status and, once finished, the result of an analysis job of the caller's tenant.
+
+    The result takes the same view/include/exclude parameters as /analyze.
+    """
+    tenant = _tenant(x_tenant_id)
+    job = await run_in_threadpool(job_store.get, job_id)
+    if job is None or job["tenant"] != tenant:
+        raise HTTPException(status_code=404, detail="Job not found")
+
+    return ORJSONResponse({
+        "job_id": job["id"],
+        "tenant": job["tenant"],
+        "kind": job["kind"],
+        "status": job["status"],
+        "attempts": job["attempts"],
+        "coalesced": job["coalesced"],
+        "created_at": job["created_at"],
+        "finished_at": job["finished_at"],
+        "result": shape.apply(job["result"]) if job["result"] is not None else None,
+        "error": job["error"]
+    })
+
+
+@router.get("/cases/{case_id}", response_model=CaseDetail)
+async def get_case(case_id: str, request: Request):
+    """A precedent case by id, as referenced from lean analysis responses.
+
+    Bodies are cached per case and data version; the ETag lets clients
+    revalidate with If-None-Match and get 304 without a body.
+    """
+    cached = await run_in_threadpool(_cached_case_body, case_id)
+    if cached is None:
+        raise HTTPException(status_code=404, detail="Case not found")
+
+    body, etag = cached
+    headers = {"ETag": etag, "Cache-Control": f"max-age={settings.CASE_CACHE_MAX_AGE_SECONDS}"}
+    if _etag_matches(request.headers.get("if-none-match"), etag):
+        return Response(status_code=304, headers=headers)
+    return Response(content=body, media_type="application/json", headers=headers)
 
-        # Run the workflow
-        final_state = risk_assessment_app.invoke(initial_state)
-
-        # Check for errors
-        if final_state.get('error'):
-            raise HTTPException(status_code=500, detail=final_state['error'])
-
-        # Construct response
-        response = CaseAnalysisResponse(
-            patient_info=final_state['patient_info'],
-            identified_risks=final_state.get('identified_risks', []),
-            similar_cases=final_state.get('similar_cases', []),
-            risk_score=final_state.get('risk_score', 0.0),
-            risk_level=final_state.get('risk_level', 'low'),
-            action_items=final_state.get('action_items', []),
-            protective_documentation=final_state.get('protective_documentation', ''),
-            estimated_liability_range=final_state.get('estimated_liability_range'),
-            plaintiff_win_probability=final_state.get('plaintiff_win_probability')
+
+def _cached_case_body(case_id: str) -> Optional[Tuple[bytes, str]]:
+    """_case_body for the case data every process currently sees."""
+    return _case_body(case_id, vector_db.data_version)
+
+
+@lru_cache(maxsize=settings.CASE_CACHE_SIZE)
+def _case_body(case_id: str, data_version: str) -> Optional[Tuple[bytes, str]]:
+    """Serialized case and its ETag; data_version only keys the cache."""
+    case = vector_db.get_case(case_id)
+    if case is None:
+        return None
+    body = ORJSONResponse(case.model_dump(mode="json")).body
+    return body, f'"{hashlib.sha256(body).hexdigest()[:32]}"'
+
+
+def _etag_matches(if_none_match: Optional[str], etag: str) -> bool:
+    """Weak comparison of an If-None-Match header against an ETag."""
+    if not if_none_match:
+        return False
+    candidates = {tag.strip().removeprefix("W/") for tag in if_none_match.split(",")}
+    return "*" in candidates or etag in candidates
+
+
+def _tenant(x_tenant_id: Optional[str]) -> str:
+    """Tenant of the request, 400 for a malformed X-Tenant-ID."""
+    try:
+        return resolve_tenant(x_tenant_id)
+    except InvalidTenantError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+
+async def _enqueue_analysis(case_description: str, tenant: str) -> str:
+    """Queue a text analysis, coalesced with an identical one in flight."""
+    input_key = analysis_input_key(case_description) if settings.COALESCE_ENABLED else None
+    return await _enqueue("analyze", {"case_description": case_description}, tenant, input_key)
+
+
+async def _enqueue(kind: str, payload: Dict[str, Any], tenant: str, input_key: Optional[str] = None) -> str:
+    """Queue a job, translating a full queue or tenant quota into 429 with Retry-After.
+
+    The payload carries the request's trace context so the worker's spans join it.
+    """
+    payload = {**payload, "trace": trace_carrier()}
+    try:
+        return await run_in_threadpool(job_store.enqueue, kind, payload, tenant, input_key)
+    except QueueFullError as e:
+        raise HTTPException(
+            status_code=429,
+            detail=str(e),
+            headers={"Retry-After": str(e.retry_after)}
         )
 
-        return response
 
-    except Exception as e:
-        raise HTTPException(status_code=500, detail=str(e))
+async def _wait_for_result(job_id: str, shape: ResponseShape):
+    """Wait up to ANALYZE_WAIT_SECONDS for a job, then fall back to 202.
+
+    The stored result was validated by the worker, so it is shaped and
+    serialized as it is rather than rebuilt as a model.
+    """
+    deadline = time.monotonic() + settings.ANALYZE_WAIT_SECONDS
+    # Fast results (reuse, coalesced jobs) are seen within milliseconds; the interval
+    # doubles up to JOB_POLL_INTERVAL_SECONDS so slow ones cost few store reads
+    interval = settings.ANALYZE_POLL_MIN_SECONDS
+
+    while time.monotonic() < deadline:
+        job = await run_in_threadpool(job_store.get, job_id)
+        if job["status"] == "completed":
+            return ORJSONResponse(shape.apply(job["result"]))
+        if job["status"] == "failed":
+            raise HTTPException(status_code=500, detail=job["error"])
+        await asyncio.sleep(min(interval, max(deadline - time.monotonic(), 0)))
+        interval = min(interval * 2, settings.JOB_POLL_INTERVAL_SECONDS)
+
+    return _accepted(job_id)
+
+
+def _accepted(job_id: str) -> JSONResponse:
+    """202 response pointing at the job status endpoint."""
+    return JSONResponse(
+        status_code=202,
+        content={
+            "job_id": job_id,
+            "status": "queued",
+            "status_url": f"/api/v1/jobs/{job_id}"
+        }
+    )
 
 
 @router.get("/health")
@@ -88,6 +276,10 @@ async def get_stats() -> Dict[str, Any]:
     """Get database statistics."""
     try:
         stats = vector_db.get_collection_stats()
+        stats["jobs"] = job_store.get_stats()
+        stats["reuse"] = {**analysis_reuse.get_stats(), **job_store.get_reuse_stats()}
+        stats["tenants"] = job_store.get_tenant_stats()
+        stats["coalescing"] = job_store.get_coalescing_stats()
         return stats
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
@@ -0,0 +1,172 @@
+import os
+import uuid
+from dataclasses import dataclass
+from typing import Optional
+from fastapi import Request
+from fastapi.concurrency import run_in_threadpool
+from multipart.exceptions import MultipartParseError
+from multipart.multipart import MultipartParser, parse_options_header
+from app.core.config import settings
+from app.services import document_ingestion, UploadTooLargeError
+
+# Allowance for multipart boundaries, part headers and small form fields
+MULTIPART_OVERHEAD_BYTES = 64 * 1024
+
+# Bytes kept from the start of the file for format detection
+HEAD_BYTES = 512
+
+# Request body of /analyze-upload for the OpenAPI schema; the route parses it itself
+UPLOAD_OPENAPI = {
+    "requestBody": {
+        "required": True,
+        "content": {
+            "multipart/form-data": {
+                "schema": {
+                    "type": "object",
+                    "required": ["file"],
+                    "properties": {
+                        "file": {"type": "string", "format": "binary"},
+                        "format": {"type": "string", "enum": ["text", "pdf_text", "hl7", "ccd"]},
+                    },
+                }
+            }
+        },
+    }
+}
+
+
+class InvalidUploadError(ValueError):
+    """Raised for a malformed multipart body or one without a file part."""
+
+
+@dataclass
+class ReceivedUpload:
+    """A file part written to UPLOAD_SPOOL_DIR, with the form fields sent beside it."""
+    path: str
+    size: int
+    head: bytes
+    filename: Optional[str]
+    content_type: Optional[str]
+    format: Optional[str]
+
+
+class _Part:
+    def __init__(self):
+        self.headers = {}
+        self.name = ""
+        self.filename: Optional[str] = None
+        self.data = b""
+
+
+async def receive_upload(request: Request, file_field: str = "file") -> ReceivedUpload:
+    """Stream a multipart/form-data body, writing the file part straight to one spool file.
+
+    Nothing is buffered by the framework: the body is read from request.stream()
+    and parsed as it arrives. A Content-Length beyond UPLOAD_MAX_BYTES (plus
+    multipart overhead) is rejected before reading, and a body without one is
+    cut off as soon as the file part passes the limit; either way
+    UploadTooLargeError is raised and the spool file removed.
+    """
+    content_type, options = parse_options_header(request.headers.get("content-type", ""))
+    if content_type != b"multipart/form-data" or b"boundary" not in options:
+        raise InvalidUploadError("Expected a multipart/form-data body")
+
+    content_length = request.headers.get("content-length")
+    if content_length and content_length.isdigit() and \
+            int(content_length) > settings.UPLOAD_MAX_BYTES + MULTIPART_OVERHEAD_BYTES:
+        raise UploadTooLargeError(f"Upload exceeds {settings.UPLOAD_MAX_BYTES} bytes")
+
+    os.makedirs(settings.UPLOAD_SPOOL_DIR, exist_ok=True)
+    path = os.path.join(settings.UPLOAD_SPOOL_DIR, f"{uuid.uuid4().hex}.upload")
+
+    # Parser callbacks are synchronous; they queue events handled after each write()
+    events = []
+    header = {"field": b"", "value": b""}
+
+    def on_header_field(data, start, end):
+        header["field"] += data[start:end]
+
+    def on_header_value(data, start, end):
+        header["value"] += data[start:end]
+
+    def on_header_end():
+        events.append(("header", header["field"].lower(), header["value"]))
+        header["field"] = header["value"] = b""
+
+    callbacks = {
+        "on_part_begin": lambda: events.append(("begin",)),
+        "on_part_data": lambda data, start, end: events.append(("data", data[start:end])),
+        "on_part_end": lambda: events.append(("end",)),
+        "on_header_field": on_header_field,
+        "on_header_value": on_header_value,
+        "on_header_end": on_header_end,
+        "on_headers_finished": lambda: events.append(("headers_finished",)),
+    }
+    parser = MultipartParser(options[b"boundary"], callbacks)
+
+    fields = {}
+    upload: Optional[ReceivedUpload] = None
+    part: Optional[_Part] = None
+    out = None
+    size = 0
+
+    try:
+        async for chunk in request.stream():
+            parser.write(chunk)
+            for event in events:
+                kind = event[0]
+                if kind == "begin":
+                    part = _Part()
+                elif kind == "header":
+                    part.headers[event[1]] = event[2]
+                elif kind == "headers_finished":
+                    _, disposition = parse_options_header(part.headers.get(b"content-disposition", b""))
+                    part.name = disposition.get(b"name", b"").decode("utf-8", "replace")
+                    if b"filename" in disposition:
+                        part.filename = disposition[b"filename"].decode("utf-8", "replace")
+                    if part.name == file_field and upload is None:
+                        out = open(path, "wb")
+                        upload = ReceivedUpload(
+                            path=path,
+                            size=0,
+                            head=b"",
+                            filename=part.filename,
+                            content_type=part.headers.get(b"content-type", b"").decode("latin-1") or None,
+                            format=None,
+                        )
+                elif kind == "data":
+                    if out is not None:
+                        size += len(event[1])
+                        if size > settings.UPLOAD_MAX_BYTES:
+                            raise UploadTooLargeError(f"Upload exceeds {settings.UPLOAD_MAX_BYTES} bytes")
+                        if len(upload.head) < HEAD_BYTES:
+                            upload.head += event[1][:HEAD_BYTES - len(upload.head)]
+                        await run_in_threadpool(out.write, event[1])
+                    elif len(part.data) + len(event[1]) > MULTIPART_OVERHEAD_BYTES:
+                        raise InvalidUploadError(f"Form field {part.name!r} is too large")
+                    else:
+                        part.data += event[1]
+                elif kind == "end":
+                    if out is not None:
+                        out.close()
+                        out = None
+                    elif part.name:
+                        fields[part.name] = part.data.decode("utf-8", "replace")
+            events.clear()
+        parser.finalize()
+
+        if upload is None:
+            raise InvalidUploadError(f"Missing file field {file_field!r}")
+        if out is not None:
+            raise InvalidUploadError("Multipart body ended inside the file part")
+    except BaseException as e:
+        if out is not None:
+            out.close()
+        document_ingestion.discard(path)
+        if isinstance(e, MultipartParseError):
+            raise InvalidUploadError(f"Malformed multipart body: {e}") from e
+        raise
+
+    upload.size = size
+    upload.format = fields.get("format") or None
+    return upload
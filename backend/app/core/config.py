@@ -1,5 +1,5 @@
 from pydantic_settings import BaseSettings
-from typing import List
+from typing import Any, Dict, List, Optional
 import os
 
 
@@ -13,14 +13,97 @@ class Settings(BaseSettings):
 
     # AI Service
     ANTHROPIC_API_KEY: str
+    ANTHROPIC_BASE_URL: Optional[str] = None
+
+    # LLM record/replay: off | record | replay | auto
+    LLM_CACHE_MODE: str = "off"
+    LLM_FIXTURES_PATH: str = "./data/llm_fixtures"
+    # Shortest prompt prefix sent with a cache_control marker: ~1024 tokens, the
+    # minimum the API caches for Sonnet, at ~4 characters per token
+    PROMPT_CACHE_MIN_PREFIX_CHARS: int = 4096
 
     # Vector Database
     CHROMA_DB_PATH: str = "./data/chroma_db"
+    # HNSW parameters of newly built case indexes; apply to an existing one with rebuild_index.py
+    HNSW_M: int = 16
+    HNSW_CONSTRUCTION_EF: int = 100
+    HNSW_SEARCH_EF: int = 10
+    HNSW_BATCH_SIZE: int = 100  # vectors buffered before insertion into the graph
 
     # Data Files
     CASES_DATA_PATH: str = "./data/malpractice_cases.csv"
+    # Memory-mapped corpus built by build_corpus.py; hydrates search hits when set
+    CASES_CORPUS_PATH: Optional[str] = None
     STANDARDS_DATA_PATH: str = "./data/clinical_standards.json"
 
+    # Long Document Chunking
+    CHUNK_THRESHOLD_CHARS: int = 6000
+    CHUNK_MAX_CHARS: int = 4000
+    CHUNK_MAX_WORKERS: int = 4
+    RETRIEVAL_BATCH_SIZE: int = 16
+    PROMPT_CASE_MAX_CHARS: int = 8000
+    PROMPT_CACHE_MAX_CASES: int = 10000  # rendered precedent snippets kept in memory
+
+    # Deadlines: whole analysis and per-step budgets (seconds)
+    ANALYSIS_DEADLINE_SECONDS: float = 90.0
+    EXTRACT_TIMEOUT_SECONDS: float = 25.0
+    RETRIEVAL_TIMEOUT_SECONDS: float = 5.0
+    RISKS_TIMEOUT_SECONDS: float = 45.0
+    MITIGATION_TIMEOUT_SECONDS: float = 30.0
+
+    # Near-duplicate reuse of prior analyses (cosine similarity of case text)
+    REUSE_ENABLED: bool = True
+    REUSE_SIMILARITY_THRESHOLD: float = 0.97
+    # Longer texts are neither matched nor indexed; the embedding model only reads ~256 tokens
+    REUSE_MAX_CHARS: int = 1000
+
+    # Coalescing: an analysis identical to a queued or running one of the same tenant joins it
+    COALESCE_ENABLED: bool = True
+
+    # Document Uploads
+    UPLOAD_MAX_BYTES: int = 50 * 1024 * 1024
+    UPLOAD_INLINE_MAX_BYTES: int = 1024 * 1024
+    UPLOAD_READ_CHUNK_BYTES: int = 64 * 1024
+    UPLOAD_SPOOL_DIR: str = "./data/uploads"
+
+    # Job Queue & Workers
+    JOB_DB_PATH: str = "./data/jobs.sqlite3"
+    CHECKPOINT_DB_PATH: str = "./data/checkpoints.sqlite3"
+    JOB_WORKER_CONCURRENCY: int = 2
+    JOB_QUEUE_MAX_PENDING: int = 100
+    JOB_LEASE_SECONDS: int = 300
+    JOB_MAX_ATTEMPTS: int = 3
+    JOB_POLL_INTERVAL_SECONDS: float = 0.5
+    JOB_DEFAULT_RETRY_AFTER_SECONDS: int = 30
+    ANALYZE_WAIT_SECONDS: float = 60.0
+    ANALYZE_POLL_MIN_SECONDS: float = 0.005
+
+    # Tenants (X-Tenant-ID header); limits of 0 are disabled
+    DEFAULT_TENANT: str = "default"
+    TENANT_DEFAULT_WEIGHT: float = 1.0
+    TENANT_DEFAULT_MAX_CONCURRENT: int = 0
+    TENANT_DEFAULT_MAX_PENDING: int = 0
+    TENANT_DEFAULT_TOKENS_PER_HOUR: int = 0
+    # Per-tenant overrides as JSON, e.g. {"ed": {"weight": 4}, "bulk-review": {"max_concurrent": 1}}
+    TENANT_QUOTAS: Dict[str, Dict[str, Any]] = {}
+
+    # Responses
+    RESPONSE_DEFAULT_VIEW: str = "full"  # full | lean, when a request has no ?view=
+    RESPONSE_COMPRESSION_MIN_BYTES: int = 1024
+    RESPONSE_GZIP_LEVEL: int = 6
+    RESPONSE_BROTLI_QUALITY: int = 5  # used when the brotli package is installed
+    CASE_CACHE_SIZE: int = 4096  # serialized GET /cases/{case_id} bodies kept in memory
+    CASE_CACHE_MAX_AGE_SECONDS: int = 3600
+
+    # Logging & Tracing
+    LOG_LEVEL: str = "INFO"
+    LOG_FORMAT: str = "json"  # json | text
+    LOG_SAMPLE_RATE: float = 1.0  # share of requests whose per-step INFO logs are kept
+    LOG_QUEUE_SIZE: int = 10000
+    TRACE_SAMPLE_RATIO: float = 1.0
+    TRACE_EXPORT_PATH: Optional[str] = None  # OTLP/JSON lines, e.g. ./data/traces.jsonl
+    OTEL_EXPORTER_OTLP_ENDPOINT: Optional[str] = None  # OTLP/gRPC collector, e.g. http://localhost:4317
+
     # CORS
     CORS_ORIGINS: List[str] = ["http://localhost:3000", "http://localhost:5173"]
 
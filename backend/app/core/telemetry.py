@@ -0,0 +1,276 @@
+import base64
+import copy
+import json
+import logging
+import logging.handlers
+import os
+import queue
+import random
+import sys
+import threading
+import time
+import zlib
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Any, Dict, Iterator, Optional, Sequence
+
+from google.protobuf.json_format import MessageToDict
+from opentelemetry import propagate, trace
+from opentelemetry.exporter.otlp.proto.common.trace_encoder import encode_spans
+from opentelemetry.sdk.resources import Resource
+from opentelemetry.sdk.trace import ReadableSpan, TracerProvider
+from opentelemetry.sdk.trace.export import BatchSpanProcessor, SpanExporter, SpanExportResult
+from opentelemetry.sdk.trace.sampling import ParentBased, TraceIdRatioBased
+
+from app.core.config import settings
+
+
+request_id_var: ContextVar[Optional[str]] = ContextVar("request_id", default=None)
+
+# INFO/DEBUG records of these loggers are sampled per request (LOG_SAMPLE_RATE)
+SAMPLED_LOGGERS = ("app.agents", "app.api.access")
+
+# Attributes every LogRecord has; anything else came in through `extra`
+_RECORD_ATTRIBUTES = set(vars(logging.makeLogRecord({}))) | {"message", "request_id", "trace_id", "span_id"}
+
+# OTLP/JSON encodes these ids as hex, protobuf JSON as base64
+_OTLP_ID_FIELDS = ("traceId", "spanId", "parentSpanId")
+
+tracer = trace.get_tracer("malpractice-risk-scanner")
+
+_listener: Optional[logging.handlers.QueueListener] = None
+_provider: Optional[TracerProvider] = None
+_configured_pid: Optional[int] = None
+
+
+class ContextFilter(logging.Filter):
+    """Stamp records with the request id and current span on the emitting thread."""
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        record.request_id = request_id_var.get()
+        span_context = trace.get_current_span().get_span_context()
+        if span_context.is_valid:
+            record.trace_id = format(span_context.trace_id, "032x")
+            record.span_id = format(span_context.span_id, "016x")
+        else:
+            record.trace_id = record.span_id = None
+        return True
+
+
+class SamplingFilter(logging.Filter):
+    """Keep INFO/DEBUG records of high-volume loggers for a share of requests.
+
+    The decision hashes the request id, so a sampled request keeps its whole
+    timeline. Warnings and errors are always kept.
+    """
+
+    def __init__(self, rate: float):
+        super().__init__()
+        self.rate = rate
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        if self.rate >= 1.0 or record.levelno >= logging.WARNING:
+            return True
+        if not record.name.startswith(SAMPLED_LOGGERS):
+            return True
+        key = getattr(record, "request_id", None) or getattr(record, "trace_id", None)
+        if key is None:
+            return random.random() < self.rate
+        return zlib.crc32(key.encode()) % 10_000 < self.rate * 10_000
+
+
+class JsonFormatter(logging.Formatter):
+    """One JSON object per line: time, level, logger, message, ids and `extra` fields."""
+
+    def __init__(self, service: str):
+        super().__init__()
+        self.service = service
+
+    def format(self, record: logging.LogRecord) -> str:
+        entry: Dict[str, Any] = {
+            "ts": time.strftime("%Y-%m-%dT%H:%M:%S", time.gmtime(record.created))
+                  + f".{int(record.msecs):03d}Z",
+            "level": record.levelname,
+            "service": self.service,
+            "logger": record.name,
+            "message": record.getMessage(),
+            "request_id": getattr(record, "request_id", None),
+            "trace_id": getattr(record, "trace_id", None),
+            "span_id": getattr(record, "span_id", None),
+        }
+        for key, value in record.__dict__.items():
+            if key not in _RECORD_ATTRIBUTES:
+                entry[key] = value
+        if record.exc_text:
+            entry["exception"] = record.exc_text
+        return json.dumps(entry, default=str)
+
+
+class NonBlockingQueueHandler(logging.handlers.QueueHandler):
+    """Hand records to the listener thread; drop (and count) them when the queue is full."""
+
+    def __init__(self, log_queue: queue.Queue):
+        super().__init__(log_queue)
+        self.dropped = 0
+
+    def enqueue(self, record: logging.LogRecord):
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            self.dropped += 1
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        # Formatting is left to the listener thread; only freeze the message
+        record = copy.copy(record)
+        record.msg = record.getMessage()
+        record.args = None
+        if record.exc_info:
+            record.exc_text = logging.Formatter().formatException(record.exc_info)
+            record.exc_info = None
+        return record
+
+
+class OTLPJsonFileExporter(SpanExporter):
+    """Append span batches as OTLP/JSON lines.
+
+    Each line is an ExportTraceServiceRequest, the format read by the
+    OpenTelemetry Collector's otlpjsonfile receiver.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self._lock = threading.Lock()
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+
+    def export(self, spans: Sequence[ReadableSpan]) -> SpanExportResult:
+        message = MessageToDict(encode_spans(spans), use_integers_for_enums=True)
+        line = json.dumps(_hex_ids(message), separators=(",", ":")) + "\n"
+        try:
+            with self._lock, open(self.path, "a", encoding="utf-8") as f:
+                f.write(line)
+        except OSError:
+            return SpanExportResult.FAILURE
+        return SpanExportResult.SUCCESS
+
+    def shutdown(self):
+        pass
+
+
+def _hex_ids(value: Any) -> Any:
+    """Rewrite base64 trace/span ids of a protobuf JSON dict as OTLP/JSON hex."""
+    if isinstance(value, dict):
+        return {
+            key: base64.b64decode(item).hex() if key in _OTLP_ID_FIELDS and isinstance(item, str) else _hex_ids(item)
+            for key, item in value.items()
+        }
+    if isinstance(value, list):
+        return [_hex_ids(item) for item in value]
+    return value
+
+
+def configure_telemetry(service: str):
+    """Install queue-based JSON logging and the span exporters for this process.
+
+    A forked child calls this again: it needs its own listener thread, while
+    the inherited span processors restart their export threads after fork.
+    """
+    global _listener, _provider, _configured_pid
+    if _configured_pid == os.getpid():
+        return
+    forked = _configured_pid is not None
+    _configured_pid = os.getpid()
+
+    output = logging.StreamHandler(sys.stdout)
+    if settings.LOG_FORMAT == "json":
+        output.setFormatter(JsonFormatter(service))
+    else:
+        output.setFormatter(logging.Formatter("%(asctime)s %(levelname)s %(name)s [%(request_id)s] %(message)s"))
+
+    log_queue: queue.Queue = queue.Queue(maxsize=settings.LOG_QUEUE_SIZE)
+    handler = NonBlockingQueueHandler(log_queue)
+    handler.addFilter(ContextFilter())
+    handler.addFilter(SamplingFilter(settings.LOG_SAMPLE_RATE))
+
+    root = logging.getLogger()
+    root.handlers = [handler]
+    root.setLevel(settings.LOG_LEVEL)
+    _listener = logging.handlers.QueueListener(log_queue, output, respect_handler_level=True)
+    _listener.start()
+
+    if forked:
+        return
+
+    _provider = TracerProvider(
+        resource=Resource.create({"service.name": service}),
+        sampler=ParentBased(TraceIdRatioBased(settings.TRACE_SAMPLE_RATIO))
+    )
+    if settings.TRACE_EXPORT_PATH:
+        _provider.add_span_processor(BatchSpanProcessor(OTLPJsonFileExporter(settings.TRACE_EXPORT_PATH)))
+    if settings.OTEL_EXPORTER_OTLP_ENDPOINT:
+        from opentelemetry.exporter.otlp.proto.grpc.trace_exporter import OTLPSpanExporter
+        _provider.add_span_processor(
+            BatchSpanProcessor(OTLPSpanExporter(endpoint=settings.OTEL_EXPORTER_OTLP_ENDPOINT))
+        )
+    trace.set_tracer_provider(_provider)
+
+
+def shutdown_telemetry():
+    """Flush pending spans and log records."""
+    global _listener, _provider, _configured_pid
+    if _provider is not None:
+        _provider.shutdown()
+        _provider = None
+    if _listener is not None:
+        _listener.stop()
+        _listener = None
+    _configured_pid = None
+
+
+@contextmanager
+def request_context(request_id: Optional[str]) -> Iterator[None]:
+    """Bind a request id to every log record emitted in this context."""
+    token = request_id_var.set(request_id)
+    try:
+        yield
+    finally:
+        request_id_var.reset(token)
+
+
+@contextmanager
+def span(name: str, **attributes: Any) -> Iterator[trace.Span]:
+    """Start a child span of the current one; None attributes are skipped."""
+    with tracer.start_as_current_span(
+        name, attributes={k: v for k, v in attributes.items() if v is not None}
+    ) as current:
+        yield current
+
+
+def trace_carrier() -> Dict[str, str]:
+    """Request id and W3C trace context to hand to another process."""
+    carrier: Dict[str, str] = {}
+    propagate.inject(carrier)
+    request_id = request_id_var.get()
+    if request_id:
+        carrier["request_id"] = request_id
+    return carrier
+
+
+@contextmanager
+def continue_trace(
+    carrier: Optional[Dict[str, str]],
+    name: str,
+    kind: trace.SpanKind = trace.SpanKind.CONSUMER,
+    **attributes: Any
+) -> Iterator[trace.Span]:
+    """Resume a trace_carrier() (or incoming headers) as a new span with the same request id."""
+    carrier = carrier or {}
+    with request_context(carrier.get("request_id")):
+        with tracer.start_as_current_span(
+            name,
+            context=propagate.extract(carrier),
+            kind=kind,
+            attributes={k: v for k, v in attributes.items() if v is not None}
+        ) as current:
+            yield current
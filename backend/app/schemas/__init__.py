@@ -7,11 +7,15 @@ from .risk_assessment import (
     Impact,
     PatientInfo,
     SimilarCase,
+    CaseReference,
+    CaseDetail,
     IdentifiedRisk,
     Recommendation,
     EvidenceItem,
     AnalysisMetrics,
     RiskVisualizationData,
+    DegradedPart,
+    ReusedAnalysis,
     CaseAnalysisRequest,
     CaseAnalysisResponse,
 )
@@ -25,11 +29,15 @@ __all__ = [
     "Impact",
     "PatientInfo",
     "SimilarCase",
+    "CaseReference",
+    "CaseDetail",
     "IdentifiedRisk",
     "Recommendation",
     "EvidenceItem",
     "AnalysisMetrics",
     "RiskVisualizationData",
+    "DegradedPart",
+    "ReusedAnalysis",
     "CaseAnalysisRequest",
     "CaseAnalysisResponse",
 ]
@@ -61,6 +61,7 @@ class PatientInfo(BaseModel):
 
 class SimilarCase(BaseModel):
     """Similar malpractice case."""
+    case_id: Optional[str] = None
     case_name: str
     year: int
     specialty: str
@@ -71,6 +72,28 @@ class SimilarCase(BaseModel):
     similarity_score: float
 
 
+class CaseReference(BaseModel):
+    """Similar case in a lean response; the full record is at `href`."""
+    case_id: str
+    case_name: str
+    year: int
+    verdict: str
+    similarity_score: float
+    href: str
+
+
+class CaseDetail(BaseModel):
+    """A case of the precedent corpus, as served by GET /cases/{case_id}."""
+    case_id: str
+    case_name: str
+    year: int
+    specialty: str
+    facts: str
+    verdict: str
+    key_error: str
+    settlement: Optional[str] = None
+
+
 class IdentifiedRisk(BaseModel):
     """Individual risk identified."""
     type: RiskType
@@ -118,6 +141,19 @@ class RiskVisualizationData(BaseModel):
     color: str
 
 
+class DegradedPart(BaseModel):
+    """Part of a result that fell back because its step timed out or failed."""
+    part: str  # patient_info | similar_cases | mitigation
+    reason: str  # timeout | error | partial
+    detail: Optional[str] = None
+
+
+class ReusedAnalysis(BaseModel):
+    """Prior analysis whose risk list was reused for a near-duplicate case."""
+    job_id: str
+    similarity: float
+
+
 class CaseAnalysisRequest(BaseModel):
     """Request for case analysis."""
     case_description: str = Field(..., min_length=10)
@@ -133,6 +169,10 @@ class CaseAnalysisResponse(BaseModel):
     protective_documentation: str = ""
     estimated_liability_range: Optional[str] = None
     plaintiff_win_probability: Optional[float] = None
+    # Set when the Step 3 risks came from a near-duplicate prior analysis of the same tenant
+    reused_from: Optional[ReusedAnalysis] = None
+    # Empty when every step completed within its budget
+    degraded: List[DegradedPart] = Field(default_factory=list)
 
     # Frontend-specific fields
     riskScore: int = Field(ge=0, le=100)
@@ -1,9 +1,61 @@
-from .vector_db import vector_db, VectorDatabase
+from .vector_db import vector_db, VectorDatabase, CaseHit
 from .clinical_standards import clinical_standards, ClinicalStandardsService
+from .case_corpus import CaseCorpus, convert_csv
+from .chunking import chart_chunker, ChartChunker, CaseChunk
+from .ingestion import (
+    document_ingestion,
+    DocumentIngestionService,
+    UploadTooLargeError,
+    UnsupportedDocumentError,
+)
+from .job_store import job_store, JobStore, QueueFullError, TenantQuotaError, analysis_input_key
+from .tenancy import resolve_tenant, tenant_quota, TenantQuota, InvalidTenantError
+from .llm_client import llm_client, LLMClient, FixtureMissError
+from .prompts import (
+    prompt_cache,
+    PromptContextCache,
+    PromptTemplate,
+    PROMPTS_VERSION,
+    EXTRACT_PATIENT_INFO_PROMPT,
+    IDENTIFY_RISKS_PROMPT,
+    GENERATE_MITIGATION_PROMPT,
+)
+from .analysis_reuse import analysis_reuse, AnalysisReuseIndex
 
 __all__ = [
     "vector_db",
     "VectorDatabase",
+    "CaseHit",
+    "CaseCorpus",
+    "convert_csv",
     "clinical_standards",
     "ClinicalStandardsService",
+    "chart_chunker",
+    "ChartChunker",
+    "CaseChunk",
+    "document_ingestion",
+    "DocumentIngestionService",
+    "UploadTooLargeError",
+    "UnsupportedDocumentError",
+    "job_store",
+    "JobStore",
+    "QueueFullError",
+    "TenantQuotaError",
+    "analysis_input_key",
+    "resolve_tenant",
+    "tenant_quota",
+    "TenantQuota",
+    "InvalidTenantError",
+    "llm_client",
+    "LLMClient",
+    "FixtureMissError",
+    "prompt_cache",
+    "PromptContextCache",
+    "PromptTemplate",
+    "PROMPTS_VERSION",
+    "EXTRACT_PATIENT_INFO_PROMPT",
+    "IDENTIFY_RISKS_PROMPT",
+    "GENERATE_MITIGATION_PROMPT",
+    "analysis_reuse",
+    "AnalysisReuseIndex",
 ]
@@ -0,0 +1,121 @@
+import json
+import time
+from typing import Any, Dict, Optional
+from app.core.config import settings
+from app.schemas import IdentifiedRisk
+from .vector_db import vector_db
+from .prompts import PROMPTS_VERSION
+
+
+# State fields a near-duplicate can reuse. Patient info (Step 1) and the
+# mitigation note (Step 5) describe the individual patient and are always
+# produced for the new case; only the risk list (Step 3), and with it the score,
+# carries over.
+REUSABLE_FIELDS = ("identified_risks",)
+
+
+class AnalysisReuseIndex:
+    """Embeddings of previously analyzed case descriptions, stored with their risk lists.
+
+    Entries belong to the tenant whose job produced them and are only matched
+    for that tenant. Only texts of at most max_chars take part: the embedding
+    model truncates its input, so two longer texts sharing their beginning
+    would match at ~1.0 however much their remainder differs.
+    """
+
+    def __init__(
+        self,
+        enabled: Optional[bool] = None,
+        threshold: Optional[float] = None,
+        max_chars: Optional[int] = None
+    ):
+        self.enabled = settings.REUSE_ENABLED if enabled is None else enabled
+        self.threshold = threshold or settings.REUSE_SIMILARITY_THRESHOLD
+        self.max_chars = max_chars or settings.REUSE_MAX_CHARS
+        self.collection_name = "analyzed_cases"
+        self.collection = None
+
+    def initialize(self):
+        """Open the index in the case database, with the same embedding function."""
+        kwargs = {}
+        if vector_db.embedding_function is not None:
+            kwargs["embedding_function"] = vector_db.embedding_function
+
+        self.collection = vector_db.client.get_or_create_collection(
+            name=self.collection_name,
+            metadata={"hnsw:space": "cosine"},
+            **kwargs
+        )
+
+    def find(self, case_description: str, tenant: Optional[str]) -> Optional[Dict[str, Any]]:
+        """Closest prior analysis of the tenant at or above the similarity threshold.
+
+        Only analyses produced by the current prompt templates are considered.
+        Returns {"job_id", "similarity", "outputs"} with the stored state fields
+        rebuilt as models, or None.
+        """
+        if not self.enabled or not tenant or self.collection is None or len(case_description) > self.max_chars:
+            return None
+        if self.collection.count() == 0:
+            return None
+
+        results = self.collection.query(
+            query_texts=[case_description],
+            n_results=1,
+            where={"$and": [{"tenant": tenant}, {"prompt_version": PROMPTS_VERSION}]}
+        )
+        if not (results['ids'] and results['ids'][0]):
+            return None
+
+        similarity = round(1 - results['distances'][0][0], 4)
+        if similarity < self.threshold:
+            return None
+
+        stored = json.loads(results['metadatas'][0][0]['outputs'])
+        outputs = {
+            "identified_risks": [IdentifiedRisk(**risk) for risk in stored.get("identified_risks") or []],
+        }
+        return {"job_id": results['ids'][0][0], "similarity": similarity, "outputs": outputs}
+
+    def add(self, job_id: str, tenant: str, state: Dict[str, Any]):
+        """Index a freshly analyzed case of a tenant with the outputs a near-duplicate may reuse.
+
+        Cases longer than max_chars or split into several chunks are skipped.
+        """
+        if not self.enabled or self.collection is None:
+            return
+        if len(state['case_description']) > self.max_chars or len(state.get('case_chunks') or []) > 1:
+            return
+
+        outputs = {}
+        for field in REUSABLE_FIELDS:
+            value = state.get(field)
+            if isinstance(value, list):
+                value = [item.model_dump(mode="json") if hasattr(item, "model_dump") else item for item in value]
+            elif hasattr(value, "model_dump"):
+                value = value.model_dump(mode="json")
+            outputs[field] = value
+
+        self.collection.upsert(
+            ids=[job_id],
+            documents=[state['case_description']],
+            metadatas=[{
+                "outputs": json.dumps(outputs),
+                "tenant": tenant,
+                "prompt_version": PROMPTS_VERSION,
+                "created_at": time.time(),
+            }]
+        )
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Index size and current threshold."""
+        return {
+            "enabled": self.enabled,
+            "threshold": self.threshold,
+            "max_chars": self.max_chars,
+            "indexed_analyses": self.collection.count() if self.collection is not None else 0,
+        }
+
+
+# Singleton instance
+analysis_reuse = AnalysisReuseIndex()
@@ -0,0 +1,236 @@
+import csv
+import json
+import logging
+import math
+import os
+import re
+import shutil
+import uuid
+from array import array
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+import numpy as np
+
+
+CORPUS_FORMAT_VERSION = 2
+
+# Column name -> header in the malpractice_cases.csv schema
+CSV_COLUMNS = {
+    "case_name": "Case Name",
+    "year": "Year",
+    "specialty": "Specialty",
+    "facts": "Facts",
+    "verdict": "Verdict",
+    "key_error": "Key Error",
+    "settlement": "Settlement",
+}
+TEXT_COLUMNS = ("case_name", "facts", "key_error")
+# Settlement text as written in the CSV ("$1.2M (remitted)", "Confidential"), next to the parsed amount
+SETTLEMENT_TEXT_COLUMN = "settlement_text"
+STORED_TEXT_COLUMNS = TEXT_COLUMNS + (SETTLEMENT_TEXT_COLUMN,)
+CATEGORY_COLUMNS = ("specialty", "verdict")
+
+# Leading amount; annotations after it ("$1.2M (remitted)") are kept only in the text column.
+# The lookahead keeps "$1.2Million" from matching as $1 by backtracking into the number.
+SETTLEMENT_PATTERN = re.compile(r"^\$?\s*([\d,]+(?:\.\d+)?)\s*([KMB])?(?![A-Za-z\d]|[.,]\d)", re.IGNORECASE)
+SETTLEMENT_UNITS = {None: 1.0, "K": 1e3, "M": 1e6, "B": 1e9}
+
+logger = logging.getLogger(__name__)
+
+
+def parse_settlement(text: Optional[str]) -> float:
+    """Dollar amount of a settlement such as "$2.3M" or "$1.2M (remitted)"; NaN when absent or unparseable."""
+    match = SETTLEMENT_PATTERN.match((text or "").strip())
+    if not match:
+        return math.nan
+    unit = match.group(2).upper() if match.group(2) else None
+    return float(match.group(1).replace(",", "")) * SETTLEMENT_UNITS[unit]
+
+
+class CaseCorpus:
+    """Read-only columnar case corpus backed by memory-mapped files.
+
+    Layout of a corpus directory:
+    - manifest.json: format version, build id, row count and category dictionaries
+    - <text column>.bin / <text column>.offsets.npy: UTF-8 blob and row offsets,
+      including settlement_text, the settlement exactly as the CSV had it
+    - year.npy, settlement.npy: numeric columns (settlement in dollars, NaN if none)
+    - specialty.npy, verdict.npy: dictionary codes
+
+    Nothing is read until a row or column is touched; only the requested rows'
+    text is decoded.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        with open(os.path.join(path, "manifest.json"), "r", encoding="utf-8") as f:
+            self.manifest = json.load(f)
+        if self.manifest.get("version") != CORPUS_FORMAT_VERSION:
+            raise ValueError(
+                f"Unsupported corpus version {self.manifest.get('version')} in {path}; "
+                "rebuild it with build_corpus.py"
+            )
+
+        self.dictionaries: Dict[str, List[str]] = self.manifest["dictionaries"]
+        self.years = self._load_array("year")
+        self.settlements = self._load_array("settlement")
+        self.codes = {column: self._load_array(column) for column in CATEGORY_COLUMNS}
+        self._offsets = {column: self._load_array(f"{column}.offsets") for column in STORED_TEXT_COLUMNS}
+        self._blobs = {column: self._map_blob(column) for column in STORED_TEXT_COLUMNS}
+
+    @property
+    def version(self) -> str:
+        """Identity of this build of the corpus (a rebuild rewrites the manifest)."""
+        stat = os.stat(os.path.join(self.path, "manifest.json"))
+        return f"{self.manifest['count']}-{stat.st_mtime_ns}"
+
+    @property
+    def build_id(self) -> str:
+        """Id stamped on index entries so hits are never resolved against another build's rows."""
+        return self.manifest.get("build") or self.version
+
+    def __len__(self) -> int:
+        return self.manifest["count"]
+
+    def text(self, column: str, row: int) -> str:
+        """Decode one text value."""
+        offsets = self._offsets[column]
+        start, end = int(offsets[row]), int(offsets[row + 1])
+        return self._blobs[column][start:end].tobytes().decode("utf-8")
+
+    def category(self, column: str, row: int) -> str:
+        """Dictionary-decoded category value."""
+        return self.dictionaries[column][int(self.codes[column][row])]
+
+    def case(self, row: int) -> Dict[str, Any]:
+        """Metadata of one case in the shape stored by VectorDatabase."""
+        return {
+            'case_name': self.text("case_name", row),
+            'year': int(self.years[row]),
+            'specialty': self.category("specialty", row),
+            'facts': self.text("facts", row),
+            'verdict': self.category("verdict", row),
+            'key_error': self.text("key_error", row),
+            'settlement': self.text(SETTLEMENT_TEXT_COLUMN, row),
+        }
+
+    def iter_batches(self, batch_size: int) -> Iterator[Tuple[int, List[str], List[Dict[str, Any]]]]:
+        """Yield (first row, documents, index metadata) with only one batch decoded at a time."""
+        build_id = self.build_id
+        for start in range(0, len(self), batch_size):
+            rows = range(start, min(start + batch_size, len(self)))
+            documents = [self.text("facts", row) for row in rows]
+            metadatas = [
+                {
+                    'row': row,
+                    'corpus': build_id,
+                    'year': int(self.years[row]),
+                    'specialty': self.category("specialty", row),
+                    'verdict': self.category("verdict", row),
+                }
+                for row in rows
+            ]
+            yield start, documents, metadatas
+
+    def stats(self) -> Dict[str, Any]:
+        """Aggregate statistics computed on the mapped numeric and code columns."""
+        settled = self.settlements[~np.isnan(self.settlements)]
+        stats: Dict[str, Any] = {
+            "total_cases": len(self),
+            "year_range": [int(self.years.min()), int(self.years.max())] if len(self) else None,
+            "settlements": {
+                "count": int(settled.size),
+                "total": float(settled.sum()),
+                "median": float(np.median(settled)) if settled.size else None,
+            },
+        }
+        for column in CATEGORY_COLUMNS:
+            counts = np.bincount(self.codes[column], minlength=len(self.dictionaries[column]))
+            stats[f"by_{column}"] = {
+                value: int(count) for value, count in zip(self.dictionaries[column], counts)
+            }
+        return stats
+
+    def _load_array(self, name: str) -> np.ndarray:
+        return np.load(os.path.join(self.path, f"{name}.npy"), mmap_mode="r")
+
+    def _map_blob(self, column: str) -> np.ndarray:
+        path = os.path.join(self.path, f"{column}.bin")
+        if os.path.getsize(path) == 0:
+            # mmap cannot map an empty file
+            return np.empty(0, dtype=np.uint8)
+        return np.memmap(path, dtype=np.uint8, mode="r")
+
+
+def convert_csv(csv_path: str, output_dir: str) -> int:
+    """One-time conversion of a malpractice_cases.csv file into a corpus directory.
+
+    Rows are streamed, so the CSV never has to fit in memory. The corpus is
+    built next to output_dir and moved into place when complete. Rows without
+    a valid year are logged and skipped; returns the number of rows kept.
+    """
+    tmp_dir = f"{output_dir.rstrip(os.sep)}.tmp"
+    shutil.rmtree(tmp_dir, ignore_errors=True)
+    os.makedirs(tmp_dir)
+
+    blobs = {column: open(os.path.join(tmp_dir, f"{column}.bin"), "wb") for column in STORED_TEXT_COLUMNS}
+    offsets = {column: array("Q", [0]) for column in STORED_TEXT_COLUMNS}
+    years = array("i")
+    settlements = array("d")
+    codes = {column: array("I") for column in CATEGORY_COLUMNS}
+    lookups: Dict[str, Dict[str, int]] = {column: {} for column in CATEGORY_COLUMNS}
+
+    count = 0
+    skipped = 0
+    try:
+        with open(csv_path, "r", newline="", encoding="utf-8") as f:
+            reader = csv.DictReader(f)
+            for record in reader:
+                try:
+                    year = int(str(record[CSV_COLUMNS["year"]]).strip())
+                except (TypeError, ValueError):
+                    logger.warning(
+                        "Skipping case without a valid year",
+                        extra={"line": reader.line_num, "year": record[CSV_COLUMNS["year"]]}
+                    )
+                    skipped += 1
+                    continue
+
+                settlement = record.get(CSV_COLUMNS["settlement"])
+                values = {column: record[CSV_COLUMNS[column]] for column in TEXT_COLUMNS}
+                values[SETTLEMENT_TEXT_COLUMN] = "N/A" if settlement is None else settlement
+                for column in STORED_TEXT_COLUMNS:
+                    data = str(values[column]).encode("utf-8")
+                    blobs[column].write(data)
+                    offsets[column].append(offsets[column][-1] + len(data))
+                years.append(year)
+                settlements.append(parse_settlement(settlement))
+                for column in CATEGORY_COLUMNS:
+                    lookup = lookups[column]
+                    codes[column].append(lookup.setdefault(str(record[CSV_COLUMNS[column]]), len(lookup)))
+                count += 1
+    finally:
+        for blob in blobs.values():
+            blob.close()
+
+    if skipped:
+        logger.warning("Skipped cases without a valid year", extra={"skipped": skipped, "converted": count})
+
+    for column in STORED_TEXT_COLUMNS:
+        np.save(os.path.join(tmp_dir, f"{column}.offsets.npy"), np.frombuffer(offsets[column], dtype=np.uint64))
+    np.save(os.path.join(tmp_dir, "year.npy"), np.frombuffer(years, dtype=np.int32))
+    np.save(os.path.join(tmp_dir, "settlement.npy"), np.frombuffer(settlements, dtype=np.float64))
+    for column in CATEGORY_COLUMNS:
+        np.save(os.path.join(tmp_dir, f"{column}.npy"), np.frombuffer(codes[column], dtype=np.uint32))
+
+    with open(os.path.join(tmp_dir, "manifest.json"), "w", encoding="utf-8") as f:
+        json.dump({
+            "version": CORPUS_FORMAT_VERSION,
+            "build": uuid.uuid4().hex,
+            "count": count,
+            "source": os.path.basename(csv_path),
+            "dictionaries": {column: list(lookups[column]) for column in CATEGORY_COLUMNS},
+        }, f, indent=2)
+
+    shutil.rmtree(output_dir, ignore_errors=True)
+    os.replace(tmp_dir, output_dir)
+    return count
@@ -0,0 +1,113 @@
+import re
+from dataclasses import dataclass
+from typing import List, Optional
+from app.core.config import settings
+
+
+# Section headers in ED charts: short lines such as "HPI:", "NURSING NOTES",
+# "Labs / Imaging:" that sit on their own line.
+SECTION_HEADER_PATTERN = re.compile(
+    r"^[ \t]*([A-Za-z][A-Za-z0-9 /&()\-]{1,48}:|[A-Z][A-Z0-9 /&()\-]{2,48})[ \t]*$",
+    re.MULTILINE
+)
+
+
+@dataclass
+class CaseChunk:
+    """A contiguous section of a chart document, as offsets into the document.
+
+    Chunks are carried in workflow state and checkpoints; holding offsets
+    instead of text keeps them from duplicating the document.
+    """
+    index: int
+    title: str
+    start: int
+    end: int
+
+    def text_in(self, document: str) -> str:
+        """Text of this chunk in the document it was split from."""
+        return document[self.start:self.end]
+
+
+class ChartChunker:
+    """Section-aware splitter for long chart documents."""
+
+    def __init__(
+        self,
+        max_chars: Optional[int] = None,
+        threshold_chars: Optional[int] = None
+    ):
+        self.max_chars = max_chars or settings.CHUNK_MAX_CHARS
+        self.threshold_chars = threshold_chars or settings.CHUNK_THRESHOLD_CHARS
+
+    def needs_chunking(self, text: str) -> bool:
+        """Check whether a document is long enough to be chunked."""
+        return len(text) > self.threshold_chars
+
+    def split(self, text: str) -> List[CaseChunk]:
+        """Split a document into chunks aligned to section boundaries."""
+        if not self.needs_chunking(text):
+            return [CaseChunk(index=0, title="Case", start=0, end=len(text))]
+
+        chunks: List[CaseChunk] = []
+        pending_title = None
+        pending_start = None
+        pending_end = None
+
+        for title, start, end in self._iter_sections(text):
+            for piece_start, piece_end in self._split_oversized(text, start, end):
+                # Pack small neighbouring sections together up to max_chars
+                if pending_start is not None and piece_end - pending_start <= self.max_chars:
+                    pending_end = piece_end
+                    continue
+
+                if pending_start is not None:
+                    self._append_chunk(chunks, text, pending_title, pending_start, pending_end)
+                pending_title, pending_start, pending_end = title, piece_start, piece_end
+
+        if pending_start is not None:
+            self._append_chunk(chunks, text, pending_title, pending_start, pending_end)
+
+        return chunks
+
+    def _iter_sections(self, text: str):
+        """Yield (title, start, end) offsets for each section of the text."""
+        headers = list(SECTION_HEADER_PATTERN.finditer(text))
+
+        if not headers or headers[0].start() > 0:
+            first_end = headers[0].start() if headers else len(text)
+            yield "Case", 0, first_end
+
+        for i, match in enumerate(headers):
+            end = headers[i + 1].start() if i + 1 < len(headers) else len(text)
+            yield match.group(1).strip().rstrip(':'), match.start(), end
+
+    def _split_oversized(self, text: str, start: int, end: int):
+        """Yield (start, end) pieces of a section no longer than max_chars."""
+        while end - start > self.max_chars:
+            limit = start + self.max_chars
+            # Prefer a paragraph break, then a line break, then any whitespace
+            cut = -1
+            for separator in ("\n\n", "\n", " "):
+                cut = text.rfind(separator, start + self.max_chars // 2, limit)
+                if cut != -1:
+                    break
+            if cut == -1:
+                cut = limit
+            yield start, cut
+            start = cut
+        if end > start:
+            yield start, end
+
+    def _append_chunk(self, chunks: List[CaseChunk], text: str, title: str, start: int, end: int):
+        """Append a chunk, without surrounding whitespace, unless it is only whitespace."""
+        piece = text[start:end]
+        stripped = piece.lstrip()
+        if stripped.strip():
+            start += len(piece) - len(stripped)
+            end = start + len(stripped.rstrip())
+            chunks.append(CaseChunk(index=len(chunks), title=title, start=start, end=end))
+
+
+# Singleton instance
+chart_chunker = ChartChunker()
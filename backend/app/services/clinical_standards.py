@@ -1,13 +1,19 @@
+import hashlib
 import json
+import logging
 from typing import Dict, Any, List
 from app.core.config import settings
 
+logger = logging.getLogger(__name__)
+
 
 class ClinicalStandardsService:
     """Service for loading and querying clinical standards."""
 
     def __init__(self):
         self.standards: Dict[str, Any] = {}
+        # Content hash of the loaded standards; cached prompt blocks key on it
+        self.version = "empty"
 
     def load_standards(self, json_path: str = None):
         """Load clinical standards from JSON file."""
@@ -15,21 +21,31 @@ class ClinicalStandardsService:
             json_path = settings.STANDARDS_DATA_PATH
 
         try:
-            with open(json_path, 'r', encoding='utf-8') as f:
-                self.standards = json.load(f)
-            print(f"✅ Loaded clinical standards for {len(self.standards)} chief complaints")
+            with open(json_path, 'rb') as f:
+                data = f.read()
+            self.standards = json.loads(data)
+            self.version = hashlib.sha256(data).hexdigest()[:12]
+            logger.info(
+                "Loaded clinical standards",
+                extra={"chief_complaints": len(self.standards), "standards_version": self.version}
+            )
         except FileNotFoundError:
-            print(f"⚠️  Standards file not found at {json_path}, using empty standards")
+            logger.warning("Standards file not found, using empty standards", extra={"path": json_path})
             self.standards = {}
-        except Exception as e:
-            print(f"❌ Error loading standards: {e}")
+            self.version = "empty"
+        except Exception:
+            logger.exception("Error loading standards", extra={"path": json_path})
             self.standards = {}
+            self.version = "empty"
+
+    @staticmethod
+    def standard_key(chief_complaint: str) -> str:
+        """Normalized lookup key (lowercase, spaces replaced with underscores)."""
+        return chief_complaint.lower().replace(' ', '_')
 
     def get_standard(self, chief_complaint: str) -> Dict[str, Any]:
         """Get clinical standard for a specific chief complaint."""
-        # Normalize the key (lowercase, replace spaces with underscores)
-        key = chief_complaint.lower().replace(' ', '_')
-        return self.standards.get(key, {})
+        return self.standards.get(self.standard_key(chief_complaint), {})
 
     def get_required_workup(self, chief_complaint: str) -> List[str]:
         """Get required workup for a chief complaint."""
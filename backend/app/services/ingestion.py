@@ -0,0 +1,236 @@
+import io
+import os
+import re
+import xml.etree.ElementTree as ET
+from typing import BinaryIO, Iterator, List, Optional
+from app.core.config import settings
+
+
+SUPPORTED_FORMATS = ("text", "pdf_text", "hl7", "ccd")
+
+# Running headers/footers left behind by PDF text extraction
+PDF_PAGE_LINE_PATTERN = re.compile(r"^\s*(page\s+)?\d+(\s*(of|/)\s*\d+)?\s*$", re.IGNORECASE)
+
+# HL7 v2 segments that carry clinically useful free text or observations
+HL7_SEGMENT_LABELS = {
+    "PID": "Patient",
+    "PV1": "Visit",
+    "DG1": "Diagnosis",
+    "OBR": "Order",
+    "OBX": "Result",
+    "NTE": "Note",
+    "AL1": "Allergy",
+    "RXA": "Medication",
+}
+
+# CDA narrative elements that end a line of text
+CCD_BLOCK_TAGS = {"paragraph", "item", "tr", "br", "caption"}
+
+
+class UploadTooLargeError(ValueError):
+    """Raised when an uploaded document exceeds UPLOAD_MAX_BYTES."""
+
+
+class UnsupportedDocumentError(ValueError):
+    """Raised when an uploaded document cannot be parsed."""
+
+
+class DocumentIngestionService:
+    """Streaming parsers that turn uploaded chart documents into case text."""
+
+    def detect_format(
+        self,
+        filename: Optional[str],
+        content_type: Optional[str],
+        head: bytes
+    ) -> str:
+        """Detect the document format from its name, content type and first bytes."""
+        name = (filename or "").lower()
+        content_type = (content_type or "").lower()
+        stripped = head.lstrip(b"\xef\xbb\xbf \t\r\n")
+
+        if stripped.startswith(b"%PDF"):
+            raise UnsupportedDocumentError(
+                "Binary PDF uploads are not supported; upload the extracted text instead"
+            )
+        if stripped.startswith(b"MSH|") or name.endswith(".hl7") or "hl7" in content_type:
+            return "hl7"
+        if (
+            stripped.startswith(b"<")
+            or name.endswith((".xml", ".ccd", ".ccda"))
+            or content_type.endswith("xml")
+        ):
+            return "ccd"
+        if b"\f" in head or name.endswith(".pdf.txt"):
+            return "pdf_text"
+        if content_type and not content_type.startswith("text/") and content_type != "application/octet-stream":
+            raise UnsupportedDocumentError(f"Unsupported content type: {content_type}")
+        return "text"
+
+    def normalize(self, stream: BinaryIO, fmt: str) -> str:
+        """Parse a binary stream incrementally and return normalized case text."""
+        if fmt == "ccd":
+            lines = self._iter_ccd_lines(stream)
+        elif fmt == "hl7":
+            lines = self._iter_hl7_lines(self._iter_text_lines(stream))
+        elif fmt == "pdf_text":
+            lines = self._iter_pdf_text_lines(self._iter_text_lines(stream))
+        elif fmt == "text":
+            lines = (line.rstrip() for line in self._iter_text_lines(stream))
+        else:
+            raise UnsupportedDocumentError(f"Unsupported document format: {fmt}")
+
+        text = "\n".join(lines)
+        # Collapse the blank-line runs that extraction tools leave behind
+        return re.sub(r"\n{3,}", "\n\n", text).strip()
+
+    def normalize_file(self, path: str, fmt: str) -> str:
+        """Normalize a document that has been spooled to disk."""
+        with open(path, "rb") as stream:
+            return self.normalize(stream, fmt)
+
+    def _iter_text_lines(self, stream: BinaryIO) -> Iterator[str]:
+        """Decode a binary stream chunk by chunk and yield lines, enforcing the size limit.
+
+        Universal newlines end a line at \n, \r\n or a bare \r (HL7's segment
+        terminator), also when a \r\n pair straddles two chunks.
+        """
+        limited = io.BufferedReader(
+            _LimitedReader(stream, settings.UPLOAD_MAX_BYTES), settings.UPLOAD_READ_CHUNK_BYTES
+        )
+        # Closing the wrappers leaves the caller's stream open
+        for line in io.TextIOWrapper(limited, encoding="utf-8-sig", errors="replace", newline=None):
+            yield line.rstrip("\n")
+
+    def _iter_pdf_text_lines(self, lines: Iterator[str]) -> Iterator[str]:
+        """Clean PDF-extracted text: page breaks, page numbers and hyphenated line breaks."""
+        carry = ""
+
+        for raw in lines:
+            for line in raw.split("\f"):
+                line = line.rstrip()
+                if PDF_PAGE_LINE_PATTERN.match(line):
+                    continue
+                if carry:
+                    line = carry + line.lstrip()
+                    carry = ""
+                # Re-join words split across lines ("hemo-\nrrhage")
+                if re.search(r"[a-z]-$", line):
+                    carry = line[:-1]
+                    continue
+                yield line
+
+        if carry:
+            yield carry
+
+    def _iter_hl7_lines(self, lines: Iterator[str]) -> Iterator[str]:
+        """Convert HL7 v2 segments into readable lines."""
+        for segment in lines:
+            fields = segment.strip().split("|")
+            label = HL7_SEGMENT_LABELS.get(fields[0])
+            if not label:
+                continue
+
+            if fields[0] == "OBX":
+                name = self._hl7_text(fields, 3)
+                value = self._hl7_text(fields, 5)
+                units = self._hl7_text(fields, 6)
+                flag = self._hl7_text(fields, 8)
+                line = f"{name}: {value} {units}".strip()
+                if flag:
+                    line += f" ({flag})"
+            elif fields[0] == "PID":
+                dob = self._hl7_text(fields, 7)
+                sex = self._hl7_text(fields, 8)
+                line = " ".join(part for part in (f"DOB {dob}" if dob else "", f"Sex {sex}" if sex else "") if part)
+            elif fields[0] == "NTE":
+                line = self._hl7_text(fields, 3)
+            else:
+                line = " ".join(self._hl7_text(fields, i) for i in range(1, len(fields)))
+
+            line = " ".join(line.split())
+            if line:
+                yield f"{label}: {line}"
+
+    def _iter_ccd_lines(self, stream: BinaryIO) -> Iterator[str]:
+        """Stream a CCD/C-CDA document and yield section titles and narrative text."""
+        limited = _LimitedReader(stream, settings.UPLOAD_MAX_BYTES)
+
+        try:
+            for event, elem in ET.iterparse(limited, events=("end",)):
+                tag = elem.tag.rsplit("}", 1)[-1]
+                if tag == "title":
+                    title = " ".join("".join(elem.itertext()).split())
+                    if title:
+                        yield ""
+                        yield f"{title.upper()}:"
+                elif tag == "text":
+                    for line in self._narrative_text(elem).splitlines():
+                        line = " ".join(line.split())
+                        if line:
+                            yield line
+                    # Narrative blocks are fully consumed; free them
+                    elem.clear()
+                elif tag == "section":
+                    elem.clear()
+        except ET.ParseError as e:
+            raise UnsupportedDocumentError(f"Invalid CCD document: {e}")
+
+    @staticmethod
+    def _narrative_text(elem: ET.Element) -> str:
+        """Flatten a CDA narrative block, breaking lines after paragraphs, list items and rows."""
+        parts: List[str] = []
+
+        def walk(node: ET.Element, is_root: bool = False):
+            parts.append(node.text or "")
+            for child in node:
+                walk(child)
+            if node.tag.rsplit("}", 1)[-1] in CCD_BLOCK_TAGS:
+                parts.append("\n")
+            if not is_root:
+                parts.append(node.tail or "")
+
+        walk(elem, is_root=True)
+        return "".join(parts)
+
+    @staticmethod
+    def _hl7_text(fields: List[str], index: int) -> str:
+        """Human-readable text of an HL7 field (prefers the text component of coded values)."""
+        if index >= len(fields):
+            return ""
+        components = fields[index].split("~")[0].split("^")
+        if len(components) > 1 and components[1]:
+            return components[1]
+        return components[0]
+
+    @staticmethod
+    def discard(path: str):
+        """Delete a spool file, ignoring files that are already gone."""
+        try:
+            os.remove(path)
+        except FileNotFoundError:
+            pass
+
+
+class _LimitedReader(io.RawIOBase):
+    """Raw stream wrapper that enforces UPLOAD_MAX_BYTES for buffered and text readers and iterparse."""
+
+    def __init__(self, stream: BinaryIO, max_bytes: int):
+        self.stream = stream
+        self.max_bytes = max_bytes
+        self.total = 0
+
+    def readable(self) -> bool:
+        return True
+
+    def readinto(self, buffer) -> int:
+        block = self.stream.read(len(buffer))
+        self.total += len(block)
+        if self.total > self.max_bytes:
+            raise UploadTooLargeError(f"Upload exceeds {self.max_bytes} bytes")
+        buffer[:len(block)] = block
+        return len(block)
+
+
+# Singleton instance
+document_ingestion = DocumentIngestionService()
@@ -0,0 +1,547 @@
+import hashlib
+import json
+import os
+import sqlite3
+import time
+import uuid
+from contextlib import contextmanager
+from typing import Any, Dict, Optional
+from app.core.config import settings
+from .tenancy import tenant_quota, TenantQuota
+
+
+# Jobs that still occupy queue capacity
+PENDING_STATUSES = ("queued", "running")
+
+# Window of the tokens_per_hour quota
+TOKEN_WINDOW_SECONDS = 3600
+
+
+class QueueFullError(Exception):
+    """Raised when the job queue is at JOB_QUEUE_MAX_PENDING."""
+
+    def __init__(self, retry_after: int, message: Optional[str] = None):
+        super().__init__(message or f"Analysis queue is full, retry after {retry_after}s")
+        self.retry_after = retry_after
+
+
+class TenantQuotaError(QueueFullError):
+    """Raised when a tenant is at its max_pending or tokens_per_hour quota."""
+
+    def __init__(self, tenant: str, quota: str, retry_after: int):
+        super().__init__(retry_after, f"Tenant {tenant} is at its {quota} quota, retry after {retry_after}s")
+        self.tenant = tenant
+        self.quota = quota
+
+
+def analysis_input_key(case_description: str) -> str:
+    """Key of an analysis input; case texts differing only in whitespace share it."""
+    return hashlib.sha256(" ".join(case_description.split()).encode("utf-8")).hexdigest()
+
+
+class JobStore:
+    """Durable SQLite-backed queue of analysis jobs shared by the API and worker processes.
+
+    Jobs belong to a tenant. A job enqueued with the input key of a queued or
+    running job of the same tenant is coalesced into it. claim() is weighted fair across tenants
+    (start-time fair queuing): each tenant has a virtual time that advances by
+    1/weight per claimed job, and the next job comes from the tenant with the
+    lowest virtual time, never below the last claimed start, so an idle tenant
+    cannot bank credit.
+    """
+
+    def __init__(self, db_path: Optional[str] = None):
+        self.db_path = db_path or settings.JOB_DB_PATH
+        self._initialized = False
+
+    def initialize(self):
+        """Create the jobs table if it does not exist."""
+        directory = os.path.dirname(self.db_path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+
+        with self._connect() as conn:
+            # WAL lets the API read job status while workers write
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute(
+                """
+                CREATE TABLE IF NOT EXISTS jobs (
+                    id TEXT PRIMARY KEY,
+                    tenant TEXT NOT NULL DEFAULT 'default',
+                    kind TEXT NOT NULL,
+                    status TEXT NOT NULL,
+                    payload TEXT NOT NULL,
+                    result TEXT,
+                    error TEXT,
+                    attempts INTEGER NOT NULL DEFAULT 0,
+                    worker_id TEXT,
+                    lease_expires REAL,
+                    created_at REAL NOT NULL,
+                    started_at REAL,
+                    finished_at REAL,
+                    tokens INTEGER NOT NULL DEFAULT 0,
+                    input_key TEXT,
+                    coalesced INTEGER NOT NULL DEFAULT 0
+                )
+                """
+            )
+            # Stores created before tenants and coalescing were added
+            columns = {row["name"] for row in conn.execute("PRAGMA table_info(jobs)")}
+            if "tenant" not in columns:
+                conn.execute("ALTER TABLE jobs ADD COLUMN tenant TEXT NOT NULL DEFAULT 'default'")
+            if "tokens" not in columns:
+                conn.execute("ALTER TABLE jobs ADD COLUMN tokens INTEGER NOT NULL DEFAULT 0")
+            if "input_key" not in columns:
+                conn.execute("ALTER TABLE jobs ADD COLUMN input_key TEXT")
+            if "coalesced" not in columns:
+                conn.execute("ALTER TABLE jobs ADD COLUMN coalesced INTEGER NOT NULL DEFAULT 0")
+            conn.execute("CREATE INDEX IF NOT EXISTS idx_jobs_status ON jobs (status, created_at)")
+            conn.execute("CREATE INDEX IF NOT EXISTS idx_jobs_tenant ON jobs (tenant, status, created_at)")
+            conn.execute(
+                """
+                CREATE INDEX IF NOT EXISTS idx_jobs_in_flight ON jobs (tenant, input_key)
+                WHERE status IN ('queued', 'running') AND input_key IS NOT NULL
+                """
+            )
+            conn.execute(
+                """
+                CREATE TABLE IF NOT EXISTS tenants (
+                    tenant TEXT PRIMARY KEY,
+                    virtual_time REAL NOT NULL DEFAULT 0,
+                    last_start REAL NOT NULL DEFAULT 0,
+                    rejected INTEGER NOT NULL DEFAULT 0
+                )
+                """
+            )
+
+        self._initialized = True
+
+    def enqueue(
+        self,
+        kind: str,
+        payload: Dict[str, Any],
+        tenant: Optional[str] = None,
+        input_key: Optional[str] = None
+    ) -> str:
+        """Add a job to the queue and return its id.
+
+        With an input_key (see analysis_input_key), the id of a queued or
+        running job of the tenant with the same key is returned instead, and
+        the caller shares that job's result or error.
+
+        Raises QueueFullError when the queue is at capacity, and TenantQuotaError
+        when the tenant is at its pending-job or hourly token quota.
+        """
+        self._ensure_initialized()
+        tenant = tenant or settings.DEFAULT_TENANT
+        job_id = uuid.uuid4().hex
+
+        with self._transaction() as conn:
+            if input_key is not None:
+                row = conn.execute(
+                    """
+                    SELECT id FROM jobs
+                    WHERE tenant = ? AND input_key = ? AND status IN (?, ?)
+                    ORDER BY created_at LIMIT 1
+                    """,
+                    (tenant, input_key, *PENDING_STATUSES)
+                ).fetchone()
+                if row is not None:
+                    conn.execute("UPDATE jobs SET coalesced = coalesced + 1 WHERE id = ?", (row["id"],))
+                    return row["id"]
+
+            error = self._admission_error(conn, tenant, tenant_quota(tenant))
+            if error is None:
+                conn.execute(
+                    """
+                    INSERT INTO jobs (id, tenant, kind, status, payload, created_at, input_key)
+                    VALUES (?, ?, ?, 'queued', ?, ?, ?)
+                    """,
+                    (job_id, tenant, kind, json.dumps(payload), time.time(), input_key)
+                )
+            else:
+                # Counted in the same transaction; the error is raised after commit
+                conn.execute(
+                    """
+                    INSERT INTO tenants (tenant, rejected) VALUES (?, 1)
+                    ON CONFLICT (tenant) DO UPDATE SET rejected = rejected + 1
+                    """,
+                    (tenant,)
+                )
+
+        if error is not None:
+            raise error
+        return job_id
+
+    def claim(self, worker_id: str) -> Optional[Dict[str, Any]]:
+        """Atomically claim the next runnable job.
+
+        A running job with an expired lease is reclaimed first; otherwise the
+        oldest queued job of the tenant chosen by weighted fair queuing.
+        """
+        self._ensure_initialized()
+        now = time.time()
+
+        with self._transaction() as conn:
+            row = conn.execute(
+                """
+                SELECT * FROM jobs
+                WHERE status = 'running' AND lease_expires < ?
+                ORDER BY created_at
+                LIMIT 1
+                """,
+                (now,)
+            ).fetchone()
+            if row is None:
+                row = self._next_fair_job(conn, now)
+            if row is None:
+                return None
+
+            attempts = row["attempts"] + 1
+            if attempts > settings.JOB_MAX_ATTEMPTS:
+                conn.execute(
+                    "UPDATE jobs SET status = 'failed', error = ?, finished_at = ? WHERE id = ?",
+                    (f"Gave up after {row['attempts']} attempts", now, row["id"])
+                )
+                return None
+
+            conn.execute(
+                """
+                UPDATE jobs
+                SET status = 'running', attempts = ?, worker_id = ?, lease_expires = ?,
+                    started_at = COALESCE(started_at, ?)
+                WHERE id = ?
+                """,
+                (attempts, worker_id, now + settings.JOB_LEASE_SECONDS, now, row["id"])
+            )
+
+        job = self._row_to_job(row)
+        job.update(status="running", attempts=attempts, worker_id=worker_id)
+        return job
+
+    def heartbeat(self, job_id: str, worker_id: str):
+        """Extend the lease of a job the worker is still running."""
+        with self._connect() as conn:
+            conn.execute(
+                "UPDATE jobs SET lease_expires = ? WHERE id = ? AND worker_id = ? AND status = 'running'",
+                (time.time() + settings.JOB_LEASE_SECONDS, job_id, worker_id)
+            )
+
+    def complete(self, job_id: str, worker_id: str, result: Dict[str, Any], tokens: int = 0) -> bool:
+        """Mark a job as completed and store its result and LLM token usage.
+
+        Only the worker holding an unexpired lease may finish the job; returns
+        False, leaving the job untouched, when the lease was lost (e.g. the job
+        was reclaimed by another worker).
+        """
+        return self._finish(job_id, worker_id, "completed", json.dumps(result), None, tokens)
+
+    def fail(self, job_id: str, worker_id: str, error: str, tokens: int = 0) -> bool:
+        """Mark a job as failed, keeping the tokens it consumed; False if the lease was lost."""
+        return self._finish(job_id, worker_id, "failed", None, error, tokens)
+
+    def _finish(
+        self,
+        job_id: str,
+        worker_id: str,
+        status: str,
+        result: Optional[str],
+        error: Optional[str],
+        tokens: int
+    ) -> bool:
+        now = time.time()
+        with self._connect() as conn:
+            cursor = conn.execute(
+                """
+                UPDATE jobs SET status = ?, result = ?, error = ?, finished_at = ?, lease_expires = NULL,
+                    tokens = tokens + ?
+                WHERE id = ? AND worker_id = ? AND status = 'running' AND lease_expires > ?
+                """,
+                (status, result, error, now, tokens, job_id, worker_id, now)
+            )
+        return cursor.rowcount == 1
+
+    def get(self, job_id: str) -> Optional[Dict[str, Any]]:
+        """Get a job by id."""
+        self._ensure_initialized()
+        with self._connect() as conn:
+            row = conn.execute("SELECT * FROM jobs WHERE id = ?", (job_id,)).fetchone()
+        return self._row_to_job(row) if row else None
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Get job counts by status."""
+        self._ensure_initialized()
+        with self._connect() as conn:
+            rows = conn.execute("SELECT status, COUNT(*) AS n FROM jobs GROUP BY status").fetchall()
+        return {row["status"]: row["n"] for row in rows}
+
+    def get_reuse_stats(self) -> Dict[str, Any]:
+        """Share of completed analyses served from a near-duplicate, with their similarities."""
+        self._ensure_initialized()
+        with self._connect() as conn:
+            row = conn.execute(
+                """
+                SELECT COUNT(*) AS completed,
+                       COUNT(json_extract(result, '$.reused_from')) AS reused,
+                       AVG(json_extract(result, '$.reused_from.similarity')) AS mean_similarity,
+                       MIN(json_extract(result, '$.reused_from.similarity')) AS min_similarity
+                FROM jobs WHERE status = 'completed'
+                """
+            ).fetchone()
+        return {
+            "completed": row["completed"],
+            "reused": row["reused"],
+            "reuse_rate": round(row["reused"] / row["completed"], 3) if row["completed"] else None,
+            "mean_similarity": round(row["mean_similarity"], 4) if row["mean_similarity"] is not None else None,
+            "min_similarity": row["min_similarity"],
+        }
+
+    def get_coalescing_stats(self) -> Dict[str, Any]:
+        """Requests that joined a queued or running analysis."""
+        self._ensure_initialized()
+        with self._connect() as conn:
+            row = conn.execute(
+                """
+                SELECT COUNT(*) AS jobs,
+                       COALESCE(SUM(coalesced), 0) AS coalesced,
+                       COALESCE(SUM(coalesced > 0), 0) AS shared
+                FROM jobs
+                """
+            ).fetchone()
+
+        return {
+            "analyses": {"jobs": row["jobs"], "coalesced_requests": row["coalesced"], "shared_jobs": row["shared"]}
+        }
+
+    def get_tenant_stats(self) -> Dict[str, Any]:
+        """Per-tenant quota, job counts, token usage, queue wait and rejected requests."""
+        self._ensure_initialized()
+        since = time.time() - TOKEN_WINDOW_SECONDS
+        with self._connect() as conn:
+            rows = conn.execute(
+                """
+                SELECT tenant,
+                       SUM(status = 'queued') AS queued,
+                       SUM(status = 'running') AS running,
+                       SUM(status = 'completed') AS completed,
+                       SUM(status = 'failed') AS failed,
+                       SUM(tokens) AS tokens,
+                       SUM(CASE WHEN finished_at > :since THEN tokens ELSE 0 END) AS tokens_last_hour,
+                       AVG(CASE WHEN started_at > :since THEN started_at - created_at END) AS mean_wait,
+                       AVG(CASE WHEN finished_at > :since THEN finished_at - started_at END) AS mean_run
+                FROM jobs GROUP BY tenant
+                """,
+                {"since": since}
+            ).fetchall()
+            rejected = {
+                row["tenant"]: row["rejected"]
+                for row in conn.execute("SELECT tenant, rejected FROM tenants")
+            }
+
+        stats = {}
+        for row in rows:
+            stats[row["tenant"]] = {
+                "quota": tenant_quota(row["tenant"]).as_dict(),
+                "queued": row["queued"],
+                "running": row["running"],
+                "completed": row["completed"],
+                "failed": row["failed"],
+                "rejected": rejected.get(row["tenant"], 0),
+                "tokens": row["tokens"],
+                "tokens_last_hour": row["tokens_last_hour"],
+                "mean_wait_seconds_last_hour": _round(row["mean_wait"]),
+                "mean_run_seconds_last_hour": _round(row["mean_run"]),
+            }
+        for tenant, count in rejected.items():
+            if tenant not in stats:
+                stats[tenant] = {"quota": tenant_quota(tenant).as_dict(), "rejected": count}
+        return stats
+
+    def _admission_error(self, conn: sqlite3.Connection, tenant: str, quota: TenantQuota) -> Optional[QueueFullError]:
+        """The error a new job of this tenant would be rejected with, if any."""
+        pending = self._count_pending(conn)
+        if pending >= settings.JOB_QUEUE_MAX_PENDING:
+            return QueueFullError(self._estimate_retry_after(conn, pending))
+
+        if quota.max_pending:
+            tenant_pending = self._count_pending(conn, tenant)
+            if tenant_pending >= quota.max_pending:
+                concurrency = quota.max_concurrent or settings.JOB_WORKER_CONCURRENCY
+                retry_after = self._estimate_retry_after(
+                    conn, tenant_pending, quota.max_pending, concurrency, tenant
+                )
+                return TenantQuotaError(tenant, "max_pending", retry_after)
+
+        if quota.tokens_per_hour:
+            retry_after = self._token_retry_after(conn, tenant, quota.tokens_per_hour)
+            if retry_after is not None:
+                return TenantQuotaError(tenant, "tokens_per_hour", retry_after)
+
+        return None
+
+    def _token_retry_after(self, conn: sqlite3.Connection, tenant: str, limit: int) -> Optional[int]:
+        """Seconds until the tenant's tokens in the window drop below limit; None if already below."""
+        now = time.time()
+        rows = conn.execute(
+            """
+            SELECT finished_at, tokens FROM jobs
+            WHERE tenant = ? AND finished_at > ? AND tokens > 0
+            ORDER BY finished_at
+            """,
+            (tenant, now - TOKEN_WINDOW_SECONDS)
+        ).fetchall()
+        used = sum(row["tokens"] for row in rows)
+        if used < limit:
+            return None
+
+        # Oldest jobs leave the window first
+        for row in rows:
+            used -= row["tokens"]
+            if used < limit:
+                return max(1, int(row["finished_at"] + TOKEN_WINDOW_SECONDS - now + 0.5))
+        return TOKEN_WINDOW_SECONDS
+
+    def _next_fair_job(self, conn: sqlite3.Connection, now: float) -> Optional[sqlite3.Row]:
+        """Oldest queued job of the tenant with the lowest virtual start time.
+
+        Tenants at their max_concurrent limit are skipped. The chosen tenant's
+        virtual time advances by 1/weight.
+        """
+        heads = conn.execute(
+            "SELECT tenant, MIN(created_at) AS oldest FROM jobs WHERE status = 'queued' GROUP BY tenant"
+        ).fetchall()
+        if not heads:
+            return None
+
+        running = {
+            row["tenant"]: row["n"]
+            for row in conn.execute(
+                "SELECT tenant, COUNT(*) AS n FROM jobs WHERE status = 'running' AND lease_expires >= ? GROUP BY tenant",
+                (now,)
+            )
+        }
+        clocks = {
+            row["tenant"]: row["virtual_time"]
+            for row in conn.execute("SELECT tenant, virtual_time FROM tenants")
+        }
+        system_time = conn.execute("SELECT COALESCE(MAX(last_start), 0) FROM tenants").fetchone()[0]
+
+        best = None
+        for head in heads:
+            quota = tenant_quota(head["tenant"])
+            if quota.max_concurrent and running.get(head["tenant"], 0) >= quota.max_concurrent:
+                continue
+            start = max(clocks.get(head["tenant"], 0.0), system_time)
+            candidate = (start, head["oldest"], head["tenant"], quota)
+            if best is None or candidate[:2] < best[:2]:
+                best = candidate
+        if best is None:
+            return None
+
+        start, _, tenant, quota = best
+        conn.execute(
+            """
+            INSERT INTO tenants (tenant, virtual_time, last_start) VALUES (:tenant, :finish, :start)
+            ON CONFLICT (tenant) DO UPDATE SET virtual_time = :finish, last_start = :start
+            """,
+            {"tenant": tenant, "start": start, "finish": start + 1.0 / quota.weight}
+        )
+        return conn.execute(
+            "SELECT * FROM jobs WHERE tenant = ? AND status = 'queued' ORDER BY created_at LIMIT 1",
+            (tenant,)
+        ).fetchone()
+
+    def _count_pending(self, conn: sqlite3.Connection, tenant: Optional[str] = None) -> int:
+        """Count jobs that are queued or running, for one tenant or all."""
+        if tenant is None:
+            return conn.execute(
+                "SELECT COUNT(*) FROM jobs WHERE status IN (?, ?)", PENDING_STATUSES
+            ).fetchone()[0]
+        return conn.execute(
+            "SELECT COUNT(*) FROM jobs WHERE tenant = ? AND status IN (?, ?)", (tenant, *PENDING_STATUSES)
+        ).fetchone()[0]
+
+    def _estimate_retry_after(
+        self,
+        conn: sqlite3.Connection,
+        pending: int,
+        capacity: Optional[int] = None,
+        concurrency: Optional[int] = None,
+        tenant: Optional[str] = None
+    ) -> int:
+        """Estimate seconds until a queue slot frees up from recent job durations."""
+        tenant_filter = "AND tenant = ?" if tenant is not None else ""
+        row = conn.execute(
+            f"""
+            SELECT AVG(finished_at - started_at) FROM (
+                SELECT finished_at, started_at FROM jobs
+                WHERE status = 'completed' AND started_at IS NOT NULL {tenant_filter}
+                ORDER BY finished_at DESC LIMIT 50
+            )
+            """,
+            (tenant,) if tenant is not None else ()
+        ).fetchone()
+        avg_duration = row[0] or settings.JOB_DEFAULT_RETRY_AFTER_SECONDS
+        concurrency = max(concurrency or settings.JOB_WORKER_CONCURRENCY, 1)
+        backlog = pending - (capacity or settings.JOB_QUEUE_MAX_PENDING) + 1
+        return max(1, int(avg_duration * backlog / concurrency + 0.5))
+
+    def _row_to_job(self, row: sqlite3.Row) -> Dict[str, Any]:
+        """Convert a jobs row into an API-friendly dict."""
+        job = dict(row)
+        job["payload"] = json.loads(job["payload"])
+        job["result"] = json.loads(job["result"]) if job["result"] else None
+        return job
+
+    def _ensure_initialized(self):
+        if not self._initialized:
+            self.initialize()
+
+    def _connect(self) -> "_ClosingConnection":
+        """Open a connection; one per operation keeps the store safe across threads and processes."""
+        conn = sqlite3.connect(self.db_path, timeout=30)
+        conn.row_factory = sqlite3.Row
+        return _ClosingConnection(conn)
+
+    @contextmanager
+    def _transaction(self):
+        """Run statements in a write transaction taken up front (BEGIN IMMEDIATE)."""
+        conn = sqlite3.connect(self.db_path, timeout=30, isolation_level=None)
+        conn.row_factory = sqlite3.Row
+        try:
+            conn.execute("BEGIN IMMEDIATE")
+            try:
+                yield conn
+            except Exception:
+                conn.execute("ROLLBACK")
+                raise
+            conn.execute("COMMIT")
+        finally:
+            conn.close()
+
+
+def _round(value: Optional[float]) -> Optional[float]:
+    return round(value, 3) if value is not None else None
+
+
+class _ClosingConnection:
+    """Context manager that commits and closes a sqlite3 connection."""
+
+    def __init__(self, conn: sqlite3.Connection):
+        self.conn = conn
+
+    def __enter__(self) -> sqlite3.Connection:
+        return self.conn
+
+    def __exit__(self, exc_type, exc, tb):
+        try:
+            if exc_type is None:
+                self.conn.commit()
+            else:
+                self.conn.rollback()
+        finally:
+            self.conn.close()
+
+
+# Singleton instance
+job_store = JobStore()
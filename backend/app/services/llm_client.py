@@ -0,0 +1,217 @@
+import hashlib
+import json
+import os
+import tempfile
+import threading
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Any, Dict, Iterator, Optional, Tuple
+from anthropic import Anthropic
+from app.core.config import settings
+from app.core.telemetry import span
+
+
+LLM_CACHE_MODES = ("off", "record", "replay", "auto")
+
+# Token counter of the current job, see LLMClient.track_usage()
+_usage_var: ContextVar[Optional[Dict[str, int]]] = ContextVar("llm_usage", default=None)
+# Tenant whose job makes the current calls, see LLMClient.for_tenant()
+_tenant_var: ContextVar[Optional[str]] = ContextVar("llm_tenant", default=None)
+
+
+class FixtureMissError(LookupError):
+    """Raised in replay mode when no recorded response matches a request."""
+
+
+class LLMClient:
+    """Anthropic Messages client with an optional record/replay fixture layer.
+
+    Modes (LLM_CACHE_MODE):
+    - off: always call the API
+    - record: call the API and store every request -> response pair
+    - replay: answer only from stored fixtures; a miss raises FixtureMissError
+    - auto: replay when a fixture exists, otherwise call the API and record it
+
+    Inside for_tenant() fixtures are keyed per tenant, so a recorded response
+    is never replayed to another tenant's job.
+    """
+
+    def __init__(self, mode: Optional[str] = None, fixtures_path: Optional[str] = None):
+        self.mode = mode or settings.LLM_CACHE_MODE
+        self.fixtures_path = fixtures_path or settings.LLM_FIXTURES_PATH
+        if self.mode not in LLM_CACHE_MODES:
+            raise ValueError(f"LLM_CACHE_MODE must be one of {LLM_CACHE_MODES}, got {self.mode!r}")
+        self._client: Optional[Anthropic] = None
+        self._lock = threading.Lock()
+        self.stats: Dict[str, int] = {
+            "fixture_hits": 0, "fixture_misses": 0, "live_calls": 0, "input_tokens": 0, "output_tokens": 0,
+            "cache_read_input_tokens": 0, "cache_creation_input_tokens": 0,
+        }
+
+    @property
+    def client(self) -> Anthropic:
+        """The Anthropic client, created on first live call so replay runs need no network."""
+        if self._client is None:
+            self._client = Anthropic(
+                api_key=settings.ANTHROPIC_API_KEY,
+                base_url=settings.ANTHROPIC_BASE_URL
+            )
+        return self._client
+
+    def complete(
+        self,
+        model: str,
+        prompt: str,
+        max_tokens: int,
+        timeout: Optional[float] = None,
+        prompt_version: Optional[str] = None,
+        cache_prefix: str = ""
+    ) -> str:
+        """Send a single-turn prompt and return the text of the first content block.
+
+        timeout (seconds) bounds each attempt of the live request. prompt_version
+        (a PromptTemplate version) is attached to the span and recorded fixtures.
+        cache_prefix is sent before prompt. From PROMPT_CACHE_MIN_PREFIX_CHARS on
+        it is its own block with a cache_control breakpoint, so the API can reuse
+        it across requests with the same prefix; shorter prefixes are below the
+        API's minimum cacheable length and are sent as plain text.
+        """
+        with span(
+            "llm.complete",
+            model=model,
+            max_tokens=max_tokens,
+            prompt_chars=len(cache_prefix) + len(prompt),
+            **{"llm.prompt_version": prompt_version}
+        ) as current:
+            # Keyed on the full text, so splitting off a prefix keeps recorded fixtures valid
+            key = self.fixture_key(model, cache_prefix + prompt, max_tokens, _tenant_var.get())
+            text, source = self._complete(key, model, cache_prefix, prompt, max_tokens, timeout, prompt_version)
+            current.set_attribute("llm.source", source)
+            current.set_attribute("response_chars", len(text))
+            return text
+
+    @contextmanager
+    def track_usage(self) -> Iterator[Dict[str, int]]:
+        """Count tokens of live calls made in this context, including step threads started from it."""
+        usage = {"input_tokens": 0, "output_tokens": 0}
+        token = _usage_var.set(usage)
+        try:
+            yield usage
+        finally:
+            _usage_var.reset(token)
+
+    @contextmanager
+    def for_tenant(self, tenant: str) -> Iterator[None]:
+        """Scope fixtures of calls made in this context, including step threads, to a tenant."""
+        token = _tenant_var.set(tenant)
+        try:
+            yield
+        finally:
+            _tenant_var.reset(token)
+
+    def _complete(
+        self,
+        key: str,
+        model: str,
+        cache_prefix: str,
+        prompt: str,
+        max_tokens: int,
+        timeout: Optional[float],
+        prompt_version: Optional[str]
+    ) -> Tuple[str, str]:
+        """Response text and where it came from: "fixture" or "live"."""
+        if self.mode in ("replay", "auto"):
+            fixture = self._load_fixture(key)
+            if fixture is not None:
+                self._count("fixture_hits")
+                return fixture["response"], "fixture"
+            self._count("fixture_misses")
+            if self.mode == "replay":
+                raise FixtureMissError(f"No recorded response for request {key[:12]}")
+
+        kwargs = {"timeout": timeout} if timeout is not None else {}
+        content: Any = cache_prefix + prompt
+        if len(cache_prefix) >= settings.PROMPT_CACHE_MIN_PREFIX_CHARS:
+            content = [
+                {"type": "text", "text": cache_prefix, "cache_control": {"type": "ephemeral"}},
+                {"type": "text", "text": prompt},
+            ]
+        response = self.client.messages.create(
+            model=model,
+            max_tokens=max_tokens,
+            messages=[{"role": "user", "content": content}],
+            **kwargs
+        )
+        text = response.content[0].text
+        self._count("live_calls")
+        self._record_usage(response)
+
+        if self.mode in ("record", "auto"):
+            self._save_fixture(key, {
+                "key": key,
+                "model": model,
+                "max_tokens": max_tokens,
+                "prompt_version": prompt_version,
+                "tenant": _tenant_var.get(),
+                "prompt": cache_prefix + prompt,
+                "response": text,
+                "recorded_at": time.time(),
+            })
+
+        return text, "live"
+
+    @staticmethod
+    def fixture_key(model: str, prompt: str, max_tokens: int, tenant: Optional[str] = None) -> str:
+        """Stable key of a request; any prompt change produces a new fixture.
+
+        Keys without a tenant (evaluation and backtest runs) are unchanged.
+        """
+        request: Dict[str, Any] = {"model": model, "max_tokens": max_tokens, "prompt": prompt}
+        if tenant is not None:
+            request["tenant"] = tenant
+        payload = json.dumps(request, sort_keys=True)
+        return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+    def _count(self, name: str):
+        with self._lock:
+            self.stats[name] += 1
+
+    def _record_usage(self, response):
+        """Add a live response's token usage to the totals and the current job's counter."""
+        usage = getattr(response, "usage", None)
+        if usage is None:
+            return
+        current = _usage_var.get()
+        with self._lock:
+            for counters in (self.stats, current):
+                if counters is not None:
+                    counters["input_tokens"] += usage.input_tokens
+                    counters["output_tokens"] += usage.output_tokens
+            # Prompt cache reads and writes are reported apart from input_tokens
+            for name in ("cache_read_input_tokens", "cache_creation_input_tokens"):
+                self.stats[name] += getattr(usage, name, None) or 0
+
+    def _fixture_file(self, key: str) -> str:
+        # Two-level fan-out keeps directories small for large gold sets
+        return os.path.join(self.fixtures_path, key[:2], f"{key}.json")
+
+    def _load_fixture(self, key: str) -> Optional[dict]:
+        try:
+            with open(self._fixture_file(key), "r", encoding="utf-8") as f:
+                return json.load(f)
+        except FileNotFoundError:
+            return None
+
+    def _save_fixture(self, key: str, fixture: dict):
+        path = self._fixture_file(key)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        # Write then rename so parallel recorders never leave a partial file
+        fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(path), suffix=".tmp")
+        with os.fdopen(fd, "w", encoding="utf-8") as f:
+            json.dump(fixture, f, indent=2)
+        os.replace(tmp_path, path)
+
+
+# Singleton instance
+llm_client = LLMClient()
@@ -0,0 +1,228 @@
+import hashlib
+import threading
+from collections import OrderedDict
+from string import Formatter
+from typing import Any, Dict, List, Optional, Tuple
+from app.core.config import settings
+from .clinical_standards import clinical_standards
+from .vector_db import vector_db, CaseHit
+
+
+# Field that marks where a template's cacheable prefix ends; it renders as nothing
+CACHE_BREAKPOINT = "cache_breakpoint"
+
+
+class PromptTemplate:
+    """A prompt parsed once into literal text and named fields.
+
+    render() only concatenates strings. The version id is derived from the
+    template text, so any wording change yields a new id. A {cache_breakpoint}
+    field splits the prompt for render_parts(): text shared across requests
+    goes before it, text that varies per case after it.
+    """
+
+    def __init__(self, name: str, text: str):
+        self.name = name
+        self.text = text
+        self._parts: List[Tuple[str, Optional[str]]] = []
+        for literal, field, spec, conversion in Formatter().parse(text):
+            if field == "" or spec or conversion:
+                raise ValueError(f"Template {name} may only use plain named fields")
+            self._parts.append((literal, field))
+        if sum(field == CACHE_BREAKPOINT for _, field in self._parts) > 1:
+            raise ValueError(f"Template {name} may have only one {{{CACHE_BREAKPOINT}}}")
+        self.fields = frozenset(
+            field for _, field in self._parts if field is not None and field != CACHE_BREAKPOINT
+        )
+        self.version = f"{name}@{hashlib.sha256(text.encode('utf-8')).hexdigest()[:12]}"
+
+    def render(self, **values: Any) -> str:
+        """Fill every field; a missing or unknown field raises KeyError."""
+        return "".join(self.render_parts(**values))
+
+    def render_parts(self, **values: Any) -> Tuple[str, str]:
+        """Rendered text before and after the cache breakpoint (all of it after, without one)."""
+        if values.keys() != self.fields:
+            raise KeyError(
+                f"Template {self.name} expects {sorted(self.fields)}, got {sorted(values)}"
+            )
+        sections: List[List[str]] = [[]]
+        for literal, field in self._parts:
+            sections[-1].append(literal)
+            if field == CACHE_BREAKPOINT:
+                sections.append([])
+            elif field is not None:
+                sections[-1].append(str(values[field]))
+        if len(sections) == 1:
+            return "", "".join(sections[0])
+        return "".join(sections[0]), "".join(sections[1])
+
+
+EXTRACT_PATIENT_INFO_PROMPT = PromptTemplate("extract_patient_info", """You are a medical information extraction expert. Extract structured information from this case description.
+
+Case Description:
+{case_text}
+
+Extract and return ONLY a JSON object with these fields:
+- age: patient age (number or null)
+- gender: patient gender (string or null)
+- chief_complaint: main complaint (string)
+- tests_performed: list of tests/examinations done (array of strings)
+- tests_not_performed: list of tests that were NOT done but mentioned (array of strings)
+- treatment_given: list of treatments provided (array of strings)
+- disposition: what happened to patient (e.g., "sent home", "admitted", null)
+
+Return ONLY valid JSON, no other text.""")
+
+IDENTIFY_RISKS_PROMPT = PromptTemplate("identify_risks", """You are a medical malpractice risk expert. Identify ALL potential legal risks in the patient case at the end of this prompt.
+
+For each risk, return a JSON object with:
+- type: one of ["missed_diagnosis", "inadequate_workup", "documentation_deficiency", "treatment_error"]
+- severity: number from 1-10 (10 = highest risk)
+- description: specific problem identified
+- standard_violated: which standard of care was violated
+- legal_precedent: cite similar case if applicable (or null)
+- mitigation: specific action to reduce this risk
+
+CLINICAL STANDARD OF CARE:
+{standard}
+{cache_breakpoint}
+SIMILAR LEGAL CASES:
+{similar_cases}
+
+PATIENT CASE:
+{case_context}
+
+{patient_info}
+
+Analyze this case against the standard of care and similar cases above. Return a JSON array of risk objects. Be thorough and identify ALL gaps.""")
+
+GENERATE_MITIGATION_PROMPT = PromptTemplate("generate_mitigation", """You are a medical-legal expert. Generate protective actions and documentation for this case.
+
+CASE: {case_context}
+
+IDENTIFIED RISKS:
+{risks}
+
+Generate two things:
+
+1. ACTION ITEMS: A list of specific, actionable steps the physician should take NOW to reduce risk. Be concrete and medical-specific.
+
+2. PROTECTIVE DOCUMENTATION: A sample note the physician can add to the medical record that includes:
+   - Full differential diagnosis considered
+   - Documentation of workup and reasoning
+   - Shared decision-making discussion
+   - Return precautions given
+   - Use protective legal language
+
+Return as JSON:
+{{
+  "action_items": ["action 1", "action 2", ...],
+  "protective_documentation": "full note text here"
+}}""")
+
+PROMPT_TEMPLATES = (EXTRACT_PATIENT_INFO_PROMPT, IDENTIFY_RISKS_PROMPT, GENERATE_MITIGATION_PROMPT)
+
+# Version of the whole prompt set, for caches of workflow outputs
+PROMPTS_VERSION = hashlib.sha256(
+    "|".join(template.version for template in PROMPT_TEMPLATES).encode("utf-8")
+).hexdigest()[:12]
+
+
+class PromptContextCache:
+    """Rendered prompt blocks shared across requests.
+
+    - standards blocks per normalized chief complaint, for the loaded standards version
+    - precedent snippets per case id, for the current vector_db data version
+
+    A version change drops the affected entries on the next lookup.
+    """
+
+    def __init__(self, max_cases: Optional[int] = None):
+        self.max_cases = max_cases or settings.PROMPT_CACHE_MAX_CASES
+        self._lock = threading.Lock()
+        self._standards: Dict[str, str] = {}
+        self._standards_version: Optional[str] = None
+        self._cases: "OrderedDict[str, str]" = OrderedDict()
+        self._cases_version: Optional[str] = None
+        self.stats: Dict[str, int] = {
+            "standards_hits": 0, "standards_misses": 0, "case_hits": 0, "case_misses": 0,
+        }
+
+    def standards_block(self, chief_complaint: str) -> str:
+        """CLINICAL STANDARD OF CARE block for a chief complaint."""
+        key = clinical_standards.standard_key(chief_complaint)
+        # Complaints without a standard share one entry, which bounds the cache
+        if key not in clinical_standards.standards:
+            key = ""
+        version = clinical_standards.version
+
+        with self._lock:
+            if version != self._standards_version:
+                self._standards.clear()
+                self._standards_version = version
+            block = self._standards.get(key)
+            self.stats["standards_hits" if block is not None else "standards_misses"] += 1
+        if block is not None:
+            return block
+
+        standard = clinical_standards.standards.get(key, {})
+        block = "\n".join([
+            f"Required Workup: {standard.get('required_workup', [])}",
+            f"Red Flags: {standard.get('red_flags', [])}",
+            f"Must Rule Out: {standard.get('must_rule_out', [])}",
+            f"Documentation Requirements: {standard.get('documentation_requirements', [])}",
+        ])
+        with self._lock:
+            if version == self._standards_version:
+                self._standards[key] = block
+        return block
+
+    def similar_cases_block(self, cases: List[CaseHit]) -> str:
+        """SIMILAR LEGAL CASES block, one cached snippet per case."""
+        if not cases:
+            return "No similar cases found."
+        return "\n".join(self.case_snippet(case) for case in cases)
+
+    def case_snippet(self, case: CaseHit) -> str:
+        """One precedent line of the risk prompt."""
+        version = vector_db.data_version
+
+        with self._lock:
+            if version != self._cases_version:
+                self._cases.clear()
+                self._cases_version = version
+            snippet = self._cases.get(case.case_id)
+            if snippet is not None:
+                self._cases.move_to_end(case.case_id)
+            self.stats["case_hits" if snippet is not None else "case_misses"] += 1
+        if snippet is not None:
+            return snippet
+
+        snippet = (
+            f"- {case.case_name} ({case.year}): {case.facts[:200]}... "
+            f"Verdict: {case.verdict}, Key Error: {case.key_error}"
+        )
+        with self._lock:
+            if version == self._cases_version:
+                self._cases[case.case_id] = snippet
+                if len(self._cases) > self.max_cases:
+                    self._cases.popitem(last=False)
+        return snippet
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Hit counts, sizes and the versions entries were rendered for."""
+        with self._lock:
+            return {
+                "prompts_version": PROMPTS_VERSION,
+                "templates": {template.name: template.version for template in PROMPT_TEMPLATES},
+                "standards_version": self._standards_version,
+                "cases_version": self._cases_version,
+                "cached_standards": len(self._standards),
+                "cached_cases": len(self._cases),
+                **self.stats,
+            }
+
+
+# Singleton instance
+prompt_cache = PromptContextCache()
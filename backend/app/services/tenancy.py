@@ -0,0 +1,59 @@
+import re
+from dataclasses import dataclass
+from typing import Any, Dict, Optional
+from app.core.config import settings
+
+
+TENANT_ID_PATTERN = re.compile(r"^[A-Za-z0-9][A-Za-z0-9_.-]{0,63}$")
+
+
+class InvalidTenantError(ValueError):
+    """Raised for a malformed X-Tenant-ID."""
+
+
+@dataclass(frozen=True)
+class TenantQuota:
+    """Scheduling weight and limits of one tenant; a limit of 0 is disabled.
+
+    - weight: share of worker capacity when several tenants have queued jobs
+    - max_concurrent: jobs of the tenant running at once
+    - max_pending: queued plus running jobs of the tenant
+    - tokens_per_hour: LLM tokens of the tenant's jobs finished in the last hour
+    """
+    weight: float
+    max_concurrent: int
+    max_pending: int
+    tokens_per_hour: int
+
+    def as_dict(self) -> Dict[str, Any]:
+        return {
+            "weight": self.weight,
+            "max_concurrent": self.max_concurrent,
+            "max_pending": self.max_pending,
+            "tokens_per_hour": self.tokens_per_hour,
+        }
+
+
+def resolve_tenant(tenant_id: Optional[str]) -> str:
+    """Tenant of a request; requests without one belong to DEFAULT_TENANT."""
+    if not tenant_id:
+        return settings.DEFAULT_TENANT
+    if not TENANT_ID_PATTERN.match(tenant_id):
+        raise InvalidTenantError(
+            "X-Tenant-ID must be 1-64 letters, digits, '.', '_' or '-', starting with a letter or digit"
+        )
+    return tenant_id
+
+
+def tenant_quota(tenant: str) -> TenantQuota:
+    """Quota of a tenant: TENANT_QUOTAS overrides on top of the TENANT_DEFAULT_* settings."""
+    overrides = settings.TENANT_QUOTAS.get(tenant, {})
+    weight = float(overrides.get("weight", settings.TENANT_DEFAULT_WEIGHT))
+    if weight <= 0:
+        raise ValueError(f"Tenant {tenant} weight must be positive, got {weight}")
+    return TenantQuota(
+        weight=weight,
+        max_concurrent=int(overrides.get("max_concurrent", settings.TENANT_DEFAULT_MAX_CONCURRENT)),
+        max_pending=int(overrides.get("max_pending", settings.TENANT_DEFAULT_MAX_PENDING)),
+        tokens_per_hour=int(overrides.get("tokens_per_hour", settings.TENANT_DEFAULT_TOKENS_PER_HOUR)),
+    )
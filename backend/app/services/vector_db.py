@@ -1,33 +1,293 @@
 import chromadb
 from chromadb.config import Settings as ChromaSettings
-from typing import List, Dict, Any
+from dataclasses import dataclass
+from typing import List, Dict, Any, Optional, Tuple
+import json
+import logging
+import os
+import time
 import pandas as pd
 from app.core.config import settings
-from app.schemas import SimilarCase
+from app.core.telemetry import span
+from app.schemas import SimilarCase, CaseDetail
+from .case_corpus import CaseCorpus
+
+logger = logging.getLogger(__name__)
+
+# Collection metadata key -> Settings attribute
+HNSW_SETTINGS = {
+    "hnsw:M": "HNSW_M",
+    "hnsw:construction_ef": "HNSW_CONSTRUCTION_EF",
+    "hnsw:search_ef": "HNSW_SEARCH_EF",
+    "hnsw:batch_size": "HNSW_BATCH_SIZE",
+}
+# Chroma's values for collections created without explicit parameters
+HNSW_DEFAULTS = {"hnsw:M": 16, "hnsw:construction_ef": 100, "hnsw:search_ef": 10, "hnsw:batch_size": 100}
+
+
+@dataclass(slots=True)
+class CaseHit:
+    """A retrieved case as carried through the workflow.
+
+    Fields reference the strings returned by the collection; no validation or
+    copying happens until to_similar_case() at the API boundary.
+    """
+    case_id: str
+    distance: float
+    case_name: str
+    year: int
+    specialty: str
+    facts: str
+    verdict: str
+    key_error: str
+    settlement: Optional[str] = None
+
+    @property
+    def similarity_score(self) -> float:
+        # Convert cosine distance to similarity score (0-1)
+        return round(1 - self.distance, 2)
+
+    def to_similar_case(self) -> SimilarCase:
+        """Validated API model of this hit."""
+        return SimilarCase(
+            case_id=self.case_id,
+            case_name=self.case_name,
+            year=self.year,
+            specialty=self.specialty,
+            facts=self.facts,
+            verdict=self.verdict,
+            key_error=self.key_error,
+            settlement=self.settlement,
+            similarity_score=self.similarity_score
+        )
+
+
+def index_metadata(**overrides: int) -> Dict[str, Any]:
+    """Collection metadata for a cosine HNSW index with the configured parameters.
+
+    overrides use the short names (M, construction_ef, search_ef, batch_size).
+    """
+    metadata: Dict[str, Any] = {"hnsw:space": "cosine"}
+    for key, setting in HNSW_SETTINGS.items():
+        metadata[key] = overrides.get(key.split(":", 1)[1], getattr(settings, setting))
+    return metadata
+
+
+def _file_version(path: str) -> str:
+    """Identity of a file that is only ever replaced, or "none" if it does not exist."""
+    try:
+        stat = os.stat(path)
+    except FileNotFoundError:
+        return "none"
+    return f"{stat.st_ino}-{stat.st_mtime_ns}"
 
 
 class VectorDatabase:
-    """Vector database service for case retrieval."""
+    """Vector database service for case retrieval.
 
-    def __init__(self):
+    collection_name is a logical name. The physical collection behind it is
+    recorded in a pointer file next to the database, so rebuild_index() can
+    switch every process to a rebuilt index without downtime.
+    """
+
+    def __init__(self, embedding_function=None):
         self.client = chromadb.PersistentClient(
             path=settings.CHROMA_DB_PATH,
             settings=ChromaSettings(anonymized_telemetry=False)
         )
         self.collection_name = "malpractice_cases"
         self.collection = None
+        # Pointer file mtime the open collection was resolved from
+        self._pointer_mtime: Optional[int] = None
+        # None uses Chroma's default embedding model
+        self.embedding_function = embedding_function
+        # Memory-mapped corpus that hydrates hits indexed by row number
+        self.corpus: Optional[CaseCorpus] = None
+        # Corpus build the open corpus was attached from
+        self._corpus_version: Optional[str] = None
 
     def initialize(self):
         """Initialize or get existing collection."""
+        name = self._active_collection_name()
+
         try:
-            self.collection = self.client.get_collection(name=self.collection_name)
-            print(f"✅ Loaded existing collection: {self.collection_name}")
+            self.collection = self.client.get_collection(name=name, **self._embedding_kwargs())
+            logger.info("Loaded existing collection", extra={"collection": name})
+            built = {**HNSW_DEFAULTS, **(self.collection.metadata or {})}
+            stale = {
+                key: value for key, value in index_metadata().items()
+                if key in HNSW_DEFAULTS and built[key] != value
+            }
+            if stale:
+                logger.warning(
+                    "Collection was built with other HNSW parameters; run rebuild_index.py to apply",
+                    extra={"collection": name, "configured": stale}
+                )
         except:
             self.collection = self.client.create_collection(
-                name=self.collection_name,
-                metadata={"hnsw:space": "cosine"}
+                name=name,
+                metadata=index_metadata(),
+                **self._embedding_kwargs()
             )
-            print(f"✅ Created new collection: {self.collection_name}")
+            logger.info("Created new collection", extra={"collection": name})
+
+        if settings.CASES_CORPUS_PATH and os.path.isdir(settings.CASES_CORPUS_PATH):
+            self.attach_corpus(settings.CASES_CORPUS_PATH)
+
+    def rebuild_index(self, **params: int) -> Dict[str, Any]:
+        """Copy the collection into a new index with the given HNSW parameters and switch to it.
+
+        Stored embeddings are copied as-is, so nothing is re-embedded. Readers
+        keep using the old index until the pointer file is replaced, then pick
+        up the new one on their next search. The previous index is kept for
+        rollback; older ones are dropped. Cases added during the copy are not
+        carried over.
+        """
+        source = self._current_collection()
+        metadata = index_metadata(**params)
+        name = f"{self.collection_name}-{time.strftime('%Y%m%d%H%M%S')}"
+        target = self.client.create_collection(name=name, metadata=metadata, **self._embedding_kwargs())
+
+        started = time.perf_counter()
+        page = self.client.max_batch_size
+        copied = 0
+        try:
+            while True:
+                batch = source.get(
+                    limit=page, offset=copied, include=["embeddings", "metadatas", "documents"]
+                )
+                if not batch["ids"]:
+                    break
+                target.add(
+                    ids=batch["ids"],
+                    embeddings=batch["embeddings"],
+                    metadatas=batch["metadatas"],
+                    documents=batch["documents"]
+                )
+                copied += len(batch["ids"])
+
+            if target.count() != source.count():
+                raise RuntimeError(f"Copied {target.count()} of {source.count()} cases")
+        except Exception:
+            self.client.delete_collection(name)
+            raise
+
+        previous = source.name
+        self._write_pointer(name)
+        self.collection = target
+        self._pointer_mtime = self._pointer_stat()
+        dropped = self._drop_indexes(keep={name, previous})
+
+        logger.info(
+            "Rebuilt case index",
+            extra={"collection": name, "previous": previous, "cases": copied, "index": metadata}
+        )
+        return {
+            "collection": name,
+            "previous": previous,
+            "dropped": dropped,
+            "cases": copied,
+            "index": metadata,
+            "seconds": round(time.perf_counter() - started, 3),
+        }
+
+    def _embedding_kwargs(self) -> Dict[str, Any]:
+        if self.embedding_function is None:
+            return {}
+        return {"embedding_function": self.embedding_function}
+
+    def _pointer_path(self) -> str:
+        return os.path.join(settings.CHROMA_DB_PATH, f"{self.collection_name}.active.json")
+
+    def _load_stamp_path(self) -> str:
+        return os.path.join(settings.CHROMA_DB_PATH, f"{self.collection_name}.loaded")
+
+    def _pointer_stat(self) -> Optional[int]:
+        try:
+            return os.stat(self._pointer_path()).st_mtime_ns
+        except FileNotFoundError:
+            return None
+
+    def _active_collection_name(self) -> str:
+        """Physical collection behind collection_name (itself until the first rebuild)."""
+        self._pointer_mtime = self._pointer_stat()
+        try:
+            with open(self._pointer_path(), "r", encoding="utf-8") as f:
+                return json.load(f)["collection"]
+        except FileNotFoundError:
+            return self.collection_name
+
+    def _write_pointer(self, name: str):
+        # Written then renamed, so readers never see a partial file
+        path = self._pointer_path()
+        tmp_path = f"{path}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump({"collection": name, "switched_at": time.time()}, f)
+        os.replace(tmp_path, path)
+
+    def _write_load_stamp(self):
+        # Replaced rather than touched, so every load changes the file's identity
+        path = self._load_stamp_path()
+        tmp_path = f"{path}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump({"loaded_at": time.time()}, f)
+        os.replace(tmp_path, path)
+
+    def _current_collection(self):
+        """The open collection, reopened if another process switched the index.
+
+        The corpus is reattached too if it was rebuilt, so hits are checked
+        against the build on disk.
+        """
+        if self._pointer_stat() != self._pointer_mtime:
+            name = self._active_collection_name()
+            self.collection = self.client.get_collection(name=name, **self._embedding_kwargs())
+            logger.info("Switched to rebuilt case index", extra={"collection": name})
+        self._current_corpus_version()
+        return self.collection
+
+    def _drop_indexes(self, keep: set) -> List[str]:
+        """Delete the original and rebuilt indexes of this collection other than `keep`."""
+        dropped = []
+        for collection in self.client.list_collections():
+            name = collection.name
+            is_index = name == self.collection_name or name.startswith(f"{self.collection_name}-")
+            if is_index and name not in keep:
+                self.client.delete_collection(name)
+                dropped.append(name)
+        return dropped
+
+    @property
+    def data_version(self) -> str:
+        """Version of the case data behind hit ids, for caches keyed by case id.
+
+        Derived from files every process sees: the index pointer (replaced by
+        rebuild_index), the load stamp (replaced by load_cases_*) and the
+        corpus manifest (rewritten by build_corpus.py). Caches in all API and
+        worker processes therefore move to a new version together.
+        """
+        corpus = self._current_corpus_version()
+        return f"{_file_version(self._pointer_path())}:{_file_version(self._load_stamp_path())}:{corpus}"
+
+    def _current_corpus_version(self) -> str:
+        """Version of the attached corpus, reattaching it if another process rebuilt it."""
+        if self.corpus is None:
+            return "none"
+        try:
+            version = self.corpus.version
+            if version != self._corpus_version:
+                self.attach_corpus(self.corpus.path)
+        except (OSError, ValueError) as e:
+            # Mid-rebuild; keep serving the open corpus until the new one is complete
+            logger.warning("Could not reattach case corpus", extra={"path": self.corpus.path, "error": str(e)})
+            return "rebuilding"
+        return self._corpus_version
+
+    def attach_corpus(self, path: str):
+        """Open a converted case corpus for hit hydration and statistics."""
+        self.corpus = CaseCorpus(path)
+        self._corpus_version = self.corpus.version
+        logger.info("Attached case corpus", extra={"path": path, "cases": len(self.corpus)})
 
     def load_cases_from_csv(self, csv_path: str):
         """Load malpractice cases from CSV into vector database."""
@@ -57,64 +317,204 @@ class VectorDatabase:
                 metadatas.append(metadata)
                 ids.append(f"case_{idx}")
 
-            # Add to collection
-            self.collection.add(
-                documents=documents,
-                metadatas=metadatas,
-                ids=ids
-            )
+            # Upsert so a reload replaces cases under existing ids, within Chroma's maximum batch size
+            batch_size = self.client.max_batch_size
+            for start in range(0, len(documents), batch_size):
+                self.collection.upsert(
+                    documents=documents[start:start + batch_size],
+                    metadatas=metadatas[start:start + batch_size],
+                    ids=ids[start:start + batch_size]
+                )
+            self._write_load_stamp()
 
-            print(f"✅ Loaded {len(documents)} cases into vector database")
+            logger.info("Loaded cases into vector database", extra={"cases": len(documents)})
             return len(documents)
 
-        except Exception as e:
-            print(f"❌ Error loading cases: {e}")
+        except Exception:
+            logger.exception("Error loading cases")
+            raise
+
+    def load_cases_from_corpus(self, corpus_path: str):
+        """Index a converted case corpus, decoding one batch of text at a time.
+
+        Only the row number, the corpus build id and filterable fields are
+        stored as metadata; hits are hydrated from the corpus when they are
+        returned. Re-indexing a rebuilt corpus overwrites every row and drops
+        rows left over from the previous build.
+        """
+        try:
+            self.attach_corpus(corpus_path)
+
+            for start, documents, metadatas in self.corpus.iter_batches(self.client.max_batch_size):
+                self.collection.upsert(
+                    documents=documents,
+                    metadatas=metadatas,
+                    ids=[f"case_{start + i}" for i in range(len(documents))]
+                )
+            self.collection.delete(where={"corpus": {"$ne": self.corpus.build_id}})
+            self._write_load_stamp()
+
+            logger.info("Loaded cases into vector database", extra={"cases": len(self.corpus)})
+            return len(self.corpus)
+
+        except Exception:
+            logger.exception("Error loading cases")
             raise
 
     def search_similar_cases(
         self,
         query: str,
         n_results: int = 5
-    ) -> List[SimilarCase]:
+    ) -> List[CaseHit]:
         """Search for similar cases using semantic search."""
         try:
-            results = self.collection.query(
-                query_texts=[query],
-                n_results=n_results
-            )
+            with span("vector_db.query", queries=1, n_results=n_results):
+                results = self._current_collection().query(
+                    query_texts=[query],
+                    n_results=n_results
+                )
 
             similar_cases = []
 
             if results['metadatas'] and results['distances']:
-                for metadata, distance in zip(results['metadatas'][0], results['distances'][0]):
-                    # Convert distance to similarity score (0-1)
-                    similarity = 1 - distance
-
-                    similar_case = SimilarCase(
-                        case_name=metadata['case_name'],
-                        year=metadata['year'],
-                        specialty=metadata['specialty'],
-                        facts=metadata['facts'],
-                        verdict=metadata['verdict'],
-                        key_error=metadata['key_error'],
-                        settlement=metadata.get('settlement'),
-                        similarity_score=round(similarity, 2)
-                    )
-                    similar_cases.append(similar_case)
+                for case_id, metadata, distance in zip(
+                    results['ids'][0], results['metadatas'][0], results['distances'][0]
+                ):
+                    similar_cases.append(self._to_hit(case_id, self._hydrate(metadata), distance))
 
             return similar_cases
 
-        except Exception as e:
-            print(f"❌ Error searching cases: {e}")
-            return []
+        except Exception:
+            # Callers decide how to degrade without precedent
+            logger.exception("Error searching cases")
+            raise
+
+    def search_similar_cases_batch(
+        self,
+        queries: List[str],
+        n_results: int = 5,
+        batch_size: Optional[int] = None
+    ) -> List[CaseHit]:
+        """Search with several query chunks and merge hits into one ranked list."""
+        batch_size = batch_size or settings.RETRIEVAL_BATCH_SIZE
+        best: Dict[str, Tuple[float, Dict[str, Any]]] = {}
+
+        try:
+            collection = self._current_collection()
+            for offset in range(0, len(queries), batch_size):
+                # Chroma embeds all query texts of a batch in one call
+                batch = queries[offset:offset + batch_size]
+                with span("vector_db.query", queries=len(batch), n_results=n_results):
+                    results = collection.query(
+                        query_texts=batch,
+                        n_results=n_results
+                    )
+                if not (results['ids'] and results['distances']):
+                    continue
+
+                for ids, metadatas, distances in zip(
+                    results['ids'], results['metadatas'], results['distances']
+                ):
+                    for case_id, metadata, distance in zip(ids, metadatas, distances):
+                        if case_id not in best or distance < best[case_id][0]:
+                            best[case_id] = (distance, metadata)
+
+            ranked = sorted(best.items(), key=lambda item: (item[1][0], item[0]))
+            return [
+                self._to_hit(case_id, self._hydrate(metadata), distance)
+                for case_id, (distance, metadata) in ranked[:n_results]
+            ]
+
+        except Exception:
+            # Callers decide how to degrade without precedent
+            logger.exception("Error searching cases")
+            raise
+
+    def search_similar_to_indexed(self, case_ids: List[str], n_results: int = 5) -> List[List[CaseHit]]:
+        """Nearest other cases of indexed cases, queried with their stored embeddings.
+
+        Nothing is re-embedded, and each case is left out of its own hits (a
+        leave-one-out search). Ids missing from the index get no hits.
+        """
+        collection = self._current_collection()
+        stored = collection.get(ids=case_ids, include=["embeddings"])
+        embeddings = dict(zip(stored['ids'], stored['embeddings']))
+        known = [case_id for case_id in case_ids if case_id in embeddings]
+
+        hits: Dict[str, List[CaseHit]] = {}
+        if known:
+            with span("vector_db.query", queries=len(known), n_results=n_results + 1):
+                results = collection.query(
+                    query_embeddings=[embeddings[case_id] for case_id in known],
+                    n_results=n_results + 1,
+                    include=["metadatas", "distances"]
+                )
+            for case_id, ids, metadatas, distances in zip(
+                known, results['ids'], results['metadatas'], results['distances']
+            ):
+                hits[case_id] = [
+                    self._to_hit(hit_id, self._hydrate(metadata), distance)
+                    for hit_id, metadata, distance in zip(ids, metadatas, distances)
+                    if hit_id != case_id
+                ][:n_results]
+        return [hits.get(case_id, []) for case_id in case_ids]
+
+    def _hydrate(self, metadata: Dict[str, Any]) -> Dict[str, Any]:
+        """Full case metadata; corpus-indexed entries only carry their row number."""
+        if 'facts' in metadata:
+            return metadata
+        if self.corpus is None:
+            raise RuntimeError("Collection was indexed from a case corpus; set CASES_CORPUS_PATH")
+        if metadata.get('corpus') != self.corpus.build_id:
+            # Row numbers of another build point at different cases
+            raise RuntimeError(
+                "Case index was built from another corpus build; re-index it with build_corpus.py --index"
+            )
+        return self.corpus.case(metadata['row'])
+
+    @staticmethod
+    def _to_hit(case_id: str, metadata: Dict[str, Any], distance: float) -> CaseHit:
+        """Build a CaseHit from collection metadata and a cosine distance."""
+        return CaseHit(
+            case_id,
+            distance,
+            metadata['case_name'],
+            metadata['year'],
+            metadata['specialty'],
+            metadata['facts'],
+            metadata['verdict'],
+            metadata['key_error'],
+            metadata.get('settlement')
+        )
+
+    def get_case(self, case_id: str) -> Optional[CaseDetail]:
+        """A single case by id, or None if the index has no such case."""
+        results = self._current_collection().get(ids=[case_id], include=["metadatas"])
+        if not results['ids']:
+            return None
+        metadata = self._hydrate(results['metadatas'][0])
+        return CaseDetail(
+            case_id=case_id,
+            case_name=metadata['case_name'],
+            year=metadata['year'],
+            specialty=metadata['specialty'],
+            facts=metadata['facts'],
+            verdict=metadata['verdict'],
+            key_error=metadata['key_error'],
+            settlement=metadata.get('settlement')
+        )
 
     def get_collection_stats(self) -> Dict[str, Any]:
         """Get statistics about the collection."""
-        count = self.collection.count()
-        return {
+        collection = self._current_collection()
+        stats = {
             "collection_name": self.collection_name,
-            "total_cases": count
+            "total_cases": collection.count(),
+            "index": {"collection": collection.name, **(collection.metadata or {})},
         }
+        if self.corpus is not None:
+            stats["corpus"] = self.corpus.stats()
+        return stats
 
 
 # Singleton instance
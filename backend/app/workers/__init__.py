@@ -0,0 +1,3 @@
+from .analysis_worker import AnalysisWorker, run_worker_pool
+
+__all__ = ["AnalysisWorker", "run_worker_pool"]
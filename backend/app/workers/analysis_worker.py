@@ -0,0 +1,252 @@
+import logging
+import multiprocessing
+import os
+import signal
+import socket
+import sqlite3
+import threading
+import time
+from typing import Any, Dict, Optional
+from langgraph.checkpoint.sqlite import SqliteSaver
+from app.core.config import settings
+from app.core.telemetry import configure_telemetry, continue_trace, shutdown_telemetry
+from app.agents import create_risk_assessment_workflow, create_initial_state, response_builder
+from app.schemas import CaseAnalysisRequest
+from app.services import (
+    job_store,
+    document_ingestion,
+    vector_db,
+    clinical_standards,
+    analysis_reuse,
+    llm_client,
+)
+
+logger = logging.getLogger(__name__)
+
+
+class AnalysisWorker:
+    """Claims analysis jobs from the job store and runs them through the checkpointed workflow."""
+
+    def __init__(self, worker_id: Optional[str] = None):
+        self.worker_id = worker_id or f"{socket.gethostname()}-{os.getpid()}"
+        self.stop_event = threading.Event()
+        self._checkpointer = None
+        self._app = None
+
+    def run_forever(self):
+        """Poll the job store until stop() is called."""
+        logger.info("Worker started", extra={"worker_id": self.worker_id})
+
+        while not self.stop_event.is_set():
+            job = job_store.claim(self.worker_id)
+            if job is None:
+                self.stop_event.wait(settings.JOB_POLL_INTERVAL_SECONDS)
+                continue
+            self.process(job)
+
+        logger.info("Worker stopped", extra={"worker_id": self.worker_id})
+
+    def stop(self):
+        """Ask the worker loop to exit after the current job."""
+        self.stop_event.set()
+
+    def process(self, job: Dict[str, Any]):
+        """Run a single claimed job and record its result, continuing the request's trace."""
+        with continue_trace(
+            job["payload"].get("trace"),
+            "analysis.job",
+            job_id=job["id"],
+            job_kind=job["kind"],
+            tenant=job["tenant"],
+            attempt=job["attempts"],
+            worker_id=self.worker_id
+        ):
+            self._process(job)
+
+    def _process(self, job: Dict[str, Any]):
+        job_id = job["id"]
+        heartbeat_stop = threading.Event()
+        heartbeat = threading.Thread(
+            target=self._heartbeat, args=(job_id, heartbeat_stop), daemon=True
+        )
+        heartbeat.start()
+
+        # Tokens count against the tenant's hourly quota; recorded LLM responses stay with the tenant
+        with llm_client.track_usage() as usage, llm_client.for_tenant(job["tenant"]):
+            try:
+                final_state = self._run_workflow(job)
+
+                if final_state.get('error'):
+                    raise RuntimeError(final_state['error'])
+
+                response = response_builder.build(final_state)
+                tokens = self._tokens(usage)
+                if not job_store.complete(job_id, self.worker_id, response.model_dump(mode="json"), tokens=tokens):
+                    self._lost_lease(job)
+                    return
+                self._discard_checkpoints(job_id)
+                self._discard_upload(job)
+                logger.info(
+                    "Job completed",
+                    extra={"job_id": job_id, "tenant": job["tenant"], "tokens": tokens}
+                )
+
+                if not final_state.get('reused_from'):
+                    self._index_for_reuse(job, final_state)
+
+            except Exception as e:
+                logger.error("Job failed", extra={"job_id": job_id, "tenant": job["tenant"], "error": str(e)})
+                if not job_store.fail(job_id, self.worker_id, str(e), tokens=self._tokens(usage)):
+                    self._lost_lease(job)
+                    return
+                self._discard_checkpoints(job_id)
+                self._discard_upload(job)
+
+            finally:
+                heartbeat_stop.set()
+
+    def _lost_lease(self, job: Dict[str, Any]):
+        """The lease expired before the job finished; its new owner keeps the checkpoints and upload."""
+        logger.warning(
+            "Lease lost, result discarded",
+            extra={"job_id": job["id"], "tenant": job["tenant"], "worker_id": self.worker_id}
+        )
+
+    @staticmethod
+    def _tokens(usage: Dict[str, int]) -> int:
+        return usage["input_tokens"] + usage["output_tokens"]
+
+    def _run_workflow(self, job: Dict[str, Any]) -> Dict[str, Any]:
+        """Start the workflow, or resume it from the last checkpoint after a crash."""
+        app = self._get_app()
+        config = {"configurable": {"thread_id": job["id"]}}
+        snapshot = app.get_state(config)
+
+        if snapshot.next:
+            logger.info("Resuming job from checkpoint", extra={"job_id": job["id"], "next": list(snapshot.next)})
+            # The original deadline passed while the lease expired; give the remaining steps a fresh one
+            app.update_state(config, {
+                "deadline": time.time() + settings.ANALYSIS_DEADLINE_SECONDS,
+                "tenant": job["tenant"],
+            })
+            return app.invoke(None, config)
+
+        if snapshot.values:
+            # Every node finished before the crash; only the result write was lost
+            return snapshot.values
+
+        case_description = self._case_description(job)
+        return app.invoke(create_initial_state(case_description, tenant=job["tenant"]), config)
+
+    def _case_description(self, job: Dict[str, Any]) -> str:
+        """Get the case text for a job, normalizing spooled uploads."""
+        payload = job["payload"]
+
+        if job["kind"] == "upload":
+            case_description = document_ingestion.normalize_file(payload["path"], payload["format"])
+        else:
+            case_description = payload["case_description"]
+
+        # Uploads are validated here rather than in the request handler
+        return CaseAnalysisRequest(case_description=case_description).case_description
+
+    def _get_app(self):
+        """Build the checkpointed workflow lazily, once per worker process."""
+        if self._app is None:
+            directory = os.path.dirname(settings.CHECKPOINT_DB_PATH)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            conn = sqlite3.connect(settings.CHECKPOINT_DB_PATH, check_same_thread=False, timeout=30)
+            # Workers share the checkpoint database; WAL keeps their writes from blocking each other
+            conn.execute("PRAGMA journal_mode=WAL")
+            self._checkpointer = SqliteSaver(conn)
+            self._app = create_risk_assessment_workflow(checkpointer=self._checkpointer)
+        return self._app
+
+    def _heartbeat(self, job_id: str, stop: threading.Event):
+        """Keep the job lease alive while the workflow runs."""
+        interval = max(settings.JOB_LEASE_SECONDS / 3, 1)
+        while not stop.wait(interval):
+            job_store.heartbeat(job_id, self.worker_id)
+
+    def _discard_checkpoints(self, job_id: str):
+        """Drop checkpoints of a finished job."""
+        try:
+            self._checkpointer.delete_thread(job_id)
+        except Exception as e:
+            logger.warning("Could not delete checkpoints", extra={"job_id": job_id, "error": str(e)})
+
+    def _index_for_reuse(self, job: Dict[str, Any], state: Dict[str, Any]):
+        """Make a fresh analysis available to near-duplicate cases of the same tenant."""
+        try:
+            analysis_reuse.add(job["id"], job["tenant"], state)
+        except Exception as e:
+            logger.warning("Could not index job for reuse", extra={"job_id": job["id"], "error": str(e)})
+
+    def _discard_upload(self, job: Dict[str, Any]):
+        """Remove the spool file of a finished upload job."""
+        if job["kind"] == "upload":
+            document_ingestion.discard(job["payload"]["path"])
+
+
+def _worker_main(index: int):
+    """Entry point of a worker process."""
+    # Services are initialized per process; Chroma clients must not cross a fork
+    configure_telemetry("analysis-worker")
+    vector_db.initialize()
+    analysis_reuse.initialize()
+    clinical_standards.load_standards()
+
+    worker = AnalysisWorker(worker_id=f"{socket.gethostname()}-{os.getpid()}-{index}")
+    signal.signal(signal.SIGTERM, lambda *_: worker.stop())
+    signal.signal(signal.SIGINT, lambda *_: worker.stop())
+    try:
+        worker.run_forever()
+    finally:
+        shutdown_telemetry()
+
+
+def run_worker_pool(concurrency: Optional[int] = None):
+    """Run JOB_WORKER_CONCURRENCY worker processes until interrupted."""
+    concurrency = concurrency or settings.JOB_WORKER_CONCURRENCY
+    configure_telemetry("analysis-worker")
+    job_store.initialize()
+
+    processes = [_start_worker_process(i) for i in range(concurrency)]
+    stopping = threading.Event()
+
+    logger.info("Started analysis workers", extra={"concurrency": concurrency})
+
+    def shutdown(*_):
+        stopping.set()
+        for process in processes:
+            if process.is_alive():
+                process.terminate()
+
+    signal.signal(signal.SIGTERM, shutdown)
+    signal.signal(signal.SIGINT, shutdown)
+
+    try:
+        while not stopping.is_set():
+            for i, process in enumerate(processes):
+                # Replace crashed workers; their jobs resume once the lease expires
+                if not process.is_alive() and not stopping.is_set():
+                    logger.warning(
+                        "Worker exited, restarting",
+                        extra={"worker": process.name, "exitcode": process.exitcode}
+                    )
+                    processes[i] = _start_worker_process(i)
+            stopping.wait(1)
+    finally:
+        for process in processes:
+            process.join()
+        shutdown_telemetry()
+
+
+def _start_worker_process(index: int) -> multiprocessing.Process:
+    """Start one worker process."""
+    process = multiprocessing.Process(
+        target=_worker_main, args=(index,), name=f"analysis-worker-{index}"
+    )
+    process.start()
+    return process
@@ -0,0 +1,113 @@
+import hashlib
+import json
+import os
+import platform
+import subprocess
+import tempfile
+import time
+from typing import Any, Dict, List, Optional
+
+import numpy as np
+
+
+RESULTS_DIR = os.path.join(os.path.dirname(__file__), "results")
+REPO_DATA_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "..", "data"))
+
+
+def configure_environment(workdir: Optional[str] = None) -> str:
+    """Point every data path at a scratch directory before the app modules are imported."""
+    workdir = workdir or tempfile.mkdtemp(prefix="mrs-bench-")
+    os.environ.setdefault("ANTHROPIC_API_KEY", "benchmark")
+    os.environ["CHROMA_DB_PATH"] = os.path.join(workdir, "chroma_db")
+    os.environ["JOB_DB_PATH"] = os.path.join(workdir, "jobs.sqlite3")
+    os.environ["CHECKPOINT_DB_PATH"] = os.path.join(workdir, "checkpoints.sqlite3")
+    os.environ["UPLOAD_SPOOL_DIR"] = os.path.join(workdir, "uploads")
+    return workdir
+
+
+class HashEmbeddingFunction:
+    """Deterministic feature-hashing embedding; isolates index cost from model inference."""
+
+    def __init__(self, dim: int = 384):
+        self.dim = dim
+
+    def __call__(self, input: List[str]) -> List[List[float]]:
+        vectors = np.zeros((len(input), self.dim), dtype=np.float32)
+        for row, text in enumerate(input):
+            for token in text.lower().split():
+                digest = hashlib.blake2b(token.encode(), digest_size=8).digest()
+                bucket = int.from_bytes(digest[:4], "little") % self.dim
+                sign = 1.0 if digest[4] & 1 else -1.0
+                vectors[row, bucket] += sign
+        norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+        norms[norms == 0] = 1.0
+        return (vectors / norms).tolist()
+
+
+def summarize(latencies: List[float]) -> Dict[str, float]:
+    """Latency summary in milliseconds."""
+    if not latencies:
+        return {"count": 0}
+    values = np.asarray(latencies) * 1000
+    return {
+        "count": int(values.size),
+        "mean_ms": round(float(values.mean()), 3),
+        "p50_ms": round(float(np.percentile(values, 50)), 3),
+        "p95_ms": round(float(np.percentile(values, 95)), 3),
+        "p99_ms": round(float(np.percentile(values, 99)), 3),
+        "max_ms": round(float(values.max()), 3),
+    }
+
+
+def time_calls(fn, repeat: int, warmup: int = 3) -> Dict[str, float]:
+    """Call fn repeatedly and summarize per-call latency and throughput."""
+    for _ in range(warmup):
+        fn()
+    latencies = []
+    started = time.perf_counter()
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        fn()
+        latencies.append(time.perf_counter() - t0)
+    elapsed = time.perf_counter() - started
+    summary = summarize(latencies)
+    summary["ops_per_sec"] = round(repeat / elapsed, 2) if elapsed else None
+    return summary
+
+
+def git_commit() -> Optional[str]:
+    """Current commit hash, if run inside a git checkout."""
+    try:
+        return subprocess.check_output(
+            ["git", "rev-parse", "--short", "HEAD"],
+            cwd=os.path.dirname(__file__),
+            stderr=subprocess.DEVNULL
+        ).decode().strip()
+    except Exception:
+        return None
+
+
+def write_results(name: str, results: Dict[str, Any], output: Optional[str] = None) -> str:
+    """Write benchmark results as JSON, tagged with commit and machine info."""
+    commit = git_commit()
+    payload = {
+        "benchmark": name,
+        "commit": commit,
+        "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "python": platform.python_version(),
+        "machine": platform.machine(),
+        "cpu_count": os.cpu_count(),
+        "results": results,
+    }
+
+    if output is None:
+        os.makedirs(RESULTS_DIR, exist_ok=True)
+        output = os.path.join(
+            RESULTS_DIR, f"{name}-{commit or 'nogit'}-{time.strftime('%Y%m%d-%H%M%S')}.json"
+        )
+
+    with open(output, "w", encoding="utf-8") as f:
+        json.dump(payload, f, indent=2)
+
+    print(f"✅ Wrote {output}")
+    return output
@@ -0,0 +1,74 @@
+import argparse
+import json
+from typing import Any, Dict
+
+
+# Metrics where a larger value is an improvement; the rest are times, sizes and
+# error rates where smaller is better, except the descriptive ones below
+HIGHER_IS_BETTER = (
+    "_per_sec", "_rps", "recall", "precision", "auc", "coverage", "accuracy",
+)
+# Sample sizes, base rates and run parameters: reported, never flagged
+NO_DIRECTION = (
+    "count", "cases", "labeled_cases", "plaintiff_rate", "observed_rate",
+    "mean_predicted", "workers", "chunk_size",
+)
+
+
+def direction(name: str) -> int:
+    """1 if a larger value of the metric is better, -1 if smaller is better, 0 if neither."""
+    leaf = name.rsplit(".", 1)[-1].split("[", 1)[0]
+    if leaf in NO_DIRECTION:
+        return 0
+    return 1 if leaf.endswith(HIGHER_IS_BETTER) else -1
+
+
+def flatten(value: Any, prefix: str = "") -> Dict[str, float]:
+    """Flatten nested results into dotted metric names; list items are keyed by position."""
+    metrics: Dict[str, float] = {}
+    if isinstance(value, dict):
+        for key, item in value.items():
+            metrics.update(flatten(item, f"{prefix}.{key}" if prefix else key))
+    elif isinstance(value, list):
+        for i, item in enumerate(value):
+            metrics.update(flatten(item, f"{prefix}[{i}]"))
+    elif isinstance(value, (int, float)) and not isinstance(value, bool):
+        metrics[prefix] = float(value)
+    return metrics
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare two benchmark result files")
+    parser.add_argument("baseline")
+    parser.add_argument("candidate")
+    parser.add_argument("--threshold", type=float, default=10.0, help="flag changes above this percent")
+    args = parser.parse_args()
+
+    with open(args.baseline) as f:
+        baseline = json.load(f)
+    with open(args.candidate) as f:
+        candidate = json.load(f)
+
+    print(f"{baseline.get('commit')} -> {candidate.get('commit')} ({baseline.get('benchmark')})")
+    before = flatten(baseline["results"])
+    after = flatten(candidate["results"])
+
+    regressions = 0
+    for name in sorted(before.keys() & after.keys()):
+        old, new = before[name], after[name]
+        if old == 0:
+            continue
+        change = (new - old) / abs(old) * 100
+        sign = direction(name)
+        better = change * sign > 0
+        flag = ""
+        if sign and abs(change) >= args.threshold:
+            flag = "  improved" if better else "  REGRESSED"
+            regressions += 0 if better else 1
+        print(f"{name:60s} {old:14.3f} {new:14.3f} {change:+8.1f}%{flag}")
+
+    print(f"\n{regressions} metrics regressed by more than {args.threshold}%")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,74 @@
+import argparse
+import csv
+import random
+from typing import Iterator, List
+
+
+SPECIALTIES = ["Emergency", "Cardiology", "Pediatrics", "Radiology", "Surgery", "Obstetrics", "Neurology", "Internal Medicine"]
+VERDICTS = ["Plaintiff", "Defense", "Settlement"]
+HOSPITALS = ["Memorial Hospital", "County Hospital", "St. Mary's", "University Medical Center", "Regional Health", "Mercy Clinic"]
+SURNAMES = ["Johnson", "Smith", "Garcia", "Lee", "Patel", "Brown", "Nguyen", "Miller", "Davis", "Lopez"]
+PRESENTATIONS = [
+    ("chest pain", "ECG", "myocardial infarction"),
+    ("headache and fever", "lumbar puncture", "meningitis"),
+    ("abdominal pain", "CT abdomen", "appendicitis"),
+    ("shortness of breath", "D-dimer", "pulmonary embolism"),
+    ("back pain with weakness", "MRI spine", "cauda equina syndrome"),
+    ("slurred speech", "CT head", "stroke"),
+    ("testicular pain", "ultrasound", "testicular torsion"),
+    ("fall on anticoagulants", "CT head", "subdural hematoma"),
+]
+OUTCOMES = ["died", "suffered permanent disability", "required emergency surgery", "was readmitted in critical condition"]
+
+
+def generate_cases(count: int, seed: int = 42) -> Iterator[List[str]]:
+    """Yield synthetic case rows in the malpractice_cases.csv schema."""
+    rng = random.Random(seed)
+
+    for i in range(count):
+        complaint, test, diagnosis = rng.choice(PRESENTATIONS)
+        age = rng.randint(1, 90)
+        sex = rng.choice("MF")
+        verdict = rng.choices(VERDICTS, weights=[0.45, 0.35, 0.2])[0]
+        hours = rng.randint(2, 72)
+        facts = (
+            f"{age}{sex} presented with {complaint}. "
+            f"{rng.choice(['No', 'Delayed', 'Misread'])} {test}. "
+            f"Discharged after {rng.randint(1, 6)} hours. "
+            f"Patient {rng.choice(OUTCOMES)} from {diagnosis} {hours} hours later."
+        )
+        settlement = "N/A" if verdict == "Defense" else f"${rng.randint(1, 90) / 10:.1f}M"
+
+        yield [
+            f"{rng.choice(SURNAMES)} v. {rng.choice(HOSPITALS)} #{i}",
+            str(rng.randint(1995, 2024)),
+            rng.choice(SPECIALTIES),
+            facts,
+            verdict,
+            f"Failed to obtain {test} to rule out {diagnosis}",
+            settlement,
+        ]
+
+
+def write_corpus(path: str, count: int, seed: int = 42) -> str:
+    """Write a synthetic corpus CSV, streaming rows so 1M cases stay within constant memory."""
+    with open(path, "w", newline="", encoding="utf-8") as f:
+        writer = csv.writer(f)
+        writer.writerow(["Case Name", "Year", "Specialty", "Facts", "Verdict", "Key Error", "Settlement"])
+        writer.writerows(generate_cases(count, seed))
+    return path
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Generate a seeded synthetic malpractice case corpus")
+    parser.add_argument("output", help="CSV path to write")
+    parser.add_argument("--count", type=int, default=1000)
+    parser.add_argument("--seed", type=int, default=42)
+    args = parser.parse_args()
+
+    write_corpus(args.output, args.count, args.seed)
+    print(f"✅ Wrote {args.count} cases to {args.output}")
+
+
+if __name__ == "__main__":
+    main()
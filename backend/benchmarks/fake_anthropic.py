@@ -0,0 +1,136 @@
+import hashlib
+import json
+import random
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Optional
+
+
+TESTS = ["ECG", "troponin", "chest X-ray", "CBC", "BMP", "D-dimer", "CT head", "lumbar puncture", "urinalysis"]
+TREATMENTS = ["aspirin 325mg", "nitroglycerin", "IV fluids", "ondansetron", "acetaminophen", "ceftriaxone"]
+COMPLAINTS = ["chest pain", "headache", "abdominal pain", "shortness of breath", "fever"]
+RISK_TYPES = ["missed_diagnosis", "inadequate_workup", "documentation_deficiency", "treatment_error"]
+
+
+class FakeAnthropicServer:
+    """In-process stand-in for the Anthropic Messages API with configurable latency.
+
+    Each response takes ``first_token_latency + output_tokens / tokens_per_second``
+    seconds and returns well-formed JSON for the three workflow prompts.
+    """
+
+    def __init__(
+        self,
+        host: str = "127.0.0.1",
+        port: int = 0,
+        first_token_latency: float = 0.4,
+        tokens_per_second: float = 80.0,
+        seed: int = 0
+    ):
+        self.first_token_latency = first_token_latency
+        self.tokens_per_second = tokens_per_second
+        self.seed = seed
+        self.request_count = 0
+        self._lock = threading.Lock()
+        self._server = ThreadingHTTPServer((host, port), self._handler_class())
+        self._server.daemon_threads = True
+        self._thread: Optional[threading.Thread] = None
+
+    @property
+    def base_url(self) -> str:
+        host, port = self._server.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def start(self) -> "FakeAnthropicServer":
+        self._thread = threading.Thread(target=self._server.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._server.shutdown()
+        self._server.server_close()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
+
+    def respond(self, prompt: str) -> str:
+        """Deterministic response text for a workflow prompt."""
+        rng = random.Random(f"{self.seed}:{hashlib.sha1(prompt.encode()).hexdigest()}")
+
+        if "extraction expert" in prompt:
+            return json.dumps({
+                "age": rng.randint(18, 90),
+                "gender": rng.choice(["male", "female"]),
+                "chief_complaint": rng.choice(COMPLAINTS),
+                "tests_performed": rng.sample(TESTS, 3),
+                "tests_not_performed": rng.sample(TESTS, 2),
+                "treatment_given": rng.sample(TREATMENTS, 2),
+                "disposition": rng.choice(["sent home", "admitted", None]),
+            })
+
+        if "Identify ALL potential legal risks" in prompt:
+            return json.dumps([
+                {
+                    "type": rng.choice(RISK_TYPES),
+                    "severity": rng.randint(2, 10),
+                    "description": f"{rng.choice(TESTS)} not documented before disposition",
+                    "standard_violated": f"Obtain {rng.choice(TESTS)} for {rng.choice(COMPLAINTS)}",
+                    "legal_precedent": None,
+                    "mitigation": f"Order and document {rng.choice(TESTS)}",
+                }
+                for _ in range(rng.randint(1, 5))
+            ])
+
+        return json.dumps({
+            "action_items": [f"Document {test} result and reasoning" for test in rng.sample(TESTS, 3)],
+            "protective_documentation": " ".join(
+                f"Considered and addressed {test}." for test in rng.sample(TESTS, 5)
+            ) * 8,
+        })
+
+    def _handler_class(self):
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_POST(self):
+                length = int(self.headers.get("content-length", 0))
+                body = json.loads(self.rfile.read(length) or b"{}")
+                prompt = "".join(
+                    part if isinstance(part, str) else part.get("text", "")
+                    for message in body.get("messages", [])
+                    for part in ([message["content"]] if isinstance(message["content"], str) else message["content"])
+                )
+
+                text = server.respond(prompt)
+                input_tokens = max(1, len(prompt) // 4)
+                output_tokens = max(1, len(text) // 4)
+                time.sleep(server.first_token_latency + output_tokens / server.tokens_per_second)
+
+                with server._lock:
+                    server.request_count += 1
+
+                payload = json.dumps({
+                    "id": f"msg_{server.request_count:08d}",
+                    "type": "message",
+                    "role": "assistant",
+                    "model": body.get("model", "stub"),
+                    "content": [{"type": "text", "text": text}],
+                    "stop_reason": "end_turn",
+                    "stop_sequence": None,
+                    "usage": {"input_tokens": input_tokens, "output_tokens": output_tokens},
+                }).encode()
+
+                self.send_response(200)
+                self.send_header("content-type", "application/json")
+                self.send_header("content-length", str(len(payload)))
+                self.end_headers()
+                self.wfile.write(payload)
+
+            def log_message(self, *args):
+                pass
+
+        return Handler
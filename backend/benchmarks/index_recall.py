@@ -0,0 +1,130 @@
+import argparse
+import itertools
+import os
+import time
+from typing import Dict, List
+
+import numpy as np
+
+from benchmarks.common import configure_environment, HashEmbeddingFunction, summarize, write_results
+from benchmarks.corpus import generate_cases
+
+WORKDIR = configure_environment()
+
+import chromadb  # noqa: E402
+from chromadb.config import Settings as ChromaSettings  # noqa: E402
+from app.services import CaseCorpus  # noqa: E402
+from app.services.vector_db import index_metadata  # noqa: E402
+
+
+def load_texts(args) -> List[str]:
+    """Case facts from a converted corpus, or a synthetic corpus."""
+    if args.corpus:
+        corpus = CaseCorpus(args.corpus)
+        return [corpus.text("facts", row) for row in range(min(len(corpus), args.size))]
+    return [row[3] for row in generate_cases(args.size, args.seed)]
+
+
+def embed(texts: List[str], embedding: str) -> np.ndarray:
+    """Unit-normalized embeddings, computed once for every configuration."""
+    if embedding == "hash":
+        fn = HashEmbeddingFunction()
+    else:
+        from chromadb.utils.embedding_functions import DefaultEmbeddingFunction
+        fn = DefaultEmbeddingFunction()
+    vectors = np.asarray(fn(texts), dtype=np.float32)
+    norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+    norms[norms == 0] = 1.0
+    return vectors / norms
+
+
+def exact_kth_scores(corpus: np.ndarray, queries: np.ndarray, k: int) -> np.ndarray:
+    """Brute-force cosine similarity of each query's k-th nearest case.
+
+    Recall counts a returned case as correct when it scores at least this
+    high, so ties at the k-th place (common with templated case text) do not
+    depend on which of the tied ids the index returns.
+    """
+    scores = queries @ corpus.T
+    return -np.partition(-scores, k - 1, axis=1)[:, k - 1]
+
+
+def measure(client, vectors: np.ndarray, queries: np.ndarray, kth: np.ndarray, k: int, params: Dict[str, int]):
+    """Build one index and measure build time, recall@k and per-query latency."""
+    name = "sweep-" + "-".join(f"{key}{value}" for key, value in params.items())
+    collection = client.create_collection(name=name, metadata=index_metadata(**params))
+
+    started = time.perf_counter()
+    ids = [f"case_{i}" for i in range(len(vectors))]
+    for start in range(0, len(vectors), client.max_batch_size):
+        end = start + client.max_batch_size
+        collection.add(ids=ids[start:end], embeddings=vectors[start:end].tolist())
+    build_seconds = time.perf_counter() - started
+
+    latencies = []
+    hits = 0
+    for query, threshold in zip(queries, kth):
+        t0 = time.perf_counter()
+        result = collection.query(query_embeddings=[query.tolist()], n_results=k, include=[])
+        latencies.append(time.perf_counter() - t0)
+        rows = [int(case_id.split("_", 1)[1]) for case_id in result["ids"][0]]
+        hits += int(np.sum(vectors[rows] @ query >= threshold - 1e-5))
+
+    client.delete_collection(name)
+    return {
+        **params,
+        "build_seconds": round(build_seconds, 3),
+        # recall@k; k is recorded once in the results, so metric names match compare.py
+        "recall": round(hits / (k * len(queries)), 4),
+        "latency": summarize(latencies),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Recall@k vs. latency of HNSW parameters against brute force")
+    parser.add_argument("--size", type=int, default=20000, help="cases to index")
+    parser.add_argument("--corpus", help="converted case corpus to sample (default: synthetic cases)")
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--k", type=int, default=5)
+    parser.add_argument("--m", default="8,16,32", help="comma-separated hnsw:M values")
+    parser.add_argument("--ef-construction", default="100,200")
+    parser.add_argument("--ef-search", default="10,32,64,128")
+    parser.add_argument("--batch-size", default="100")
+    parser.add_argument("--embedding", choices=["hash", "default"], default="hash",
+                        help="hash is fast; default uses Chroma's embedding model")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--output", help="JSON output path (default: benchmarks/results/)")
+    args = parser.parse_args()
+
+    texts = load_texts(args)
+    vectors = embed(texts, args.embedding)
+    query_texts = [row[3] for row in generate_cases(args.queries, args.seed + 1)]
+    queries = embed(query_texts, args.embedding)
+    kth = exact_kth_scores(vectors, queries, args.k)
+
+    client = chromadb.PersistentClient(
+        path=os.path.join(WORKDIR, "sweep"), settings=ChromaSettings(anonymized_telemetry=False)
+    )
+    grid = itertools.product(
+        *(map(int, values.split(",")) for values in (args.m, args.ef_construction, args.ef_search, args.batch_size))
+    )
+    runs = []
+    for m, construction_ef, search_ef, batch_size in grid:
+        params = {"M": m, "construction_ef": construction_ef, "search_ef": search_ef, "batch_size": batch_size}
+        run = measure(client, vectors, queries, kth, args.k, params)
+        print(f"⏱  M={m} ef_construction={construction_ef} ef_search={search_ef}: "
+              f"recall@{args.k}={run['recall']} p50={run['latency']['p50_ms']}ms "
+              f"p95={run['latency']['p95_ms']}ms build={run['build_seconds']}s")
+        runs.append(run)
+
+    write_results("index_recall", {
+        "cases": len(vectors),
+        "queries": len(queries),
+        "k": args.k,
+        "embedding": args.embedding,
+        "runs": runs,
+    }, args.output)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,206 @@
+import argparse
+import asyncio
+import json
+import os
+import threading
+import time
+from collections import Counter
+from typing import Any, Dict, List, Optional
+
+import httpx
+
+from benchmarks.common import configure_environment, HashEmbeddingFunction, summarize, write_results
+from benchmarks.corpus import generate_cases, write_corpus
+from benchmarks.fake_anthropic import FakeAnthropicServer
+
+
+async def run_level(
+    url: str,
+    cases: List[str],
+    concurrency: int,
+    total: int,
+    timeout: float,
+    tenant: Optional[str] = None
+) -> Dict[str, Any]:
+    """Send `total` analyze requests with at most `concurrency` in flight."""
+    semaphore = asyncio.Semaphore(concurrency)
+    latencies: List[float] = []
+    statuses: Counter = Counter()
+    headers = {"X-Tenant-ID": tenant} if tenant else {}
+
+    async with httpx.AsyncClient(base_url=url, timeout=timeout, headers=headers) as client:
+        async def one(i: int):
+            async with semaphore:
+                t0 = time.perf_counter()
+                try:
+                    response = await client.post(
+                        "/api/v1/analyze", json={"case_description": cases[i % len(cases)]}
+                    )
+                    statuses[str(response.status_code)] += 1
+                    if response.status_code == 200:
+                        latencies.append(time.perf_counter() - t0)
+                except httpx.HTTPError as e:
+                    statuses[type(e).__name__] += 1
+
+        started = time.perf_counter()
+        await asyncio.gather(*(one(i) for i in range(total)))
+        elapsed = time.perf_counter() - started
+
+    result = summarize(latencies)
+    result.update(
+        tenant=tenant,
+        concurrency=concurrency,
+        requests=total,
+        wall_seconds=round(elapsed, 3),
+        throughput_rps=round(len(latencies) / elapsed, 3) if elapsed else None,
+        statuses=dict(statuses),
+    )
+    return result
+
+
+async def run_tenant_mix(url: str, cases: List[str], args) -> Dict[str, Any]:
+    """Interactive requests of one tenant while a bulk tenant floods the queue."""
+    bulk = asyncio.create_task(run_level(
+        url, cases, args.bulk_concurrency, args.bulk_requests, args.timeout, tenant=args.bulk_tenant
+    ))
+    # Let the bulk backlog build up first
+    await asyncio.sleep(1.0)
+    interactive = await run_level(
+        url, cases, 1, args.requests_per_level, args.timeout, tenant=args.interactive_tenant
+    )
+    return {"interactive": interactive, "bulk": await bulk}
+
+
+def start_local_stack(args) -> Dict[str, Any]:
+    """Start the fake Anthropic server, the API and in-process workers on localhost."""
+    workdir = configure_environment()
+    stub = FakeAnthropicServer(
+        first_token_latency=args.first_token_latency,
+        tokens_per_second=args.tokens_per_second,
+        seed=args.seed
+    ).start()
+    os.environ["ANTHROPIC_BASE_URL"] = stub.base_url
+    os.environ["ANALYZE_WAIT_SECONDS"] = str(args.timeout)
+    os.environ["JOB_POLL_INTERVAL_SECONDS"] = "0.05"
+    os.environ["JOB_WORKER_CONCURRENCY"] = str(args.workers)
+    os.environ["JOB_QUEUE_MAX_PENDING"] = str(args.max_pending)
+    # Synthetic cases are templated; reuse would short-circuit most of the pipeline
+    os.environ["REUSE_ENABLED"] = "true" if args.reuse else "false"
+    os.environ["COALESCE_ENABLED"] = "false" if args.no_coalesce else "true"
+    if args.tenant_mix:
+        # The bulk tenant may never take the last worker
+        os.environ.setdefault("TENANT_QUOTAS", json.dumps({
+            args.interactive_tenant: {"weight": 4},
+            args.bulk_tenant: {"weight": 1, "max_concurrent": max(1, args.workers - 1)},
+        }))
+
+    import uvicorn
+    import main
+    from app.services import vector_db
+    from app.workers import AnalysisWorker
+
+    # Seed the case collection with a synthetic corpus
+    vector_db.embedding_function = HashEmbeddingFunction()
+    vector_db.initialize()
+    vector_db.load_cases_from_csv(
+        write_corpus(os.path.join(workdir, "corpus.csv"), args.corpus_size, args.seed)
+    )
+
+    server = uvicorn.Server(uvicorn.Config(main.app, host="127.0.0.1", port=args.port, log_level="warning"))
+    threading.Thread(target=server.run, daemon=True).start()
+    while not server.started:
+        time.sleep(0.05)
+
+    workers = [AnalysisWorker(worker_id=f"bench-{i}") for i in range(args.workers)]
+    for worker in workers:
+        threading.Thread(target=worker.run_forever, daemon=True).start()
+
+    return {"stub": stub, "server": server, "workers": workers}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="End-to-end load test for /api/v1/analyze")
+    parser.add_argument("--url", help="target an already running API instead of the local stack")
+    parser.add_argument("--concurrency", default="1,4,16", help="comma-separated concurrency levels")
+    parser.add_argument("--requests-per-level", type=int, default=32)
+    parser.add_argument("--timeout", type=float, default=120.0)
+    parser.add_argument("--workers", type=int, default=4, help="local stack: worker count")
+    parser.add_argument("--max-pending", type=int, default=1000, help="local stack: queue capacity")
+    parser.add_argument("--corpus-size", type=int, default=1000, help="local stack: cases to index")
+    parser.add_argument("--first-token-latency", type=float, default=0.4, help="stub latency (s)")
+    parser.add_argument("--tokens-per-second", type=float, default=80.0, help="stub output rate")
+    parser.add_argument("--reuse", action="store_true", help="local stack: allow near-duplicate reuse")
+    parser.add_argument("--distinct-cases", type=int, default=None,
+                        help="cycle through this many case texts; few cases model double submits")
+    parser.add_argument("--no-coalesce", action="store_true",
+                        help="local stack: run identical in-flight requests separately")
+    parser.add_argument("--tenant-mix", action="store_true",
+                        help="measure interactive latency alone and while a bulk tenant floods the queue")
+    parser.add_argument("--interactive-tenant", default="ed")
+    parser.add_argument("--bulk-tenant", default="bulk-review")
+    parser.add_argument("--bulk-requests", type=int, default=200)
+    parser.add_argument("--bulk-concurrency", type=int, default=64)
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--output", help="JSON output path (default: benchmarks/results/)")
+    args = parser.parse_args()
+
+    stack = None
+    url = args.url
+    if url is None:
+        stack = start_local_stack(args)
+        url = f"http://127.0.0.1:{args.port}"
+
+    distinct = args.distinct_cases or max(args.requests_per_level, 64)
+    cases = [row[3] for row in generate_cases(distinct, args.seed + 7)]
+    levels = []
+    tenant_mix = None
+    if args.tenant_mix:
+        print(f"⏱  {args.interactive_tenant} alone...")
+        alone = asyncio.run(run_level(
+            url, cases, 1, args.requests_per_level, args.timeout, tenant=args.interactive_tenant
+        ))
+        print(f"⏱  {args.interactive_tenant} while {args.bulk_tenant} sends {args.bulk_requests} requests...")
+        mixed = asyncio.run(run_tenant_mix(url, cases, args))
+        print(f"   {args.interactive_tenant} p50 {alone.get('p50_ms')} -> {mixed['interactive'].get('p50_ms')}ms, "
+              f"p95 {alone.get('p95_ms')} -> {mixed['interactive'].get('p95_ms')}ms; "
+              f"{args.bulk_tenant} statuses {mixed['bulk']['statuses']}")
+        tenant_mix = {"interactive_alone": alone, **mixed}
+    else:
+        for concurrency in (int(c) for c in args.concurrency.split(",")):
+            print(f"⏱  Concurrency {concurrency}...")
+            level = asyncio.run(run_level(url, cases, concurrency, args.requests_per_level, args.timeout))
+            print(f"   p50={level.get('p50_ms')}ms p95={level.get('p95_ms')}ms "
+                  f"p99={level.get('p99_ms')}ms throughput={level['throughput_rps']} rps")
+            levels.append(level)
+
+    config = {
+        "url": url,
+        "requests_per_level": args.requests_per_level,
+        "distinct_cases": distinct,
+        "tenant_mix": args.tenant_mix,
+    }
+    coalescing = httpx.get(f"{url}/api/v1/stats", timeout=args.timeout).json().get("coalescing")
+    if stack is not None:
+        config.update(
+            workers=args.workers,
+            corpus_size=args.corpus_size,
+            stub_first_token_latency=args.first_token_latency,
+            stub_tokens_per_second=args.tokens_per_second,
+            stub_requests=stack["stub"].request_count,
+            reuse=args.reuse,
+            coalesce=not args.no_coalesce,
+        )
+        for worker in stack["workers"]:
+            worker.stop()
+        stack["server"].should_exit = True
+        stack["stub"].stop()
+
+    results = {"config": config, "levels": levels, "coalescing": coalescing}
+    if tenant_mix is not None:
+        results["tenant_mix"] = tenant_mix
+    write_results("load_test", results, args.output)
+
+
+if __name__ == "__main__":
+    main()
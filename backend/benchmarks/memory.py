@@ -0,0 +1,157 @@
+import argparse
+import gc
+import os
+import time
+import tracemalloc
+from typing import Any, Callable, Dict, List
+
+import pandas as pd
+
+from benchmarks.common import configure_environment, write_results
+from benchmarks.corpus import generate_cases, write_corpus
+
+WORKDIR = configure_environment()
+
+from langgraph.checkpoint.serde.jsonplus import JsonPlusSerializer  # noqa: E402
+from app.schemas import SimilarCase  # noqa: E402
+from app.services import VectorDatabase, CaseCorpus, convert_csv  # noqa: E402
+
+
+def query_results(queries: int, n_results: int, seed: int) -> List[Dict[str, Any]]:
+    """Synthetic collection.query() results, allocated before measurement starts."""
+    rows = list(generate_cases(max(queries * n_results // 4, n_results), seed))
+    results = []
+    for q in range(queries):
+        picked = [(q * 7 + k * 13) % len(rows) for k in range(n_results)]
+        results.append({
+            "ids": [f"case_{i}" for i in picked],
+            "metadatas": [
+                {
+                    "case_name": rows[i][0],
+                    "year": int(rows[i][1]),
+                    "specialty": rows[i][2],
+                    "facts": rows[i][3],
+                    "verdict": rows[i][4],
+                    "key_error": rows[i][5],
+                    "settlement": rows[i][6],
+                }
+                for i in picked
+            ],
+            "distances": [0.1 + 0.05 * k for k in range(n_results)],
+        })
+    return results
+
+
+def to_pydantic(case_id: str, metadata: Dict[str, Any], distance: float) -> SimilarCase:
+    """The previous per-hit representation: a validated model built inside the retrieval step."""
+    return SimilarCase(
+        case_name=metadata['case_name'],
+        year=metadata['year'],
+        specialty=metadata['specialty'],
+        facts=metadata['facts'],
+        verdict=metadata['verdict'],
+        key_error=metadata['key_error'],
+        settlement=metadata.get('settlement'),
+        similarity_score=round(1 - distance, 2)
+    )
+
+
+def measure(build: Callable[[str, Dict[str, Any], float], Any], results: List[Dict[str, Any]]) -> Dict[str, Any]:
+    """Allocation (retained and peak) and time to hold every hit of every query."""
+    gc.collect()
+    tracemalloc.start()
+    started = time.perf_counter()
+
+    hits = [
+        [build(*hit) for hit in zip(result["ids"], result["metadatas"], result["distances"])]
+        for result in results
+    ]
+
+    elapsed = time.perf_counter() - started
+    retained, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    count = sum(len(h) for h in hits)
+    checkpoint_bytes = len(JsonPlusSerializer().dumps_typed({"similar_cases": hits[0]})[1])
+    return {
+        "hits": count,
+        "retained_bytes": retained,
+        "peak_bytes": peak,
+        "bytes_per_hit": round(retained / count, 1),
+        "hits_per_sec": round(count / elapsed, 1) if elapsed else None,
+        "checkpoint_bytes_per_query": checkpoint_bytes,
+    }
+
+
+def traced(fn: Callable[[], Any]) -> Dict[str, Any]:
+    """Peak traced allocation and wall time of one call."""
+    gc.collect()
+    tracemalloc.start()
+    started = time.perf_counter()
+    fn()
+    elapsed = time.perf_counter() - started
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return {"peak_bytes": peak, "seconds": round(elapsed, 4)}
+
+
+def bench_corpus(size: int, seed: int) -> Dict[str, Any]:
+    """CSV read with pandas versus the memory-mapped corpus for stats and row hydration."""
+    csv_path = write_corpus(os.path.join(WORKDIR, f"corpus_{size}.csv"), size, seed)
+    corpus_path = os.path.join(WORKDIR, f"corpus_{size}")
+    started = time.perf_counter()
+    convert_csv(csv_path, corpus_path)
+    convert_seconds = time.perf_counter() - started
+    rows = [(i * 7919) % size for i in range(100)]
+
+    def csv_stats_and_rows():
+        df = pd.read_csv(csv_path)
+        df['Verdict'].value_counts()
+        [df.iloc[row].to_dict() for row in rows]
+
+    def corpus_stats_and_rows():
+        corpus = CaseCorpus(corpus_path)
+        corpus.stats()
+        [corpus.case(row) for row in rows]
+
+    return {
+        "cases": size,
+        "csv_bytes": os.path.getsize(csv_path),
+        "convert_seconds": round(convert_seconds, 3),
+        "pandas": traced(csv_stats_and_rows),
+        "corpus": traced(corpus_stats_and_rows),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Allocation cost of retrieval hit representations")
+    parser.add_argument("--queries", type=int, default=20000)
+    parser.add_argument("--n-results", type=int, default=5)
+    parser.add_argument("--corpus-size", type=int, default=100000, help="cases for the corpus comparison")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--output", help="JSON output path (default: benchmarks/results/)")
+    args = parser.parse_args()
+
+    results = query_results(args.queries, args.n_results, args.seed)
+    pydantic = measure(to_pydantic, results)
+    slotted = measure(VectorDatabase._to_hit, results)
+
+    print(f"✅ {pydantic['hits']} hits: SimilarCase {pydantic['bytes_per_hit']} B/hit, "
+          f"CaseHit {slotted['bytes_per_hit']} B/hit "
+          f"({pydantic['retained_bytes'] / max(slotted['retained_bytes'], 1):.1f}x less)")
+
+    corpus = bench_corpus(args.corpus_size, args.seed)
+    print(f"✅ {corpus['cases']} cases: pandas peak {corpus['pandas']['peak_bytes'] / 1e6:.1f} MB, "
+          f"mapped corpus peak {corpus['corpus']['peak_bytes'] / 1e6:.1f} MB")
+
+    write_results("memory", {
+        "queries": args.queries,
+        "n_results": args.n_results,
+        "similar_case": pydantic,
+        "case_hit": slotted,
+        "corpus": corpus,
+    }, args.output)
+
+
+if __name__ == "__main__":
+    main()
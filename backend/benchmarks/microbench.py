@@ -0,0 +1,163 @@
+import argparse
+import os
+import random
+import time
+
+from benchmarks.common import (
+    configure_environment,
+    HashEmbeddingFunction,
+    REPO_DATA_DIR,
+    time_calls,
+    write_results,
+)
+from benchmarks.corpus import write_corpus, generate_cases
+
+WORKDIR = configure_environment()
+
+from app.agents import risk_agent, response_builder, create_initial_state  # noqa: E402
+from app.schemas import IdentifiedRisk, RiskType  # noqa: E402
+from app.services import VectorDatabase, CaseHit, PromptContextCache, clinical_standards  # noqa: E402
+
+
+STANDARDS_PATH = os.path.join(REPO_DATA_DIR, "clinical_standards.json")
+
+
+def bench_vector_db(size: int, queries: int, repeat: int, embedding: str, seed: int):
+    """Ingestion throughput and search latency for a corpus of `size` cases."""
+    csv_path = write_corpus(os.path.join(WORKDIR, f"corpus_{size}.csv"), size, seed)
+
+    db = VectorDatabase(embedding_function=HashEmbeddingFunction() if embedding == "hash" else None)
+    db.collection_name = f"bench_{size}"
+    db.initialize()
+
+    started = time.perf_counter()
+    db.load_cases_from_csv(csv_path)
+    ingest_seconds = time.perf_counter() - started
+
+    query_texts = [row[3] for row in generate_cases(queries, seed + 1)]
+    rng = random.Random(seed)
+
+    single = time_calls(lambda: db.search_similar_cases(rng.choice(query_texts), n_results=5), repeat)
+    batch = time_calls(
+        lambda: db.search_similar_cases_batch(rng.sample(query_texts, 8), n_results=5),
+        max(repeat // 4, 1)
+    )
+
+    db.client.delete_collection(db.collection_name)
+
+    return {
+        "cases": size,
+        "ingest_seconds": round(ingest_seconds, 3),
+        "ingest_cases_per_sec": round(size / ingest_seconds, 1),
+        "search": single,
+        "search_batch_8": batch,
+    }
+
+
+def bench_scoring(repeat: int, seed: int):
+    """Latency of Step 4 over synthetic risk lists."""
+    rng = random.Random(seed)
+    states = []
+    for _ in range(64):
+        state = create_initial_state("synthetic case")
+        state['identified_risks'] = [
+            IdentifiedRisk(
+                type=rng.choice(list(RiskType)),
+                severity=rng.randint(1, 10),
+                description="synthetic risk",
+                standard_violated="synthetic standard",
+                mitigation="synthetic mitigation"
+            )
+            for _ in range(rng.randint(1, 12))
+        ]
+        state['similar_cases'] = []
+        states.append(state)
+
+    def score():
+        risk_agent.calculate_risk_score(dict(rng.choice(states)))
+
+    return time_calls(score, repeat)
+
+
+def bench_standards(repeat: int, seed: int):
+    """Latency of clinical standard lookups by chief complaint."""
+    clinical_standards.load_standards(STANDARDS_PATH)
+    rng = random.Random(seed)
+    complaints = ["Chest Pain", "chest pain", "headache", "Abdominal Pain", "unknown complaint"]
+    return time_calls(lambda: clinical_standards.get_standard(rng.choice(complaints)), repeat)
+
+
+def bench_prompt_blocks(repeat: int, seed: int):
+    """Standards and precedent blocks of the risk prompt, rendered per call vs. cached."""
+    clinical_standards.load_standards(STANDARDS_PATH)
+    rng = random.Random(seed)
+    complaints = ["Chest Pain", "headache", "Abdominal Pain", "unknown complaint"]
+    hits = [
+        CaseHit(f"case_{i}", 0.1, row[0], int(row[1]), row[2], row[3], row[4], row[5], row[6])
+        for i, row in enumerate(generate_cases(50, seed))
+    ]
+
+    def render(cache: PromptContextCache):
+        cache.standards_block(rng.choice(complaints))
+        cache.similar_cases_block(rng.sample(hits, 3))
+
+    shared = PromptContextCache()
+    return {
+        "uncached": time_calls(lambda: render(PromptContextCache()), repeat),
+        "cached": time_calls(lambda: render(shared), repeat),
+    }
+
+
+def bench_response_builder(repeat: int, seed: int):
+    """Latency of response assembly over a long synthetic chart."""
+    rng = random.Random(seed)
+    text = " ".join(row[3] for row in generate_cases(400, seed))
+    state = create_initial_state(text)
+    state['identified_risks'] = [
+        IdentifiedRisk(
+            type=rng.choice(list(RiskType)),
+            severity=rng.randint(1, 10),
+            description=f"No {test} documented before discharge",
+            standard_violated=f"Obtain {test}",
+            mitigation=f"Order {test}"
+        )
+        for test in ("ECG", "lumbar puncture", "CT head", "D-dimer", "ultrasound")
+    ]
+    state['risk_score'] = 7.0
+    state['risk_level'] = "HIGH"
+    result = time_calls(lambda: response_builder.build(state), repeat)
+    result["text_chars"] = len(text)
+    return result
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Backend microbenchmarks")
+    parser.add_argument("--sizes", default="1000,10000", help="comma-separated corpus sizes (1k-1M)")
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--repeat", type=int, default=200)
+    parser.add_argument("--embedding", choices=["hash", "default"], default="hash",
+                        help="hash isolates index cost; default uses Chroma's embedding model")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--output", help="JSON output path (default: benchmarks/results/)")
+    args = parser.parse_args()
+
+    results = {
+        "embedding": args.embedding,
+        "vector_db": [],
+        "scoring": bench_scoring(args.repeat * 10, args.seed),
+        "standards_lookup": bench_standards(args.repeat * 10, args.seed),
+        "prompt_blocks": bench_prompt_blocks(args.repeat * 10, args.seed),
+        "response_builder": bench_response_builder(args.repeat, args.seed),
+    }
+
+    for size in (int(s) for s in args.sizes.split(",")):
+        print(f"⏱  Vector DB with {size} cases...")
+        results["vector_db"].append(
+            bench_vector_db(size, args.queries, args.repeat, args.embedding, args.seed)
+        )
+
+    write_results("microbench", results, args.output)
+
+
+if __name__ == "__main__":
+    main()
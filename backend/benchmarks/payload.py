@@ -0,0 +1,120 @@
+import argparse
+import gzip
+import random
+
+from benchmarks.common import configure_environment, time_calls, write_results
+from benchmarks.corpus import generate_cases
+
+configure_environment()
+
+from fastapi.responses import JSONResponse, ORJSONResponse  # noqa: E402
+from fastapi.utils import create_response_field  # noqa: E402
+from app.agents import response_builder, create_initial_state  # noqa: E402
+from app.api.compression import brotli  # noqa: E402
+from app.api.responses import ResponseShape, ResponseView  # noqa: E402
+from app.core.config import settings  # noqa: E402
+from app.schemas import CaseAnalysisResponse, IdentifiedRisk, RiskType  # noqa: E402
+from app.services import CaseHit  # noqa: E402
+
+
+def _text(rng: random.Random, pool, chars: int) -> str:
+    """About `chars` characters of varied sentences (synthetic facts are short)."""
+    parts, length = [], 0
+    while length < chars:
+        parts.append(rng.choice(pool))
+        length += len(parts[-1]) + 1
+    return " ".join(parts)
+
+
+def build_result(similar_cases: int, facts_chars: int, note_chars: int, seed: int):
+    """A completed analysis result as the worker stores it (model_dump(mode="json"))."""
+    rng = random.Random(seed)
+    rows = list(generate_cases(similar_cases, seed))
+    pool = [row[3] for row in generate_cases(500, seed + 1)]
+    state = create_initial_state(" ".join(row[3] for row in rows))
+    state['similar_cases'] = [
+        CaseHit(f"case_{i}", rng.uniform(0.1, 0.5), row[0], int(row[1]), row[2],
+                _text(rng, pool, facts_chars), row[4], row[5], row[6])
+        for i, row in enumerate(rows)
+    ]
+    state['identified_risks'] = [
+        IdentifiedRisk(
+            type=rng.choice(list(RiskType)),
+            severity=rng.randint(1, 10),
+            description=f"No {test} documented before discharge",
+            standard_violated=f"Obtain {test}",
+            legal_precedent=rows[0][0],
+            mitigation=f"Order {test} and document the result"
+        )
+        for test in ("ECG", "lumbar puncture", "CT head", "D-dimer", "ultrasound")
+    ]
+    state['action_items'] = [f"Document the reasoning for step {i}" for i in range(8)]
+    state['protective_documentation'] = _text(rng, pool, note_chars)
+    state['risk_score'] = 7.0
+    state['risk_level'] = "HIGH"
+    return response_builder.build(state).model_dump(mode="json")
+
+
+def sizes(body: bytes):
+    """Body bytes uncompressed, gzip and brotli (None without the brotli package)."""
+    return {
+        "raw": len(body),
+        "gzip": len(gzip.compress(body, settings.RESPONSE_GZIP_LEVEL)),
+        "br": len(brotli.compress(body, quality=settings.RESPONSE_BROTLI_QUALITY)) if brotli else None,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Analysis response size and serialization time")
+    parser.add_argument("--similar-cases", type=int, default=5)
+    parser.add_argument("--facts-chars", type=int, default=2000, help="length of each case's facts")
+    parser.add_argument("--note-chars", type=int, default=4000, help="length of the protective documentation")
+    parser.add_argument("--repeat", type=int, default=2000)
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--output", help="JSON output path (default: benchmarks/results/)")
+    args = parser.parse_args()
+
+    result = build_result(args.similar_cases, args.facts_chars, args.note_chars, args.seed)
+    field = create_response_field("Response_analyze_case", CaseAnalysisResponse)
+
+    def before() -> bytes:
+        # Previous path: rebuild the model, then response_model validation and JSONResponse
+        value, _ = field.validate(CaseAnalysisResponse(**result), {}, loc=("response",))
+        return JSONResponse(field.serialize(value)).body
+
+    shapes = {
+        "full": ResponseShape(),
+        "lean": ResponseShape(ResponseView.LEAN),
+        "lean_scores_only": ResponseShape(
+            ResponseView.LEAN, include=frozenset({"riskScore", "riskLevel", "keyFindings", "similar_cases"})
+        ),
+    }
+
+    assert before() == ORJSONResponse(result).body, "full view must serialize to the same bytes"
+
+    results = {
+        "similar_cases": args.similar_cases,
+        "facts_chars": args.facts_chars,
+        "note_chars": args.note_chars,
+        "brotli_installed": brotli is not None,
+        "before": {"bytes": sizes(before()), "serialize": time_calls(before, args.repeat)},
+    }
+    for name, shape in shapes.items():
+        def after(shape=shape) -> bytes:
+            return ORJSONResponse(shape.apply(result)).body
+        results[name] = {"bytes": sizes(after()), "serialize": time_calls(after, args.repeat)}
+
+    case = result["similar_cases"][0]
+    results["case_detail_bytes"] = sizes(ORJSONResponse(
+        {key: value for key, value in case.items() if key != "similarity_score"}
+    ).body)
+
+    for name in ("before", *shapes):
+        entry = results[name]
+        print(f"   {name:18s} {entry['bytes']['raw']:>8d} B  gzip {entry['bytes']['gzip']:>7d} B  "
+              f"{entry['serialize']['p50_ms']:.3f} ms")
+    write_results("payload", results, args.output)
+
+
+if __name__ == "__main__":
+    main()
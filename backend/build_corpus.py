@@ -0,0 +1,29 @@
+import argparse
+
+from app.core.config import settings
+from app.services import convert_csv, vector_db
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Convert a malpractice_cases.csv file into a memory-mapped case corpus"
+    )
+    parser.add_argument("csv", nargs="?", default=settings.CASES_DATA_PATH, help="source CSV")
+    parser.add_argument(
+        "--output",
+        default=settings.CASES_CORPUS_PATH or "./data/cases_corpus",
+        help="corpus directory to write"
+    )
+    parser.add_argument("--index", action="store_true", help="also load the corpus into the vector database")
+    args = parser.parse_args()
+
+    count = convert_csv(args.csv, args.output)
+    print(f"✅ Converted {count} cases to {args.output}")
+
+    if args.index:
+        vector_db.initialize()
+        vector_db.load_cases_from_corpus(args.output)
+
+
+if __name__ == "__main__":
+    main()
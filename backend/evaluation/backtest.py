@@ -0,0 +1,312 @@
+import argparse
+import multiprocessing
+import os
+import re
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from typing import Any, Dict, List, Optional
+
+import numpy as np
+
+from benchmarks.common import write_results
+from app.agents import risk_agent, create_initial_state
+from app.core.config import settings
+from app.schemas import IdentifiedRisk, RiskType, RiskLevel
+from app.services import CaseCorpus, CaseHit, convert_csv, vector_db, clinical_standards, llm_client
+
+
+# --llm stub: one risk per care-gap phrase in the facts instead of Steps 1 and 3
+STUB_RISKS = (
+    (re.compile(r"\b(?:misread|misdiagnos\w*|missed|overlooked)\b", re.I), RiskType.MISSED_DIAGNOSIS, 8),
+    (re.compile(r"\b(?:no|without|never)\s+\w+|\bnot\s+(?:ordered|performed|obtained|done)\b", re.I),
+     RiskType.INADEQUATE_WORKUP, 7),
+    (re.compile(r"\b(?:delayed|late|waited)\b", re.I), RiskType.TREATMENT_ERROR, 6),
+    (re.compile(r"\b(?:sent home|discharged)\b", re.I), RiskType.DOCUMENTATION_DEFICIENCY, 4),
+)
+
+RISK_LEVELS = [RiskLevel.LOW.value, RiskLevel.MODERATE.value, RiskLevel.HIGH.value]
+
+# Set in each pool process by _init_worker
+_corpus: Optional[CaseCorpus] = None
+_llm: str = "stub"
+
+
+def stub_risks(facts: str) -> List[IdentifiedRisk]:
+    """Deterministic stand-in for the LLM steps, so scoring runs without API calls or fixtures."""
+    risks = []
+    for pattern, risk_type, severity in STUB_RISKS:
+        match = pattern.search(facts)
+        if match:
+            risks.append(IdentifiedRisk(
+                type=risk_type,
+                severity=severity,
+                description=match.group(0),
+                standard_violated="stub",
+                mitigation="stub"
+            ))
+    return risks
+
+
+def case_labels(corpus: CaseCorpus, count: int, settlements: str) -> np.ndarray:
+    """1 for plaintiff verdicts, 0 for defense, NaN for cases left out.
+
+    A verdict counts as a plaintiff win by the rule calculate_risk_score uses
+    ('plaintiff' in the verdict); settlements follow --settlements.
+    """
+    values = []
+    for verdict in corpus.dictionaries["verdict"]:
+        verdict = verdict.lower()
+        if "plaintiff" in verdict:
+            values.append(1.0)
+        elif "settle" in verdict:
+            values.append({"plaintiff": 1.0, "defense": 0.0}.get(settlements, np.nan))
+        else:
+            values.append(0.0)
+    return np.asarray(values)[np.asarray(corpus.codes["verdict"][:count])]
+
+
+def _init_worker(corpus_path: str, llm: str, fixtures: Optional[str], standards: Optional[str]):
+    """Open the corpus and the case index once per pool process."""
+    global _corpus, _llm
+    _corpus = CaseCorpus(corpus_path)
+    _llm = llm
+    vector_db.initialize()
+    vector_db.attach_corpus(corpus_path)
+    if llm != "stub":
+        # record replays what exists and calls the API for the rest
+        llm_client.mode = "replay" if llm == "replay" else "auto"
+        if fixtures:
+            llm_client.fixtures_path = fixtures
+        clinical_standards.load_standards(standards)
+
+
+def score_rows(start: int, stop: int, n_results: int) -> Dict[str, Any]:
+    """Leave-one-out retrieval and scoring of corpus rows [start, stop)."""
+    t0 = time.perf_counter()
+    hits = vector_db.search_similar_to_indexed([f"case_{row}" for row in range(start, stop)], n_results)
+    retrieval_seconds = time.perf_counter() - t0
+
+    scores = np.full(stop - start, np.nan)
+    probabilities = np.full(stop - start, np.nan)
+    levels = np.full(stop - start, -1, dtype=np.int8)
+    errors = 0
+    for i, similar in enumerate(hits):
+        # From the hits alone, so the sample does not depend on the case having risks or scoring at all
+        probability = risk_agent.plaintiff_win_probability(similar)
+        if probability is not None:
+            probabilities[i] = probability
+
+        state = _score_case(_corpus.text("facts", start + i), similar)
+        if state.get('error'):
+            errors += 1
+            continue
+        scores[i] = state['risk_score']
+        levels[i] = RISK_LEVELS.index(state['risk_level'])
+
+    return {
+        "start": start,
+        "scores": scores,
+        "probabilities": probabilities,
+        "levels": levels,
+        "errors": errors,
+        "without_hits": sum(1 for similar in hits if not similar),
+        "retrieval_seconds": retrieval_seconds,
+        "scoring_seconds": time.perf_counter() - t0 - retrieval_seconds,
+    }
+
+
+def _score_case(facts: str, similar: List[CaseHit]) -> Dict[str, Any]:
+    """Run a case's facts through Steps 1, 3 (stubbed or replayed) and 4 with the given hits."""
+    state = create_initial_state(facts)
+    state['similar_cases'] = similar
+    if _llm == "stub":
+        state['identified_risks'] = stub_risks(facts)
+    else:
+        # Nodes return only the keys they set
+        for step in (risk_agent.chunk_case, risk_agent.extract_patient_info, risk_agent.identify_risks):
+            state.update(step(state))
+        if state.get('error'):
+            return state
+    state.update(risk_agent.calculate_risk_score(state))
+    return state
+
+
+def auc(labels: np.ndarray, scores: np.ndarray) -> Optional[float]:
+    """Area under the ROC curve (Mann-Whitney U; tied scores count half)."""
+    positives = int(labels.sum())
+    negatives = labels.size - positives
+    if not positives or not negatives:
+        return None
+    ranks = _average_ranks(scores)
+    u = ranks[labels == 1].sum() - positives * (positives + 1) / 2
+    return round(float(u / (positives * negatives)), 4)
+
+
+def _average_ranks(values: np.ndarray) -> np.ndarray:
+    """1-based ranks, ties sharing the average of their positions."""
+    order = np.argsort(values, kind="mergesort")
+    ordered = values[order]
+    starts = np.r_[0, np.flatnonzero(np.diff(ordered)) + 1]
+    ends = np.r_[starts[1:], values.size]
+    ranks = np.empty(values.size)
+    ranks[order] = np.repeat((starts + ends + 1) / 2.0, ends - starts)
+    return ranks
+
+
+def calibration(labels: np.ndarray, probabilities: np.ndarray, bins: int = 10) -> Dict[str, Any]:
+    """Reliability table, Brier score and expected calibration error of probabilities."""
+    # Bin b holds [b/bins, (b+1)/bins); the epsilon keeps exact edges such as 0.3 out of the bin below
+    index = np.minimum((probabilities * bins + 1e-9).astype(int), bins - 1)
+    table = []
+    ece = 0.0
+    for b in range(bins):
+        mask = index == b
+        count = int(mask.sum())
+        if not count:
+            continue
+        predicted = float(probabilities[mask].mean())
+        observed = float(labels[mask].mean())
+        ece += count / probabilities.size * abs(predicted - observed)
+        table.append({
+            "bin": f"{b / bins:.1f}-{(b + 1) / bins:.1f}",
+            "count": count,
+            "mean_predicted": round(predicted, 4),
+            "observed_rate": round(observed, 4),
+        })
+    return {
+        "brier": round(float(np.mean((probabilities - labels) ** 2)), 4),
+        "ece": round(ece, 4),
+        "bins": table,
+    }
+
+
+def _rates(labels: np.ndarray, groups: np.ndarray, names: Dict[int, str]) -> Dict[str, Any]:
+    """Case count and observed plaintiff rate per group."""
+    return {
+        name: {"count": int((groups == value).sum()), "plaintiff_rate": round(float(labels[groups == value].mean()), 4)}
+        for value, name in names.items()
+        if (groups == value).any()
+    }
+
+
+def evaluate(labels: np.ndarray, scores: np.ndarray, probabilities: np.ndarray, levels: np.ndarray) -> Dict[str, Any]:
+    """Separation and calibration of the risk score and the retrieval-based win probability."""
+    labeled = ~np.isnan(labels)
+    scored = labeled & ~np.isnan(scores)
+    with_probability = labeled & ~np.isnan(probabilities)
+    y = labels[scored]
+
+    report: Dict[str, Any] = {
+        "labeled_cases": int(labeled.sum()),
+        "plaintiff_rate": round(float(labels[labeled].mean()), 4) if labeled.any() else None,
+        "risk_score": {
+            "coverage": round(float(scored.sum() / labeled.sum()), 4) if labeled.any() else None,
+            "auc": auc(y, scores[scored]),
+            "by_risk_level": _rates(y, levels[scored], dict(enumerate(RISK_LEVELS))),
+            "by_score": _rates(y, np.floor(scores[scored]).astype(int), {s: str(s) for s in range(11)}),
+        },
+        # plaintiff_win_probability: share of plaintiff verdicts among the retrieved cases
+        "retrieval": {
+            "coverage": round(float(with_probability.sum() / labeled.sum()), 4) if labeled.any() else None,
+            "auc": auc(labels[with_probability], probabilities[with_probability]),
+            "calibration": calibration(labels[with_probability], probabilities[with_probability])
+            if with_probability.any() else None,
+        },
+    }
+    return report
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Backtest retrieval and risk scoring on the historical case corpus (leave-one-out)"
+    )
+    parser.add_argument("--csv", default=settings.CASES_DATA_PATH,
+                        help="cases CSV, converted to a scratch corpus when --corpus is not given")
+    parser.add_argument("--corpus", default=settings.CASES_CORPUS_PATH, help="case corpus from build_corpus.py")
+    parser.add_argument("--llm", choices=["stub", "replay", "record"], default="stub",
+                        help="stub: no LLM; replay: recorded fixtures only; record: replay, else call the API")
+    parser.add_argument("--fixtures", help="fixture directory (default: LLM_FIXTURES_PATH)")
+    parser.add_argument("--standards", help="clinical standards JSON (default: STANDARDS_DATA_PATH)")
+    parser.add_argument("--settlements", choices=["exclude", "plaintiff", "defense"], default="exclude",
+                        help="how settled cases are labeled")
+    parser.add_argument("--n-results", type=int, default=5, help="similar cases retrieved per case")
+    parser.add_argument("--workers", type=int, default=os.cpu_count())
+    parser.add_argument("--chunk-size", type=int, default=512, help="cases per pool task")
+    parser.add_argument("--limit", type=int, help="only the first N cases")
+    parser.add_argument("--output", help="JSON output path (default: benchmarks/results/)")
+    args = parser.parse_args()
+
+    corpus_path = args.corpus
+    if not (corpus_path and os.path.isdir(corpus_path)):
+        corpus_path = tempfile.mkdtemp(prefix="mrs-backtest-")
+        convert_csv(args.csv, corpus_path)
+    corpus = CaseCorpus(corpus_path)
+    count = min(len(corpus), args.limit or len(corpus))
+
+    # Case ids are case_<row>, so the index must hold exactly this corpus
+    vector_db.initialize()
+    indexed = vector_db.collection.count()
+    if indexed != len(corpus):
+        parser.error(
+            f"The case index holds {indexed} cases and the corpus {len(corpus)}; "
+            f"index the corpus first with build_corpus.py --index"
+        )
+
+    scores = np.full(count, np.nan)
+    probabilities = np.full(count, np.nan)
+    levels = np.full(count, -1, dtype=np.int8)
+    totals = {"errors": 0, "without_hits": 0, "retrieval_seconds": 0.0, "scoring_seconds": 0.0}
+
+    started = time.perf_counter()
+    # spawn: Chroma clients must not cross a fork
+    with ProcessPoolExecutor(
+        max_workers=args.workers,
+        mp_context=multiprocessing.get_context("spawn"),
+        initializer=_init_worker,
+        initargs=(corpus_path, args.llm, args.fixtures, args.standards)
+    ) as executor:
+        futures = [
+            executor.submit(score_rows, start, min(start + args.chunk_size, count), args.n_results)
+            for start in range(0, count, args.chunk_size)
+        ]
+        for future in as_completed(futures):
+            chunk = future.result()
+            rows = slice(chunk["start"], chunk["start"] + chunk["scores"].size)
+            scores[rows] = chunk["scores"]
+            probabilities[rows] = chunk["probabilities"]
+            levels[rows] = chunk["levels"]
+            for key in totals:
+                totals[key] += chunk[key]
+    elapsed = time.perf_counter() - started
+
+    report = evaluate(case_labels(corpus, count, args.settlements), scores, probabilities, levels)
+    report.update(
+        cases=count,
+        llm=args.llm,
+        settlements=args.settlements,
+        n_results=args.n_results,
+        errors=totals["errors"],
+        cases_without_hits=totals["without_hits"],
+        throughput={
+            "workers": args.workers,
+            "chunk_size": args.chunk_size,
+            "wall_seconds": round(elapsed, 3),
+            "cases_per_sec": round(count / elapsed, 1) if elapsed else None,
+            "retrieval_seconds": round(totals["retrieval_seconds"], 3),
+            "scoring_seconds": round(totals["scoring_seconds"], 3),
+        },
+    )
+
+    print(f"✅ Backtested {count} cases in {elapsed:.1f}s ({report['throughput']['cases_per_sec']} cases/s)")
+    print(f"   Risk score AUC: {report['risk_score']['auc']}  "
+          f"Retrieval AUC: {report['retrieval']['auc']}  "
+          f"Brier: {(report['retrieval']['calibration'] or {}).get('brier')}")
+    if totals["errors"]:
+        print(f"⚠️  {totals['errors']} cases failed (missing fixtures in replay mode?)")
+
+    write_results("backtest", report, args.output)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,184 @@
+import argparse
+import json
+import time
+from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Dict, List, Optional
+
+from benchmarks.common import summarize, write_results
+from app.agents import risk_assessment_app, create_initial_state
+from app.schemas import RiskType
+from app.services import llm_client, vector_db, clinical_standards, prompt_cache
+
+
+def load_gold_set(path: str) -> List[Dict[str, Any]]:
+    """Load gold cases from JSONL: id, case_description and expected_* fields."""
+    with open(path, "r", encoding="utf-8") as f:
+        return [json.loads(line) for line in f if line.strip()]
+
+
+def run_case(case: Dict[str, Any]) -> Dict[str, Any]:
+    """Run one gold case through the workflow, timing every node."""
+    node_seconds: Dict[str, float] = {}
+    final_state: Dict[str, Any] = {}
+    started = last = time.perf_counter()
+
+    for update in risk_assessment_app.stream(
+        create_initial_state(case["case_description"]), stream_mode="updates"
+    ):
+        now = time.perf_counter()
+        for node, state in update.items():
+            node_seconds[node] = now - last
+            final_state = state
+        last = now
+
+    risks = final_state.get('identified_risks') or []
+    return {
+        "id": case["id"],
+        "risk_score": final_state.get('risk_score'),
+        "risk_level": final_state.get('risk_level'),
+        "risk_types": sorted({risk.type.value for risk in risks}),
+        "error": final_state.get('error'),
+        "degraded": [part["part"] for part in final_state.get('degraded') or []],
+        "total_seconds": time.perf_counter() - started,
+        "node_seconds": node_seconds,
+    }
+
+
+def precision_recall(predicted: List[set], expected: List[set]) -> Dict[str, Any]:
+    """Micro-averaged and per-type precision/recall of risk types."""
+    counts = defaultdict(lambda: {"tp": 0, "fp": 0, "fn": 0})
+    for pred, gold in zip(predicted, expected):
+        for risk_type in pred | gold:
+            if risk_type in pred and risk_type in gold:
+                counts[risk_type]["tp"] += 1
+            elif risk_type in pred:
+                counts[risk_type]["fp"] += 1
+            else:
+                counts[risk_type]["fn"] += 1
+
+    def scores(c):
+        precision = c["tp"] / (c["tp"] + c["fp"]) if c["tp"] + c["fp"] else None
+        recall = c["tp"] / (c["tp"] + c["fn"]) if c["tp"] + c["fn"] else None
+        return {"precision": precision, "recall": recall, **c}
+
+    total = {k: sum(c[k] for c in counts.values()) for k in ("tp", "fp", "fn")}
+    return {
+        "micro": scores(total),
+        "per_type": {t.value: scores(counts[t.value]) for t in RiskType if t.value in counts},
+    }
+
+
+def evaluate(cases: List[Dict[str, Any]], runs: List[Dict[str, Any]], baseline: Optional[Dict[str, Any]]):
+    """Aggregate score drift, risk-type precision/recall and per-step latency."""
+    by_id = {run["id"]: run for run in runs}
+    report: Dict[str, Any] = {}
+
+    drifts = [
+        by_id[c["id"]]["risk_score"] - c["expected_risk_score"]
+        for c in cases
+        if "expected_risk_score" in c and by_id[c["id"]]["risk_score"] is not None
+    ]
+    report["score_drift_vs_expected"] = {
+        "cases": len(drifts),
+        "mean_abs": round(sum(abs(d) for d in drifts) / len(drifts), 3) if drifts else None,
+        "max_abs": round(max((abs(d) for d in drifts), default=0), 3),
+    }
+
+    leveled = [c for c in cases if "expected_risk_level" in c]
+    if leveled:
+        correct = sum(by_id[c["id"]]["risk_level"] == c["expected_risk_level"] for c in leveled)
+        report["risk_level_accuracy"] = round(correct / len(leveled), 3)
+
+    typed = [c for c in cases if "expected_risk_types" in c]
+    report["risk_types"] = precision_recall(
+        [set(by_id[c["id"]]["risk_types"]) for c in typed],
+        [set(c["expected_risk_types"]) for c in typed],
+    )
+
+    per_node = defaultdict(list)
+    for run in runs:
+        for node, seconds in run["node_seconds"].items():
+            per_node[node].append(seconds)
+    report["latency"] = {
+        "total": summarize([run["total_seconds"] for run in runs]),
+        "per_node": {node: summarize(values) for node, values in per_node.items()},
+    }
+
+    report["errors"] = {run["id"]: run["error"] for run in runs if run["error"]}
+    degraded = defaultdict(int)
+    for run in runs:
+        for part in run["degraded"]:
+            degraded[part] += 1
+    report["degraded"] = dict(degraded)
+
+    if baseline:
+        previous = {run["id"]: run for run in baseline["results"]["cases"]}
+        changes = [
+            (run["id"], run["risk_score"] - previous[run["id"]]["risk_score"])
+            for run in runs
+            if run["id"] in previous
+            and run["risk_score"] is not None
+            and previous[run["id"]]["risk_score"] is not None
+        ]
+        report["score_drift_vs_baseline"] = {
+            "baseline_commit": baseline.get("commit"),
+            "cases": len(changes),
+            "changed": sum(1 for _, d in changes if d),
+            "mean_abs": round(sum(abs(d) for _, d in changes) / len(changes), 3) if changes else None,
+            "largest": sorted(changes, key=lambda c: -abs(c[1]))[:10],
+        }
+
+    return report
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Offline gold-set evaluation of the risk workflow")
+    parser.add_argument("gold_set", help="JSONL gold set (see data/gold_set.jsonl.example)")
+    parser.add_argument("--mode", choices=["replay", "record", "auto", "off"], default="replay",
+                        help="LLM fixture mode; replay makes no API calls")
+    parser.add_argument("--fixtures", help="fixture directory (default: LLM_FIXTURES_PATH)")
+    parser.add_argument("--standards", help="clinical standards JSON (default: STANDARDS_DATA_PATH)")
+    parser.add_argument("--workers", type=int, default=8)
+    parser.add_argument("--baseline", help="previous evaluation report to measure drift against")
+    parser.add_argument("--output", help="JSON output path (default: benchmarks/results/)")
+    args = parser.parse_args()
+
+    llm_client.mode = args.mode
+    if args.fixtures:
+        llm_client.fixtures_path = args.fixtures
+
+    vector_db.initialize()
+    clinical_standards.load_standards(args.standards)
+
+    cases = load_gold_set(args.gold_set)
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=args.workers) as executor:
+        runs = list(executor.map(run_case, cases))
+    elapsed = time.perf_counter() - started
+
+    baseline = None
+    if args.baseline:
+        with open(args.baseline, "r", encoding="utf-8") as f:
+            baseline = json.load(f)
+
+    report = evaluate(cases, runs, baseline)
+    report["mode"] = args.mode
+    report["llm"] = dict(llm_client.stats)
+    report["prompts"] = prompt_cache.get_stats()
+    report["wall_seconds"] = round(elapsed, 3)
+    report["cases_per_sec"] = round(len(cases) / elapsed, 2) if elapsed else None
+
+    print(f"✅ Evaluated {len(cases)} cases in {elapsed:.2f}s")
+    print(f"   Score drift (mean abs): {report['score_drift_vs_expected']['mean_abs']}")
+    micro = report["risk_types"]["micro"]
+    print(f"   Risk types: precision={micro['precision']} recall={micro['recall']}")
+    if report["errors"] or llm_client.stats["fixture_misses"]:
+        print(f"⚠️  {len(report['errors'])} case errors, "
+              f"{llm_client.stats['fixture_misses']} missing fixtures")
+
+    write_results("evaluation", {**report, "cases": runs}, args.output)
+
+
+if __name__ == "__main__":
+    main()
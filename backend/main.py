@@ -1,34 +1,50 @@
-from fastapi import FastAPI
+from fastapi import FastAPI, Request
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import ORJSONResponse
 from contextlib import asynccontextmanager
+from opentelemetry.trace import SpanKind
+import logging
+import time
+import uuid
 import uvicorn
 
 from app.core.config import settings
+from app.core.telemetry import configure_telemetry, continue_trace, shutdown_telemetry
 from app.api import router
-from app.services import vector_db, clinical_standards
+from app.api.compression import CompressionMiddleware
+from app.services import vector_db, clinical_standards, job_store, analysis_reuse
+
+logger = logging.getLogger(__name__)
+access_logger = logging.getLogger("app.api.access")
 
 
 @asynccontextmanager
 async def lifespan(app: FastAPI):
     """Startup and shutdown events."""
     # Startup
-    print("🚀 Starting AI Malpractice Risk Scanner API...")
+    configure_telemetry("api")
+    logger.info("Starting AI Malpractice Risk Scanner API")
 
     # Initialize vector database
     vector_db.initialize()
+    analysis_reuse.initialize()
+
+    # Open the job queue shared with the worker pool
+    job_store.initialize()
 
     # Load clinical standards
     try:
         clinical_standards.load_standards()
     except Exception as e:
-        print(f"⚠️  Could not load clinical standards: {e}")
+        logger.warning("Could not load clinical standards", extra={"error": str(e)})
 
-    print("✅ API Ready!")
+    logger.info("API ready")
 
     yield
 
     # Shutdown
-    print("👋 Shutting down...")
+    logger.info("Shutting down")
+    shutdown_telemetry()
 
 
 # Create FastAPI app
@@ -36,6 +52,7 @@ app = FastAPI(
     title=settings.APP_NAME,
     version=settings.APP_VERSION,
     description="AI-powered medical malpractice risk assessment system",
+    default_response_class=ORJSONResponse,
     lifespan=lifespan
 )
 
@@ -48,6 +65,44 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+# gzip, or brotli when installed, for JSON bodies over the size threshold
+app.add_middleware(
+    CompressionMiddleware,
+    minimum_size=settings.RESPONSE_COMPRESSION_MIN_BYTES,
+    gzip_level=settings.RESPONSE_GZIP_LEVEL,
+    brotli_quality=settings.RESPONSE_BROTLI_QUALITY,
+)
+
+
+@app.middleware("http")
+async def request_telemetry(request: Request, call_next):
+    """Assign a request id, open the server span and write a sampled access log."""
+    request_id = request.headers.get("x-request-id") or uuid.uuid4().hex
+    carrier = {**request.headers, "request_id": request_id}
+
+    with continue_trace(
+        carrier,
+        f"{request.method} {request.url.path}",
+        kind=SpanKind.SERVER,
+        **{"http.method": request.method, "http.target": request.url.path}
+    ) as span:
+        started = time.perf_counter()
+        response = await call_next(request)
+        span.set_attribute("http.status_code", response.status_code)
+
+        response.headers["X-Request-ID"] = request_id
+        response.headers["X-Trace-ID"] = format(span.get_span_context().trace_id, "032x")
+        access_logger.info("Request handled", extra={
+            "method": request.method,
+            "path": request.url.path,
+            "status": response.status_code,
+            "tenant": request.headers.get("x-tenant-id"),
+            "duration_ms": round((time.perf_counter() - started) * 1000, 1),
+        })
+
+    return response
+
+
 # Include API routes
 app.include_router(router, prefix="/api/v1", tags=["risk-assessment"])
 
@@ -0,0 +1,29 @@
+import argparse
+
+from app.core.config import settings
+from app.services import vector_db
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Rebuild the case index with new HNSW parameters while the API keeps serving"
+    )
+    parser.add_argument("--m", type=int, default=settings.HNSW_M, help="graph degree (hnsw:M)")
+    parser.add_argument("--ef-construction", type=int, default=settings.HNSW_CONSTRUCTION_EF)
+    parser.add_argument("--ef-search", type=int, default=settings.HNSW_SEARCH_EF)
+    parser.add_argument("--batch-size", type=int, default=settings.HNSW_BATCH_SIZE)
+    args = parser.parse_args()
+
+    vector_db.initialize()
+    result = vector_db.rebuild_index(
+        M=args.m,
+        construction_ef=args.ef_construction,
+        search_ef=args.ef_search,
+        batch_size=args.batch_size
+    )
+    print(f"✅ Rebuilt {result['cases']} cases into {result['collection']} in {result['seconds']}s "
+          f"(previous index {result['previous']} kept for rollback)")
+
+
+if __name__ == "__main__":
+    main()
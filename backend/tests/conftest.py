@@ -0,0 +1,13 @@
+import os
+import tempfile
+
+# Service singletons open their databases at import; keep them out of ./data
+_DATA_DIR = tempfile.mkdtemp(prefix="malpractice-tests-")
+for _name, _path in {
+    "CHROMA_DB_PATH": "chroma_db",
+    "JOB_DB_PATH": "jobs.sqlite3",
+    "CHECKPOINT_DB_PATH": "checkpoints.sqlite3",
+    "UPLOAD_SPOOL_DIR": "uploads",
+    "LLM_FIXTURES_PATH": "llm_fixtures",
+}.items():
+    os.environ.setdefault(_name, os.path.join(_DATA_DIR, _path))
@@ -0,0 +1,72 @@
+import chromadb
+import pytest
+from chromadb.config import Settings as ChromaSettings
+from app.schemas import IdentifiedRisk, RiskType
+from app.services.analysis_reuse import AnalysisReuseIndex
+from app.services.chunking import CaseChunk
+from benchmarks.common import HashEmbeddingFunction
+
+
+CASE = "54M chest pain radiating to left arm, ECG normal, troponin pending, discharged home."
+RISK = IdentifiedRisk(
+    type=RiskType.INADEQUATE_WORKUP,
+    severity=8,
+    description="Discharged before troponin resulted",
+    standard_violated="Serial troponin for chest pain",
+    mitigation="Recall for repeat troponin",
+)
+
+
+@pytest.fixture
+def reuse(tmp_path):
+    client = chromadb.PersistentClient(path=str(tmp_path), settings=ChromaSettings(anonymized_telemetry=False))
+    index = AnalysisReuseIndex(enabled=True, threshold=0.97, max_chars=200)
+    index.collection = client.get_or_create_collection(
+        name=index.collection_name,
+        metadata={"hnsw:space": "cosine"},
+        embedding_function=HashEmbeddingFunction(dim=256),
+    )
+    return index
+
+
+def analyzed(text, **state):
+    return {"case_description": text, "identified_risks": [RISK], **state}
+
+
+def test_near_duplicate_of_same_tenant_reuses_risks(reuse):
+    reuse.add("job-1", "acme", analyzed(CASE))
+
+    match = reuse.find(CASE, "acme")
+
+    assert match["job_id"] == "job-1"
+    assert match["similarity"] == pytest.approx(1.0)
+    assert match["outputs"]["identified_risks"] == [RISK]
+
+
+def test_other_tenants_never_match(reuse):
+    reuse.add("job-1", "acme", analyzed(CASE))
+
+    assert reuse.find(CASE, "globex") is None
+    assert reuse.find(CASE, None) is None
+
+
+def test_below_threshold_does_not_match(reuse):
+    reuse.add("job-1", "acme", analyzed(CASE))
+
+    assert reuse.find("32F ankle sprain after fall, x-ray negative, discharged.", "acme") is None
+
+
+def test_texts_beyond_the_embedding_window_are_not_indexed_or_matched(reuse):
+    long_case = CASE + " Nursing note: " + "vitals stable. " * 20
+    reuse.add("job-1", "acme", analyzed(long_case))
+
+    assert reuse.collection.count() == 0
+    reuse.add("job-2", "acme", analyzed(CASE))
+    assert reuse.find(long_case, "acme") is None
+
+
+def test_multi_chunk_cases_are_not_indexed(reuse):
+    chunks = [CaseChunk(index=0, title="HPI", start=0, end=10), CaseChunk(index=1, title="ED", start=12, end=20)]
+    reuse.add("job-1", "acme", analyzed(CASE, case_chunks=chunks))
+
+    assert reuse.collection.count() == 0
@@ -0,0 +1,53 @@
+import numpy as np
+import pytest
+from app.services import CaseHit, vector_db
+from evaluation import backtest
+
+
+def hits(*verdicts):
+    return [
+        CaseHit(f"case_{i}", 0.2, "Case", 2020, "Emergency Medicine", "facts", verdict, "error")
+        for i, verdict in enumerate(verdicts)
+    ]
+
+
+@pytest.mark.parametrize("labels, scores, expected", [
+    ([0, 0, 1, 1], [0.1, 0.2, 0.8, 0.9], 1.0),
+    ([0, 0, 1, 1], [0.9, 0.8, 0.2, 0.1], 0.0),
+    ([0, 1, 0, 1], [0.5, 0.5, 0.5, 0.5], 0.5),
+    ([0, 0, 1, 1], [0.1, 0.6, 0.6, 0.9], 0.875),
+    ([1, 1, 1], [0.1, 0.2, 0.3], None),
+])
+def test_auc(labels, scores, expected):
+    assert backtest.auc(np.asarray(labels, dtype=float), np.asarray(scores)) == expected
+
+
+def test_calibration_bins_edges_upward():
+    labels = np.asarray([0.0, 1.0, 1.0, 0.0])
+    probabilities = np.asarray([0.3, 0.3, 1.0, 0.0])
+
+    report = backtest.calibration(labels, probabilities)
+
+    assert [row["bin"] for row in report["bins"]] == ["0.0-0.1", "0.3-0.4", "0.9-1.0"]
+    assert [row["count"] for row in report["bins"]] == [1, 2, 1]
+    assert report["bins"][1]["observed_rate"] == 0.5
+    assert report["brier"] == pytest.approx((0.09 + 0.49) / 4, abs=1e-4)
+    assert report["ece"] == pytest.approx(2 / 4 * 0.2, abs=1e-4)
+
+
+def test_win_probability_is_scored_for_cases_without_risks(monkeypatch):
+    class Corpus:
+        def text(self, column, row):
+            return ["Uneventful visit.", "Missed fracture, sent home."][row]
+
+    monkeypatch.setattr(backtest, "_corpus", Corpus())
+    monkeypatch.setattr(backtest, "_llm", "stub")
+    monkeypatch.setattr(
+        vector_db, "search_similar_to_indexed",
+        lambda ids, n: [hits("Plaintiff", "Defense"), hits("Plaintiff verdict", "Plaintiff")]
+    )
+
+    result = backtest.score_rows(0, 2, 2)
+
+    assert result["scores"].tolist() == [0.0, 6.0]
+    assert result["probabilities"].tolist() == [0.5, 1.0]
@@ -0,0 +1,103 @@
+import csv
+import json
+import math
+import os
+import pytest
+from app.services.case_corpus import CaseCorpus, convert_csv, parse_settlement
+
+
+HEADER = ["Case Name", "Year", "Specialty", "Facts", "Verdict", "Key Error", "Settlement"]
+ROWS = [
+    ["Smith v. General", "2019", "Emergency Medicine", "Chest pain, discharged", "Plaintiff", "Missed MI", "$1.2M (remitted)"],
+    ["Doe v. Clinic", "n/a", "Radiology", "Missed nodule", "Defense", "Misread CT", "$300K"],
+    ["Roe v. Mercy", "2021", "Emergency Medicine", "Héadache — \"thunderclap\"", "Defense", "No CT", "Confidential"],
+    ["Poe v. St. Luke", "2015", "Obstetrics", "Shoulder dystocia", "Settlement", "Delay", "$2,500,000"],
+]
+
+
+@pytest.fixture
+def corpus(tmp_path):
+    csv_path = tmp_path / "cases.csv"
+    with open(csv_path, "w", newline="", encoding="utf-8") as f:
+        writer = csv.writer(f)
+        writer.writerow(HEADER)
+        writer.writerows(ROWS)
+
+    output_dir = str(tmp_path / "corpus")
+    assert convert_csv(str(csv_path), output_dir) == 3
+    return CaseCorpus(output_dir)
+
+
+def test_round_trip_skips_rows_without_a_year(corpus):
+    kept = [row for row in ROWS if row[1].isdigit()]
+
+    assert len(corpus) == len(kept)
+    for index, row in enumerate(kept):
+        assert corpus.case(index) == {
+            "case_name": row[0],
+            "year": int(row[1]),
+            "specialty": row[2],
+            "facts": row[3],
+            "verdict": row[4],
+            "key_error": row[5],
+            "settlement": row[6],
+        }
+
+
+def test_batches_carry_row_numbers_and_filter_fields(corpus):
+    batches = list(corpus.iter_batches(2))
+
+    assert [start for start, _, _ in batches] == [0, 2]
+    start, documents, metadatas = batches[0]
+    assert documents == ["Chest pain, discharged", "Héadache — \"thunderclap\""]
+    assert metadatas[1] == {
+        "row": 1, "corpus": corpus.build_id, "year": 2021, "specialty": "Emergency Medicine", "verdict": "Defense"
+    }
+
+
+def test_stats_use_parsed_settlements(corpus):
+    stats = corpus.stats()
+
+    assert stats["total_cases"] == 3
+    assert stats["year_range"] == [2015, 2021]
+    assert stats["settlements"] == {"count": 2, "total": 3_700_000.0, "median": 1_850_000.0}
+    assert stats["by_specialty"] == {"Emergency Medicine": 2, "Obstetrics": 1}
+
+
+def test_rebuild_changes_version_and_build_id(corpus, tmp_path):
+    version, build_id = corpus.version, corpus.build_id
+    csv_path = tmp_path / "cases.csv"
+
+    convert_csv(str(csv_path), corpus.path)
+
+    rebuilt = CaseCorpus(corpus.path)
+    assert rebuilt.version != version
+    assert rebuilt.build_id != build_id
+
+
+def test_unsupported_format_version(corpus):
+    manifest_path = os.path.join(corpus.path, "manifest.json")
+    with open(manifest_path, "r", encoding="utf-8") as f:
+        manifest = json.load(f)
+    manifest["version"] = 1
+    with open(manifest_path, "w", encoding="utf-8") as f:
+        json.dump(manifest, f)
+
+    with pytest.raises(ValueError, match="build_corpus.py"):
+        CaseCorpus(corpus.path)
+
+
+@pytest.mark.parametrize("text, amount", [
+    ("$2.3M", 2_300_000.0),
+    ("$1.2M (remitted)", 1_200_000.0),
+    ("$300K", 300_000.0),
+    ("$2,500,000", 2_500_000.0),
+    ("1.5b", 1_500_000_000.0),
+])
+def test_parse_settlement(text, amount):
+    assert parse_settlement(text) == pytest.approx(amount)
+
+
+@pytest.mark.parametrize("text", [None, "", "N/A", "Confidential", "$1.2Million"])
+def test_parse_settlement_without_amount(text):
+    assert math.isnan(parse_settlement(text))
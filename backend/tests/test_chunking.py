@@ -0,0 +1,59 @@
+from app.services.chunking import ChartChunker
+
+
+def chart(sections):
+    return "\n".join(f"{title}:\n{body}" for title, body in sections)
+
+
+def test_short_document_is_one_chunk():
+    chunker = ChartChunker(max_chars=100, threshold_chars=1000)
+
+    chunks = chunker.split("Chest pain, sent home.")
+
+    assert len(chunks) == 1
+    assert chunks[0].title == "Case"
+    assert chunks[0].text_in("Chest pain, sent home.") == "Chest pain, sent home."
+
+
+def test_sections_are_split_at_headers_and_packed_up_to_max_chars():
+    text = chart([("HPI", "a" * 60), ("EXAM", "b" * 10), ("LABS", "c" * 10), ("DISPOSITION", "d" * 60)])
+    chunker = ChartChunker(max_chars=100, threshold_chars=50)
+
+    chunks = chunker.split(text)
+
+    assert [chunk.title for chunk in chunks] == ["HPI", "DISPOSITION"]
+    texts = [chunk.text_in(text) for chunk in chunks]
+    assert texts[0].startswith("HPI:") and texts[0].endswith("LABS:\n" + "c" * 10)
+    assert texts[1] == "DISPOSITION:\n" + "d" * 60
+    assert [chunk.index for chunk in chunks] == [0, 1]
+
+
+def test_text_before_the_first_header_is_its_own_section():
+    text = "Triage note " * 5 + "\nHPI:\n" + "x" * 80
+    chunker = ChartChunker(max_chars=100, threshold_chars=50)
+
+    chunks = chunker.split(text)
+
+    assert chunks[0].title == "Case"
+    assert chunks[0].text_in(text).startswith("Triage note")
+    assert chunks[1].title == "HPI"
+
+
+def test_oversized_section_is_cut_at_whitespace():
+    words = " ".join(f"word{i}" for i in range(100))
+    chunker = ChartChunker(max_chars=100, threshold_chars=50)
+
+    chunks = chunker.split(words)
+
+    assert len(chunks) > 1
+    assert all(chunk.end - chunk.start <= 100 for chunk in chunks)
+    assert " ".join(chunk.text_in(words) for chunk in chunks).split() == words.split()
+
+
+def test_chunks_exclude_surrounding_whitespace():
+    text = "HPI:\n" + "a" * 60 + "\n\n\nDISPOSITION:\n" + "d" * 60 + "\n\n"
+    chunker = ChartChunker(max_chars=80, threshold_chars=50)
+
+    chunks = chunker.split(text)
+
+    assert [chunk.text_in(text) for chunk in chunks] == ["HPI:\n" + "a" * 60, "DISPOSITION:\n" + "d" * 60]
@@ -0,0 +1,26 @@
+import pytest
+from benchmarks.compare import direction, flatten
+
+
+@pytest.mark.parametrize("name, expected", [
+    ("retrieval.auc", 1),
+    ("risk_score.coverage", 1),
+    ("risk_types.micro.precision", 1),
+    ("risk_types.micro.recall", 1),
+    ("risk_level_accuracy", 1),
+    ("ingest.ingest_cases_per_sec", 1),
+    ("concurrency[2].throughput_rps", 1),
+    ("retrieval.calibration.brier", -1),
+    ("latency.total.p95_ms", -1),
+    ("risk_types.micro.fp", -1),
+    ("retrieval.calibration.bins[3].count", 0),
+    ("labeled_cases", 0),
+])
+def test_metric_direction(name, expected):
+    assert direction(name) == expected
+
+
+def test_flatten_keys_nested_results():
+    assert flatten({"a": {"b": 1, "c": [2, {"d": 3}]}, "skip": True}) == {
+        "a.b": 1.0, "a.c[0]": 2.0, "a.c[1].d": 3.0
+    }
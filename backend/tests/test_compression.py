@@ -0,0 +1,70 @@
+from fastapi import FastAPI, Response
+from fastapi.testclient import TestClient
+from app.api.compression import CompressionMiddleware
+
+
+BODY = b'{"facts": "' + b"chest pain " * 200 + b'"}'
+
+
+def make_client() -> TestClient:
+    app = FastAPI()
+    app.add_middleware(CompressionMiddleware, minimum_size=100)
+
+    @app.get("/large")
+    def large():
+        return Response(content=BODY, media_type="application/json", headers={"ETag": '"abc"'})
+
+    @app.get("/small")
+    def small():
+        return Response(content=b"{}", media_type="application/json")
+
+    @app.get("/binary")
+    def binary():
+        return Response(content=BODY, media_type="application/octet-stream")
+
+    @app.get("/not-modified")
+    def not_modified():
+        return Response(status_code=304, headers={"ETag": '"abc"'})
+
+    return TestClient(app)
+
+
+def test_compressed_response_gets_weak_etag_and_vary():
+    response = make_client().get("/large", headers={"Accept-Encoding": "gzip"})
+
+    assert response.headers["content-encoding"] == "gzip"
+    assert response.headers["vary"] == "Accept-Encoding"
+    assert response.headers["etag"] == 'W/"abc"'
+    assert response.content == BODY
+
+
+def test_uncompressed_responses_still_vary():
+    client = make_client()
+
+    identity = client.get("/large", headers={"Accept-Encoding": "identity"})
+    small = client.get("/small", headers={"Accept-Encoding": "gzip"})
+
+    assert "content-encoding" not in identity.headers
+    assert identity.headers["etag"] == '"abc"'
+    assert identity.headers["vary"] == "Accept-Encoding"
+    assert small.headers["vary"] == "Accept-Encoding"
+
+
+def test_not_modified_matches_the_compressed_validator():
+    response = make_client().get("/not-modified", headers={"Accept-Encoding": "gzip"})
+
+    assert response.status_code == 304
+    assert response.headers["etag"] == 'W/"abc"'
+    assert response.headers["vary"] == "Accept-Encoding"
+
+
+def test_other_content_types_pass_through():
+    response = make_client().get("/binary", headers={"Accept-Encoding": "gzip"})
+
+    assert "content-encoding" not in response.headers
+    assert "vary" not in response.headers
+
+
+def test_choose_encoding():
+    assert CompressionMiddleware.choose_encoding("gzip;q=0, identity") is None
+    assert CompressionMiddleware.choose_encoding("deflate, gzip;q=0.5") == "gzip"
@@ -0,0 +1,104 @@
+import io
+import pytest
+from app.core.config import settings
+from app.services.ingestion import DocumentIngestionService, UnsupportedDocumentError, UploadTooLargeError
+
+
+HL7_MESSAGE = (
+    b"MSH|^~\\&|EPIC|ED|||202401010830||ORU^R01|1|P|2.5\r"
+    b"PID|1||123||Doe^John||19700101|M\r"
+    b"OBX|1|NM|2160-0^Creatinine||1.8|mg/dL||H\r"
+    b"NTE|1||Patient reports chest pain\r"
+)
+
+CCD_DOCUMENT = b"""<?xml version="1.0"?>
+<ClinicalDocument xmlns="urn:hl7-org:v3">
+  <component><structuredBody><component><section>
+    <title>Results</title>
+    <text>
+      <paragraph>Troponin  normal</paragraph>
+      <list><item>ECG: sinus</item><item>CXR clear</item></list>
+    </text>
+  </section></component></structuredBody></component>
+</ClinicalDocument>"""
+
+
+@pytest.fixture
+def ingestion():
+    return DocumentIngestionService()
+
+
+def normalize(ingestion, data: bytes, fmt: str) -> str:
+    return ingestion.normalize(io.BytesIO(data), fmt)
+
+
+def test_hl7_segments_become_labelled_lines(ingestion):
+    assert normalize(ingestion, HL7_MESSAGE, "hl7") == (
+        "Patient: DOB 19700101 Sex M\n"
+        "Result: Creatinine: 1.8 mg/dL (H)\n"
+        "Note: Patient reports chest pain"
+    )
+
+
+def test_ccd_sections_and_narrative(ingestion):
+    assert normalize(ingestion, CCD_DOCUMENT, "ccd") == "RESULTS:\nTroponin normal\nECG: sinus\nCXR clear"
+
+
+def test_invalid_ccd_is_unsupported(ingestion):
+    with pytest.raises(UnsupportedDocumentError):
+        normalize(ingestion, b"<ClinicalDocument><section>", "ccd")
+
+
+def test_pdf_text_drops_page_numbers_and_rejoins_hyphenation(ingestion):
+    text = b"Page 1\nThe patient had hemo-\nrrhage on arrival\fPage 2 of 3\nDischarged\n"
+
+    assert normalize(ingestion, text, "pdf_text") == "The patient had hemorrhage on arrival\nDischarged"
+
+
+@pytest.mark.parametrize("chunk_bytes", [1, 2, 64 * 1024])
+def test_line_endings_split_across_chunks(ingestion, monkeypatch, chunk_bytes):
+    monkeypatch.setattr(settings, "UPLOAD_READ_CHUNK_BYTES", chunk_bytes)
+    # \r\n straddles the 8 KiB text decoder chunk as well
+    data = b"a" * 8191 + b"\r\nsecond\rthird\nfourth"
+
+    lines = normalize(ingestion, data, "text").split("\n")
+
+    assert lines == ["a" * 8191, "second", "third", "fourth"]
+
+
+def test_utf8_bom_and_split_multibyte_characters(ingestion, monkeypatch):
+    monkeypatch.setattr(settings, "UPLOAD_READ_CHUNK_BYTES", 1)
+
+    assert normalize(ingestion, "\ufeffCafé — naïve".encode("utf-8"), "text") == "Café — naïve"
+
+
+@pytest.mark.parametrize("fmt, data", [("text", b"x" * 200), ("hl7", HL7_MESSAGE * 4), ("ccd", CCD_DOCUMENT)])
+def test_size_limit_is_enforced_while_streaming(ingestion, monkeypatch, fmt, data):
+    monkeypatch.setattr(settings, "UPLOAD_MAX_BYTES", 100)
+
+    with pytest.raises(UploadTooLargeError):
+        normalize(ingestion, data, fmt)
+
+
+def test_document_at_size_limit_is_accepted(ingestion, monkeypatch):
+    monkeypatch.setattr(settings, "UPLOAD_MAX_BYTES", 100)
+
+    assert normalize(ingestion, b"x" * 100, "text") == "x" * 100
+
+
+@pytest.mark.parametrize("filename, content_type, head, expected", [
+    (None, None, HL7_MESSAGE[:64], "hl7"),
+    ("chart.xml", None, b"", "ccd"),
+    (None, "text/plain", b"\xef\xbb\xbf <?xml", "ccd"),
+    ("notes.pdf.txt", None, b"", "pdf_text"),
+    (None, None, b"page one\fpage two", "pdf_text"),
+    ("notes.txt", "text/plain", b"Patient", "text"),
+])
+def test_detect_format(ingestion, filename, content_type, head, expected):
+    assert ingestion.detect_format(filename, content_type, head) == expected
+
+
+@pytest.mark.parametrize("content_type, head", [(None, b"%PDF-1.7"), ("image/png", b"\x89PNG")])
+def test_detect_format_rejects_binary_documents(ingestion, content_type, head):
+    with pytest.raises(UnsupportedDocumentError):
+        ingestion.detect_format("upload", content_type, head)
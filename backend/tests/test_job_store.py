@@ -0,0 +1,178 @@
+import pytest
+from app.core.config import settings
+from app.services.job_store import JobStore, QueueFullError, TenantQuotaError, analysis_input_key
+
+
+@pytest.fixture
+def store(tmp_path):
+    return JobStore(str(tmp_path / "jobs.sqlite3"))
+
+
+@pytest.fixture
+def quotas(monkeypatch):
+    """Set TENANT_QUOTAS for one test."""
+    def set_quotas(value):
+        monkeypatch.setattr(settings, "TENANT_QUOTAS", value)
+    return set_quotas
+
+
+def expire_lease(store, job_id):
+    with store._connect() as conn:
+        conn.execute("UPDATE jobs SET lease_expires = 0 WHERE id = ?", (job_id,))
+
+
+def claim_all(store, worker_id="w1"):
+    jobs = []
+    while (job := store.claim(worker_id)) is not None:
+        jobs.append(job)
+    return jobs
+
+
+def test_claim_takes_oldest_queued_job(store):
+    first = store.enqueue("analyze", {"case_description": "a"})
+    store.enqueue("analyze", {"case_description": "b"})
+
+    job = store.claim("w1")
+
+    assert job["id"] == first
+    assert job["status"] == "running"
+    assert job["attempts"] == 1
+    assert job["payload"] == {"case_description": "a"}
+    assert store.get(first)["worker_id"] == "w1"
+
+
+def test_claim_on_empty_queue_returns_none(store):
+    assert store.claim("w1") is None
+
+
+def test_complete_stores_result_and_tokens(store):
+    job_id = store.enqueue("analyze", {})
+    store.claim("w1")
+
+    assert store.complete(job_id, "w1", {"riskScore": 42}, tokens=10)
+
+    job = store.get(job_id)
+    assert job["status"] == "completed"
+    assert job["result"] == {"riskScore": 42}
+    assert job["tokens"] == 10
+
+
+def test_expired_lease_is_reclaimed_and_old_worker_cannot_finish(store):
+    job_id = store.enqueue("analyze", {})
+    store.claim("w1")
+    expire_lease(store, job_id)
+
+    job = store.claim("w2")
+
+    assert job["id"] == job_id
+    assert job["attempts"] == 2
+    assert not store.complete(job_id, "w1", {"stale": True})
+    assert not store.fail(job_id, "w1", "stale")
+    assert store.complete(job_id, "w2", {"fresh": True})
+    assert store.get(job_id)["result"] == {"fresh": True}
+
+
+def test_finish_after_lease_expired_is_rejected(store):
+    job_id = store.enqueue("analyze", {})
+    store.claim("w1")
+    expire_lease(store, job_id)
+
+    assert not store.complete(job_id, "w1", {})
+    assert store.get(job_id)["status"] == "running"
+
+
+def test_gives_up_after_max_attempts(store, monkeypatch):
+    monkeypatch.setattr(settings, "JOB_MAX_ATTEMPTS", 1)
+    job_id = store.enqueue("analyze", {})
+    store.claim("w1")
+    expire_lease(store, job_id)
+
+    assert store.claim("w2") is None
+    job = store.get(job_id)
+    assert job["status"] == "failed"
+    assert "Gave up" in job["error"]
+
+
+def test_claims_are_weighted_fair_across_tenants(store, quotas):
+    quotas({"ed": {"weight": 3}})
+    for _ in range(8):
+        store.enqueue("analyze", {}, tenant="bulk")
+    for _ in range(8):
+        store.enqueue("analyze", {}, tenant="ed")
+
+    tenants = [job["tenant"] for job in claim_all(store)[:8]]
+
+    assert tenants == ["bulk", "ed", "ed", "ed", "bulk", "ed", "ed", "ed"]
+
+
+def test_idle_tenant_does_not_bank_credit(store):
+    for _ in range(4):
+        store.enqueue("analyze", {}, tenant="bulk")
+    claim_all(store)
+
+    for _ in range(3):
+        store.enqueue("analyze", {}, tenant="bulk")
+    for _ in range(3):
+        store.enqueue("analyze", {}, tenant="ed")
+
+    tenants = [job["tenant"] for job in claim_all(store)]
+
+    # ed starts at the current virtual time rather than catching up on the jobs bulk ran alone
+    assert tenants == ["ed", "bulk", "ed", "bulk", "ed", "bulk"]
+
+
+def test_tenant_at_max_concurrent_is_skipped(store, quotas):
+    quotas({"bulk": {"max_concurrent": 1}})
+    store.enqueue("analyze", {}, tenant="bulk")
+    store.enqueue("analyze", {}, tenant="bulk")
+    store.enqueue("analyze", {}, tenant="ed")
+
+    assert store.claim("w1")["tenant"] == "bulk"
+    assert store.claim("w2")["tenant"] == "ed"
+    assert store.claim("w3") is None
+
+
+def test_max_pending_quota_rejects_only_that_tenant(store, quotas):
+    quotas({"bulk": {"max_pending": 2}})
+    store.enqueue("analyze", {}, tenant="bulk")
+    store.enqueue("analyze", {}, tenant="bulk")
+
+    with pytest.raises(TenantQuotaError) as error:
+        store.enqueue("analyze", {}, tenant="bulk")
+
+    assert error.value.quota == "max_pending"
+    assert error.value.retry_after >= 1
+    store.enqueue("analyze", {}, tenant="ed")
+    assert store.get_tenant_stats()["bulk"]["rejected"] == 1
+
+
+def test_tokens_per_hour_quota(store, quotas):
+    quotas({"ed": {"tokens_per_hour": 100}})
+    job_id = store.enqueue("analyze", {}, tenant="ed")
+    store.claim("w1")
+    store.complete(job_id, "w1", {}, tokens=150)
+
+    with pytest.raises(TenantQuotaError) as error:
+        store.enqueue("analyze", {}, tenant="ed")
+
+    assert error.value.quota == "tokens_per_hour"
+    assert 1 <= error.value.retry_after <= 3600
+
+
+def test_full_queue_rejects_every_tenant(store, monkeypatch):
+    monkeypatch.setattr(settings, "JOB_QUEUE_MAX_PENDING", 1)
+    store.enqueue("analyze", {}, tenant="ed")
+
+    with pytest.raises(QueueFullError) as error:
+        store.enqueue("analyze", {}, tenant="bulk")
+
+    assert not isinstance(error.value, TenantQuotaError)
+
+
+def test_identical_input_coalesces_within_tenant_only(store):
+    key = analysis_input_key("chest  pain\nsent home")
+    first = store.enqueue("analyze", {}, tenant="ed", input_key=key)
+
+    assert store.enqueue("analyze", {}, tenant="ed", input_key=analysis_input_key("chest pain sent home")) == first
+    assert store.enqueue("analyze", {}, tenant="bulk", input_key=key) != first
+    assert store.get(first)["coalesced"] == 1
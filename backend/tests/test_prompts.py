@@ -0,0 +1,99 @@
+from types import SimpleNamespace
+import pytest
+from app.core.config import settings
+from app.services import clinical_standards, vector_db, CaseHit
+from app.services.llm_client import LLMClient
+from app.services.prompts import IDENTIFY_RISKS_PROMPT, PromptContextCache, PromptTemplate
+
+
+def hit(case_id, facts="Chest pain sent home"):
+    return CaseHit(case_id, 0.1, "Smith v. General", 2019, "Emergency Medicine", facts, "Plaintiff", "Missed MI")
+
+
+def test_render_fills_named_fields():
+    template = PromptTemplate("t", "Case {case} vs {standard}, literal {{braces}}")
+
+    assert template.fields == {"case", "standard"}
+    assert template.render(case="A", standard="B") == "Case A vs B, literal {braces}"
+    with pytest.raises(KeyError):
+        template.render(case="A")
+
+
+@pytest.mark.parametrize("text", ["{}", "{case!r}", "{case:>10}", "{a}{cache_breakpoint}{b}{cache_breakpoint}"])
+def test_invalid_templates_are_rejected(text):
+    with pytest.raises(ValueError):
+        PromptTemplate("t", text)
+
+
+def test_version_follows_the_text():
+    assert PromptTemplate("t", "a {x}").version == PromptTemplate("t", "a {x}").version
+    assert PromptTemplate("t", "a {x}").version != PromptTemplate("t", "b {x}").version
+
+
+def test_risk_prompt_prefix_holds_only_shared_blocks():
+    prefix, rest = IDENTIFY_RISKS_PROMPT.render_parts(
+        standard="<standard>", similar_cases="<precedents>", case_context="<case>", patient_info="<info>"
+    )
+
+    assert "<standard>" in prefix
+    assert not any(block in prefix for block in ("<precedents>", "<case>", "<info>"))
+    assert rest.index("<precedents>") < rest.index("<case>") < rest.index("<info>")
+
+
+def test_standards_blocks_are_dropped_when_standards_change(monkeypatch):
+    cache = PromptContextCache()
+    monkeypatch.setattr(clinical_standards, "standards", {"chest_pain": {"required_workup": ["ECG"]}})
+    monkeypatch.setattr(clinical_standards, "version", "v1")
+
+    first = cache.standards_block("Chest Pain")
+    assert "ECG" in first
+    assert cache.standards_block("chest pain") is first
+
+    monkeypatch.setattr(clinical_standards, "standards", {"chest_pain": {"required_workup": ["Troponin"]}})
+    monkeypatch.setattr(clinical_standards, "version", "v2")
+
+    assert "Troponin" in cache.standards_block("chest pain")
+    assert cache.stats["standards_hits"] == 1
+    assert cache.stats["standards_misses"] == 2
+
+
+def test_case_snippets_are_dropped_when_case_data_changes(monkeypatch):
+    version = ["v1"]
+    monkeypatch.setattr(type(vector_db), "data_version", property(lambda self: version[0]))
+    cache = PromptContextCache(max_cases=1)
+
+    assert "Chest pain" in cache.case_snippet(hit("case_1"))
+    assert "Chest pain" in cache.case_snippet(hit("case_1", facts="Headache"))
+
+    version[0] = "v2"
+    assert "Headache" in cache.case_snippet(hit("case_1", facts="Headache"))
+
+    # Least recently used snippet is evicted past max_cases
+    cache.case_snippet(hit("case_2"))
+    assert cache.get_stats()["cached_cases"] == 1
+
+
+class RecordingAnthropic:
+    def __init__(self):
+        self.requests = []
+        self.messages = self
+
+    def create(self, **kwargs):
+        self.requests.append(kwargs)
+        return SimpleNamespace(content=[SimpleNamespace(text="[]")], usage=None)
+
+
+@pytest.mark.parametrize("prefix_chars, marked", [(100, False), (4096, True)])
+def test_cache_control_only_for_prefixes_the_api_caches(monkeypatch, prefix_chars, marked):
+    monkeypatch.setattr(settings, "PROMPT_CACHE_MIN_PREFIX_CHARS", 4096)
+    client = LLMClient(mode="off")
+    client._client = RecordingAnthropic()
+
+    client.complete(model="m", prompt="CASE", max_tokens=10, cache_prefix="p" * prefix_chars)
+
+    content = client._client.requests[0]["messages"][0]["content"]
+    if marked:
+        assert content[0]["cache_control"] == {"type": "ephemeral"}
+        assert content[1]["text"] == "CASE"
+    else:
+        assert content == "p" * prefix_chars + "CASE"
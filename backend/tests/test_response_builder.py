@@ -0,0 +1,76 @@
+from app.agents.response_builder import ResponseBuilder, CaseTextIndex
+from app.schemas import IdentifiedRisk, RiskType, Category
+
+
+def make_risk(**overrides):
+    fields = dict(
+        type=RiskType.INADEQUATE_WORKUP,
+        severity=8,
+        description="Troponin not resulted before discharge",
+        standard_violated="Serial troponin for chest pain",
+        mitigation="Document troponin results",
+    )
+    fields.update(overrides)
+    return IdentifiedRisk(**fields)
+
+
+def test_best_excerpt_prefers_highest_weight_sentence():
+    index = CaseTextIndex("Chest pain at rest. Troponin pending at discharge. Patient sent home.")
+
+    excerpt, score, hits = index.best_excerpt({"troponin": 1.0, "discharge": 1.0, "home": 0.5})
+
+    assert excerpt == "Troponin pending at discharge."
+    assert score == 2.0
+    assert hits == 2
+
+
+def test_single_shared_term_is_not_high_confidence():
+    builder = ResponseBuilder()
+
+    one_term = builder._confidence(score=1.0, total_weight=1.0, hits=1)
+    many_terms = builder._confidence(score=4.0, total_weight=4.0, hits=4)
+
+    assert one_term < 60
+    assert many_terms == 95
+
+
+def test_medication_unit_terms_are_kept():
+    terms = ResponseBuilder()._risk_terms(make_risk(description="Aspirin 81 mg not given"))
+
+    assert "mg" in terms
+    assert "81" not in terms
+
+
+def test_analysis_does_not_double_periods():
+    analysis = ResponseBuilder._analysis(make_risk(
+        description="Troponin not repeated.",
+        standard_violated="Serial troponin...",
+        legal_precedent="Smith v. Jones.",
+    ))
+
+    assert analysis == (
+        "Troponin not repeated. Standard of care: Serial troponin. Precedent: Smith v. Jones."
+    )
+
+
+def test_build_links_risks_to_evidence():
+    state = {
+        "case_description": "54M with chest pain. Troponin ordered, sent home before it resulted.",
+        "identified_risks": [
+            make_risk(severity=4, type=RiskType.DOCUMENTATION_DEFICIENCY,
+                      description="No reassessment note", standard_violated="Document reassessment"),
+            make_risk(),
+        ],
+        "risk_score": 7.2,
+        "risk_level": "HIGH",
+    }
+
+    response = ResponseBuilder().build(state)
+
+    assert response.riskScore == 72
+    assert response.keyFindings[0] == "Troponin not resulted before discharge"
+    assert [r.category for r in response.recommendations] == [
+        Category.FOLLOW_UP, Category.DOCUMENTATION
+    ]
+    assert response.evidence[0].excerpt == "Troponin ordered, sent home before it resulted."
+    assert response.analysisMetrics.riskIndicators == 2
@@ -0,0 +1,84 @@
+import pytest
+from fastapi import HTTPException
+from app.api.responses import ResponseShape, ResponseView, response_shape
+
+
+SIMILAR_CASE = {
+    "case_id": "case_7",
+    "case_name": "Smith v. General Hospital",
+    "year": 2019,
+    "specialty": "Emergency Medicine",
+    "facts": "Chest pain discharged without troponin",
+    "verdict": "Plaintiff",
+    "key_error": "Missed MI",
+    "settlement": "$1.2M",
+    "similarity_score": 0.91,
+}
+
+RESULT = {
+    "riskScore": 72,
+    "riskLevel": "HIGH",
+    "keyFindings": ["No troponin"],
+    "similar_cases": [SIMILAR_CASE],
+    "protective_documentation": "Differential considered...",
+}
+
+
+def test_full_view_returns_result_unchanged():
+    assert ResponseShape().apply(RESULT) == RESULT
+
+
+def test_lean_view_references_cases_and_omits_documentation():
+    shaped = ResponseShape(view=ResponseView.LEAN).apply(RESULT)
+
+    assert "protective_documentation" not in shaped
+    assert shaped["similar_cases"] == [{
+        "case_id": "case_7",
+        "case_name": "Smith v. General Hospital",
+        "year": 2019,
+        "verdict": "Plaintiff",
+        "similarity_score": 0.91,
+        "href": "/api/v1/cases/case_7",
+    }]
+    assert shaped["riskScore"] == 72
+
+
+def test_lean_view_keeps_included_documentation():
+    shaped = ResponseShape(
+        view=ResponseView.LEAN, include=frozenset({"riskScore", "protective_documentation"})
+    ).apply(RESULT)
+
+    assert shaped == {"riskScore": 72, "protective_documentation": "Differential considered..."}
+
+
+def test_lean_view_leaves_cases_without_id_inline():
+    legacy = {key: value for key, value in SIMILAR_CASE.items() if key != "case_id"}
+
+    shaped = ResponseShape(view=ResponseView.LEAN).apply({**RESULT, "similar_cases": [legacy]})
+
+    assert shaped["similar_cases"] == [legacy]
+
+
+def test_include_and_exclude():
+    assert ResponseShape(include=frozenset({"riskScore", "riskLevel"})).apply(RESULT) == {
+        "riskScore": 72, "riskLevel": "HIGH",
+    }
+    assert set(ResponseShape(exclude=frozenset({"similar_cases"})).apply(RESULT)) == {
+        "riskScore", "riskLevel", "keyFindings", "protective_documentation",
+    }
+
+
+def test_apply_does_not_modify_stored_result():
+    stored = {**RESULT, "similar_cases": [dict(SIMILAR_CASE)]}
+
+    ResponseShape(view=ResponseView.LEAN).apply(stored)
+
+    assert stored["similar_cases"][0] == SIMILAR_CASE
+
+
+def test_unknown_fields_are_rejected():
+    with pytest.raises(HTTPException) as error:
+        response_shape(ResponseView.FULL, include="riskScore, bogus", exclude=None)
+
+    assert error.value.status_code == 422
+    assert "bogus" in error.value.detail
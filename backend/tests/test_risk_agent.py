@@ -0,0 +1,135 @@
+import json
+import time
+import pytest
+from app.agents.risk_agent import RiskAssessmentAgent, StepTimeoutError
+from app.core.config import settings
+from app.schemas import PatientInfo
+from app.services.chunking import CaseChunk
+
+
+@pytest.fixture
+def agent():
+    return RiskAssessmentAgent()
+
+
+def chunked_state(texts):
+    chunks, start = [], 0
+    for index, text in enumerate(texts):
+        chunks.append(CaseChunk(index=index, title=f"S{index}", start=start, end=start + len(text)))
+        start += len(text) + 2
+    return {"case_description": "\n\n".join(texts), "case_chunks": chunks}
+
+
+def test_merge_patient_info_in_chunk_order():
+    merged = RiskAssessmentAgent._merge_patient_info([
+        PatientInfo(age=54, chief_complaint="chest pain", tests_performed=["ECG"],
+                    tests_not_performed=["Troponin"], disposition="observation"),
+        PatientInfo(gender="male", chief_complaint="", tests_performed=["troponin ", "ecg"],
+                    treatment_given=["aspirin"], disposition="sent home"),
+    ])
+
+    assert merged.age == 54
+    assert merged.gender == "male"
+    assert merged.chief_complaint == "chest pain"
+    assert merged.tests_performed == ["ECG", "troponin"]
+    # Resulted in a later section, so no longer missing
+    assert merged.tests_not_performed == []
+    assert merged.treatment_given == ["aspirin"]
+    assert merged.disposition == "sent home"
+
+
+def test_short_case_context_is_the_whole_text(agent):
+    state = chunked_state(["HPI: chest pain", "DISPOSITION: home"])
+
+    assert agent._case_context(state) == state["case_description"]
+
+
+def test_case_context_shares_budget_across_sections(agent, monkeypatch):
+    monkeypatch.setattr(settings, "PROMPT_CASE_MAX_CHARS", 1000)
+    state = chunked_state([f"section {i} " + "x" * 600 for i in range(4)])
+
+    context = agent._case_context(state)
+
+    assert [line.split("]")[0] for line in context.split("\n\n")] == ["[S0", "[S1", "[S2", "[S3"]
+    assert all(len(line.split("] ", 1)[1]) == 250 for line in context.split("\n\n"))
+
+
+def test_case_context_keeps_first_and_last_of_many_sections(agent, monkeypatch):
+    monkeypatch.setattr(settings, "PROMPT_CASE_MAX_CHARS", 1000)
+    texts = [f"section {i} " + "x" * 300 for i in range(184)]
+    texts[-1] = "DISPOSITION: discharged home " + "x" * 300
+    state = chunked_state(texts)
+
+    context = agent._case_context(state)
+    excerpts = [part for part in context.split("\n\n") if not part.startswith("[...")]
+
+    assert len(excerpts) == 5
+    assert excerpts[0].startswith("[S0]")
+    assert excerpts[-1].startswith("[S183] DISPOSITION: discharged home")
+    assert sum(len(part.split("] ", 1)[1]) for part in excerpts) <= 1000
+    assert "sections omitted" in context
+
+
+def test_nodes_return_only_the_keys_they_set(agent):
+    state = {"case_description": "x" * 10, "identified_risks": [], "degraded": None}
+
+    assert agent.chunk_case(state).keys() == {"case_chunks"}
+    assert agent.calculate_risk_score(state) == {"risk_score": 0.0, "risk_level": "LOW"}
+    assert agent.generate_mitigation(state) == {"action_items": [], "protective_documentation": ""}
+
+
+class SlowSectionLLM:
+    """Answers extraction prompts at once, except for sections marked SLOW."""
+
+    def complete(self, prompt, **kwargs):
+        if "SLOW" in prompt:
+            time.sleep(2)
+        if "FAIL" in prompt:
+            raise RuntimeError("upstream error")
+        return json.dumps({"age": 54, "chief_complaint": "chest pain", "tests_performed": ["ECG"]})
+
+
+def test_step_timeout_raises(agent):
+    with pytest.raises(StepTimeoutError, match="budget"):
+        agent._run_with_budget({}, 0.2, lambda timeout: time.sleep(1))
+
+
+def test_step_past_the_deadline_does_not_run(agent):
+    calls = []
+
+    with pytest.raises(StepTimeoutError, match="deadline"):
+        agent._run_with_budget({"deadline": time.time() - 1}, 5, calls.append)
+    assert calls == []
+
+
+def test_step_gets_less_than_its_budget(agent):
+    timeout = agent._run_with_budget({"deadline": time.time() + 2}, 30, lambda timeout: timeout)
+
+    assert 1.5 < timeout < 2
+
+
+def test_chunks_finished_within_budget_are_kept(agent, monkeypatch):
+    monkeypatch.setattr(settings, "EXTRACT_TIMEOUT_SECONDS", 0.5)
+    agent.llm = SlowSectionLLM()
+    state = chunked_state(["HPI: chest pain", "NURSING: SLOW", "ED COURSE: ECG normal"])
+
+    started = time.monotonic()
+    update = agent.extract_patient_info(state)
+
+    assert time.monotonic() - started < 1
+    assert update["patient_info"].age == 54
+    assert update["degraded"] == [
+        {"part": "patient_info", "reason": "partial", "detail": "1 of 3 chunks not extracted"}
+    ]
+
+
+def test_failed_extraction_degrades(agent):
+    agent.llm = SlowSectionLLM()
+    state = {"case_description": "FAIL", "case_chunks": [], "degraded": [{"part": "x", "reason": "error"}]}
+
+    update = agent.extract_patient_info(state)
+
+    assert "patient_info" not in update
+    assert update["degraded"][0] == {"part": "x", "reason": "error"}
+    assert update["degraded"][1]["part"] == "patient_info"
+    assert update["degraded"][1]["reason"] == "error"
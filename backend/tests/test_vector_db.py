@@ -0,0 +1,63 @@
+import csv
+import pytest
+from app.core.config import settings
+from app.services.case_corpus import convert_csv
+from app.services.vector_db import VectorDatabase
+from benchmarks.common import HashEmbeddingFunction
+
+
+HEADER = ["Case Name", "Year", "Specialty", "Facts", "Verdict", "Key Error", "Settlement"]
+
+
+def write_cases(path, cases):
+    with open(path, "w", newline="", encoding="utf-8") as f:
+        writer = csv.writer(f)
+        writer.writerow(HEADER)
+        for name, facts in cases:
+            writer.writerow([name, "2020", "Emergency Medicine", facts, "Plaintiff", "Delay", "$1M"])
+
+
+@pytest.fixture
+def db(tmp_path, monkeypatch):
+    monkeypatch.setattr(settings, "CHROMA_DB_PATH", str(tmp_path / "chroma"))
+    monkeypatch.setattr(settings, "CASES_CORPUS_PATH", "")
+    db = VectorDatabase(embedding_function=HashEmbeddingFunction(dim=64))
+    db.initialize()
+    return db
+
+
+def test_hits_hydrate_from_corpus_rows(db, tmp_path):
+    write_cases(tmp_path / "cases.csv", [("Smith", "chest pain discharged"), ("Doe", "missed fracture")])
+    convert_csv(str(tmp_path / "cases.csv"), str(tmp_path / "corpus"))
+    db.load_cases_from_corpus(str(tmp_path / "corpus"))
+
+    hit = db.search_similar_cases("missed fracture", n_results=1)[0]
+
+    assert (hit.case_id, hit.case_name) == ("case_1", "Doe")
+
+
+def test_hits_from_another_corpus_build_are_refused(db, tmp_path):
+    write_cases(tmp_path / "cases.csv", [("Smith", "chest pain discharged"), ("Doe", "missed fracture")])
+    convert_csv(str(tmp_path / "cases.csv"), str(tmp_path / "corpus"))
+    db.load_cases_from_corpus(str(tmp_path / "corpus"))
+
+    # Rebuilt with different rows but not re-indexed
+    write_cases(tmp_path / "cases.csv", [("Roe", "headache"), ("Smith", "chest pain discharged")])
+    convert_csv(str(tmp_path / "cases.csv"), str(tmp_path / "corpus"))
+
+    with pytest.raises(RuntimeError, match="another corpus build"):
+        db.search_similar_cases("chest pain", n_results=1)
+
+
+def test_reindex_replaces_rows_of_the_previous_build(db, tmp_path):
+    write_cases(tmp_path / "cases.csv", [("Smith", "chest pain"), ("Doe", "missed fracture"), ("Poe", "sepsis")])
+    convert_csv(str(tmp_path / "cases.csv"), str(tmp_path / "corpus"))
+    db.load_cases_from_corpus(str(tmp_path / "corpus"))
+
+    write_cases(tmp_path / "cases.csv", [("Roe", "headache"), ("Smith", "chest pain")])
+    convert_csv(str(tmp_path / "cases.csv"), str(tmp_path / "corpus"))
+    db.load_cases_from_corpus(str(tmp_path / "corpus"))
+
+    assert db.collection.count() == 2
+    hits = db.search_similar_cases("chest pain", n_results=2)
+    assert [(hit.case_id, hit.case_name) for hit in hits] == [("case_1", "Smith"), ("case_0", "Roe")]
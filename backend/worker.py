@@ -0,0 +1,21 @@
+import argparse
+
+from app.core.config import settings
+from app.workers import run_worker_pool
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Run the analysis worker pool")
+    parser.add_argument(
+        "--concurrency",
+        type=int,
+        default=settings.JOB_WORKER_CONCURRENCY,
+        help="number of worker processes"
+    )
+    args = parser.parse_args()
+
+    run_worker_pool(args.concurrency)
+
+
+if __name__ == "__main__":
+    main()